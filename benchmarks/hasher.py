@@ -0,0 +1,139 @@
+"""Compare the read engines of `Hasher` against the former `f.read` loop.
+
+For each hash context and method, report the throughput, the peak traced
+memory and the number of chunk buffers allocated while hashing a file.
+
+Run ``python benchmarks/hasher.py --help`` for options.
+"""
+
+import functools
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Callable, Final
+
+import click
+
+from gethash.hasher import HashContext, Hasher
+from gethash.wrappers.crc32 import CRC32
+
+CONTEXT_SETTINGS: Final = dict(help_option_names=["-h", "--help"], max_content_width=120)
+
+
+def read_loop(ctx: HashContext, path: Path, chunksize: int) -> bytes:
+    """The loop used by `Hasher` before the buffered engine reused its buffer."""
+
+    ctx = ctx.copy()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunksize):
+            ctx.update(chunk)
+    return ctx.digest()
+
+
+def iter_factories() -> Iterator[tuple[str, Callable[[], HashContext]]]:
+    yield "hashlib.sha256", hashlib.sha256
+    yield "hashlib.md5", hashlib.md5
+    yield "wrappers.CRC32", CRC32
+    try:
+        from Crypto.Hash import MD4
+    except ImportError:
+        pass
+    else:
+        yield "pycryptodome.MD4", MD4.new
+
+
+class AllocationCounter:
+    """Count the chunk buffers allocated to pass data to a hash context."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        # Keep the previous buffer alive, so a new buffer cannot reuse its id.
+        self.buffer: Any = None
+
+    def add(self, data: Any) -> None:
+        with memoryview(data) as view:
+            buffer = view.obj
+        if buffer is not self.buffer:
+            self.buffer = buffer
+            self.count += 1
+
+
+class CountingContext:
+    """Hash context which reports each chunk to an `AllocationCounter`."""
+
+    def __init__(self, ctx: HashContext, counter: AllocationCounter) -> None:
+        self.ctx = ctx
+        self.counter = counter
+
+    @property
+    def digest_size(self) -> int:
+        return self.ctx.digest_size
+
+    def copy(self) -> "CountingContext":
+        return CountingContext(self.ctx.copy(), self.counter)
+
+    def digest(self) -> bytes:
+        return self.ctx.digest()
+
+    def update(self, data: Any) -> None:
+        self.counter.add(data)
+        self.ctx.update(data)
+
+
+def make_methods(ctx: HashContext, path: Path, chunksize: int) -> dict[str, Callable[[], Any]]:
+    methods: dict[str, Callable[[], Any]] = {"f.read": functools.partial(read_loop, ctx, path, chunksize)}
+    for engine in ("buffered", "mmap"):
+        hasher = Hasher(ctx, chunksize=chunksize, engine=engine, tqdm_args={"disable": True})
+        methods[engine] = functools.partial(hasher, path)
+    return methods
+
+
+def measure(func: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    """Return the best time and the peak traced memory."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option("--size", type=click.IntRange(min=1), default=256, show_default=True, help="The file size in MiB.")
+@click.option("--chunksize", type=click.IntRange(min=1), default=0x100000, show_default=True)
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True)
+def main(*, size: int, chunksize: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir, "data")
+        with open(path, "wb") as f:
+            for _ in range(size):
+                f.write(os.urandom(0x100000))
+
+        click.echo(f"{'context':<20}{'method':<12}{'MiB/s':>10}{'peak KiB':>12}{'allocs':>10}")
+        for name, factory in iter_factories():
+            ctx = factory()
+            # Count the allocations in separate runs, which are not timed.
+            counter = AllocationCounter()
+            counted = make_methods(CountingContext(ctx, counter), path, chunksize)
+            for method, func in make_methods(ctx, path, chunksize).items():
+                seconds, peak = measure(func, repeat)
+                counter.count = 0
+                counted[method]()
+                allocs = counter.count
+                click.echo(f"{name:<20}{method:<12}{size / seconds:>10.1f}{peak / 1024:>12.1f}{allocs:>10}")
+
+
+if __name__ == "__main__":
+    main()
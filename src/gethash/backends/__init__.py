@@ -1,16 +1,15 @@
 from __future__ import annotations
 
 import abc
-from typing import TYPE_CHECKING, Any
-
-from ..script import gethashcli, script_main
+import functools
+from typing import TYPE_CHECKING, Any, Callable
 
 if TYPE_CHECKING:
     from click import Command
 
     from ..hasher import HashContext
 
-__all__ = ["Backend"]
+__all__ = ["Backend", "load_factory"]
 
 
 class Backend(metaclass=abc.ABCMeta):
@@ -31,12 +30,42 @@ class Backend(metaclass=abc.ABCMeta):
         if name not in self.algorithms_available:
             raise ValueError(f"unkown algorithm {name!r}")
 
+        from ..script import gethashcli, script_main
+
         display_name = name.upper()
         doc = f"""Generate or check {display_name}."""
 
         @gethashcli(command_name=name, display_name=display_name, doc=doc)
         def main(files: tuple[str, ...], **kwargs: Any) -> None:
             ctx = self.load_ctx(name)
-            script_main(ctx, files, **kwargs)
+            factory = functools.partial(self.load_ctx, name)
+            script_main(ctx, files, factory=factory, **kwargs)
 
         return main
+
+
+def load_factory(name: str) -> Callable[[], HashContext]:
+    """Return a picklable function which creates the hash context of an algorithm.
+
+    Parameters:
+        name (str):
+            The name of the hash algorithm.
+
+    Raises:
+        ValueError:
+            If no installed backend provides the algorithm.
+
+    Returns:
+        Callable[[], HashContext]:
+            The hash context factory.
+    """
+
+    from ..registry import load_backend, load_registry
+
+    for refresh in (False, True):
+        try:
+            backend = load_backend(load_registry(refresh=refresh), name)
+        except (KeyError, ImportError):
+            continue
+        return functools.partial(backend.load_ctx, name)
+    raise ValueError(f"unknown algorithm {name!r}")
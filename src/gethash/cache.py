@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import json
+import os
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .utils.entry import stat_path
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+# Commit after this many writes so that concurrent runs see the progress.
+_COMMIT_INTERVAL = 1000
+
+# Do not cache a file modified so recently that a later modification may keep
+# the same mtime on a file system with coarse timestamps.
+_RACY_NS = 2_000_000_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    algorithm TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    atime INTEGER NOT NULL,
+    PRIMARY KEY (algorithm, start, stop, dev, ino)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hashes_atime ON hashes (atime);
+"""
+
+_MERKLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    algorithm TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    children TEXT NOT NULL,
+    PRIMARY KEY (algorithm, start, stop, path)
+) WITHOUT ROWID;
+"""
+
+# The metadata and the hash value of a child of a directory node, where the
+# metadata is `(kind, size, mtime_ns, ino)` and `kind` is `'d'` or `'f'`.
+MerkleChild = tuple[str, int, int, int, bytes]
+
+
+class CacheMismatchError(ValueError):
+    """Raised if the cached hash value differs from the current one."""
+
+    def __init__(self, path: str, hex_hash_value: str, curr_hex_hash_value: str) -> None:
+        super().__init__(f"cached hash {hex_hash_value} differs from {curr_hex_hash_value} for {path!r}")
+        self.path = path
+        self.hex_hash_value = hex_hash_value
+        self.curr_hex_hash_value = curr_hex_hash_value
+
+
+class CacheKey(NamedTuple):
+    """The identity of a file range with its metadata."""
+
+    algorithm: str
+    start: int
+    stop: int
+    dev: int
+    ino: int
+    size: int
+    mtime_ns: int
+
+
+def default_cache_dir() -> Path:
+    """Return the default cache directory.
+
+    The ``GETHASH_CACHE_DIR`` environment variable takes precedence over the
+    platform-specific user cache directory.
+
+    Returns:
+        Path:
+            The default cache directory.
+    """
+
+    cache_dir = os.environ.get("GETHASH_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return Path(base, "gethash", "Cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base, "gethash")
+
+
+def _to_int64(value: int) -> int:
+    # SQLite integers are signed 64-bit, but device and inode numbers may not.
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class HashCache:
+    """Persistent cache of hash values.
+
+    The hash values are keyed by the algorithm, the clamped ``(start, stop)``
+    range and the file identity ``(st_dev, st_ino)``. A cached hash value is
+    valid only if ``st_size`` and ``st_mtime_ns`` are unchanged. The least
+    recently used entries are evicted on :meth:`HashCache.close` to keep at
+    most ``max_entries`` entries.
+
+    The :class:`HashCache` supports the context manager protocol for calling
+    :meth:`HashCache.close` automatically.
+
+    Parameters:
+        filepath (str | Path):
+            The path of the cache database.
+        max_entries (int | None, default=None):
+            The maximum number of entries. If ``None``, never evict entries.
+    """
+
+    def __init__(self, filepath: str | Path, *, max_entries: int | None = None) -> None:
+        if max_entries is not None and max_entries < 0:
+            raise ValueError(f"max_entries must be non-negative, got {max_entries!r}")
+
+        self.name = str(filepath)
+        self.max_entries = max_entries
+        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+
+        # Import `sqlite3` only if a cache is used, since it is slow to import.
+        import sqlite3
+
+        self.conn = sqlite3.connect(filepath, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self._writes = 0
+        self._atime = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Evict the least recently used entries and close the database."""
+
+        if self.max_entries is not None:
+            self.evict(self.max_entries)
+        self.conn.commit()
+        self.conn.close()
+
+    def key(
+        self, algorithm: str, path: str | Path, start: int | None = None, stop: int | None = None
+    ) -> CacheKey | None:
+        """Return the cache key of a file.
+
+        Parameters:
+            algorithm (str):
+                The name of the hash algorithm.
+            path (str | Path):
+                The path of a file. The status of a
+                :class:`~gethash.utils.entry.PathEntry` is reused.
+            start (int | None, default=None):
+                The start offset of the file.
+            stop (int | None, default=None):
+                The stop offset of the file.
+
+        Returns:
+            CacheKey | None:
+                The cache key, or ``None`` if ``path`` is not a regular file.
+        """
+
+        try:
+            st = stat_path(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        # Clamp `(start, stop)` to `(0, filesize)` the same as `Hasher`.
+        size = st.st_size
+        if start is None or start < 0:
+            start = 0
+        if stop is None or stop > size:
+            stop = size
+        return CacheKey(algorithm, start, stop, _to_int64(st.st_dev), _to_int64(st.st_ino), size, st.st_mtime_ns)
+
+    def get(self, key: CacheKey) -> bytes | None:
+        """Return the cached hash value, or ``None`` if not cached."""
+
+        row = self.conn.execute(
+            "SELECT hash, size, mtime_ns FROM hashes WHERE algorithm = ? AND start = ? AND stop = ? AND dev = ? AND ino = ?",
+            key[:5],
+        ).fetchone()
+        if row is None or (row[1], row[2]) != (key.size, key.mtime_ns):
+            return None
+
+        self.conn.execute(
+            "UPDATE hashes SET atime = ? WHERE algorithm = ? AND start = ? AND stop = ? AND dev = ? AND ino = ?",
+            (self._now(), *key[:5]),
+        )
+        self._wrote()
+        return bytes(row[0])
+
+    def put(self, key: CacheKey, hash_value: bytes) -> None:
+        """Cache a hash value."""
+
+        now = self._now()
+        if now - key.mtime_ns < _RACY_NS:
+            return
+
+        self.conn.execute("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (*key, hash_value, now))
+        self._wrote()
+
+    def evict(self, max_entries: int) -> None:
+        """Evict the least recently used entries to keep at most ``max_entries`` entries."""
+
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()
+        excess = count - max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM hashes WHERE atime <= (SELECT atime FROM hashes ORDER BY atime LIMIT 1 OFFSET ?)",
+                (excess - 1,),
+            )
+            self.conn.commit()
+
+    def _now(self) -> int:
+        # Keep the access times distinct even with a coarse clock.
+        self._atime = max(time.time_ns(), self._atime + 1)
+        return self._atime
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes >= _COMMIT_INTERVAL:
+            self._writes = 0
+            self.conn.commit()
+
+
+class MerkleCache:
+    """Persistent interior nodes of Merkle directory digests.
+
+    Each directory node is stored with the metadata and the hash values of its
+    children, keyed by the algorithm, the ``(start, stop)`` range of files and
+    the absolute path of the directory. Only the changed files and their
+    ancestors need to be rehashed when a directory digest is recomputed.
+
+    The :class:`MerkleCache` can be shared between threads, and is pickled by
+    its path so that each worker process opens its own connection. It
+    supports the context manager protocol for calling
+    :meth:`MerkleCache.close` automatically.
+
+    Parameters:
+        filepath (str | Path):
+            The path of the cache database.
+        algorithm (str):
+            The name of the hash algorithm.
+    """
+
+    def __init__(self, filepath: str | Path, algorithm: str) -> None:
+        self.name = str(filepath)
+        self.algorithm = algorithm
+        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+
+        import sqlite3
+
+        self.conn = sqlite3.connect(filepath, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_MERKLE_SCHEMA)
+        self._lock = threading.Lock()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self), (self.name, self.algorithm)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Commit and close the database."""
+
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def commit(self) -> None:
+        """Commit the stored nodes so that other processes see them."""
+
+        with self._lock:
+            self.conn.commit()
+
+    def get(
+        self, path: str | Path, start: int | None = None, stop: int | None = None
+    ) -> tuple[bytes, dict[str, MerkleChild]] | None:
+        """Return the hash value and the children of a directory node, or ``None`` if not cached."""
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT hash, children FROM nodes WHERE algorithm = ? AND start = ? AND stop = ? AND path = ?",
+                (self.algorithm, *_range_key(start, stop), os.path.abspath(path)),
+            ).fetchone()
+        if row is None:
+            return None
+        children = {
+            name: (kind, size, mtime_ns, ino, bytes.fromhex(hex_hash_value))
+            for name, (kind, size, mtime_ns, ino, hex_hash_value) in json.loads(row[1]).items()
+        }
+        return bytes(row[0]), children
+
+    def put(
+        self,
+        path: str | Path,
+        hash_value: bytes,
+        children: dict[str, MerkleChild],
+        start: int | None = None,
+        stop: int | None = None,
+    ) -> None:
+        """Store the hash value and the children of a directory node."""
+
+        # Do not trust the hash values of files modified so recently that a
+        # later modification may keep the same mtime.
+        now = time.time_ns()
+        data = {
+            name: (kind, size, -1 if now - mtime_ns < _RACY_NS else mtime_ns, ino, value.hex())
+            for name, (kind, size, mtime_ns, ino, value) in children.items()
+        }
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?)",
+                (self.algorithm, *_range_key(start, stop), os.path.abspath(path), hash_value, json.dumps(data)),
+            )
+
+
+def _range_key(start: int | None, stop: int | None) -> tuple[int, int]:
+    # The range is not clamped since it applies to every file in the tree.
+    return (-1 if start is None else start), (-1 if stop is None else stop)
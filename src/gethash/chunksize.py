@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .hasher import HashContext
+
+# The block size if the file system does not report one.
+_BLKSIZE = 0x1000  # 4 KiB
+
+# The upper bound of chunk sizes selected automatically.
+_MAX_CHUNKSIZE = 0x1000000  # 16 MiB
+
+# Powers of two from 64 KiB to 16 MiB.
+_CANDIDATES = tuple(1 << i for i in range(16, 25))
+
+_PROFILE_VERSION = 1
+
+
+def _round_up(n: int, m: int) -> int:
+    return -(-n // m) * m
+
+
+def select_chunksize(size: int, blksize: int, preferred: int) -> int:
+    """Select the chunk size for reading a file.
+
+    Large files are read in chunks of the ``preferred`` size, but at least
+    four blocks, since striped RAID devices report the stripe width as the
+    block size. Small files get a buffer just large enough for their data.
+    The result is always a multiple of the block size.
+
+    Parameters:
+        size (int):
+            The number of bytes to read.
+        blksize (int):
+            The block size of the file system, i.e. ``st_blksize``. If not
+            positive, assume 4 KiB.
+        preferred (int):
+            The preferred chunk size, e.g. from :func:`calibrate`.
+
+    Returns:
+        int:
+            The chunk size.
+    """
+
+    if blksize <= 0:
+        blksize = _BLKSIZE
+    chunksize = _round_up(min(max(preferred, 4 * blksize), _MAX_CHUNKSIZE), blksize)
+    if size < chunksize:
+        chunksize = max(_round_up(size, blksize), blksize)
+    return chunksize
+
+
+def calibrate(ctx: HashContext, *, budget: float = 0.02, tolerance: float = 0.05) -> int:
+    """Find the smallest chunk size with nearly the best hashing throughput.
+
+    Each candidate from 64 KiB to 16 MiB is fed to a copy of ``ctx`` for about
+    ``budget`` seconds. Larger candidates are skipped once a single update is
+    too slow to measure within the budget, since the per-update overhead does
+    not matter for such algorithms.
+
+    Parameters:
+        ctx (HashContext):
+            The hash context prototype.
+        budget (float, default=0.02):
+            The time in seconds spent on each candidate.
+        tolerance (float, default=0.05):
+            The fraction of the best throughput which may be given up for a
+            smaller chunk size.
+
+    Returns:
+        int:
+            The chunk size.
+    """
+
+    data = memoryview(bytearray(_CANDIDATES[-1]))
+    rates: dict[int, float] = {}
+    for chunksize in _CANDIDATES:
+        chunk = data[:chunksize]
+        c = ctx.copy()
+        total = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < budget:
+            c.update(chunk)
+            total += chunksize
+        rates[chunksize] = total / elapsed
+        if total == chunksize and elapsed > 4 * budget:
+            break
+
+    best = max(rates.values())
+    return min(chunksize for chunksize, rate in rates.items() if rate >= (1 - tolerance) * best)
+
+
+def profiled_chunksize(name: str, ctx: HashContext, filepath: str | Path) -> int:
+    """Return the calibrated chunk size of an algorithm.
+
+    The results of :func:`calibrate` are cached in a small JSON profile, so
+    each algorithm is calibrated only once per profile.
+
+    Parameters:
+        name (str):
+            The name of the hash algorithm.
+        ctx (HashContext):
+            The hash context prototype.
+        filepath (str | Path):
+            The path of the profile.
+
+    Returns:
+        int:
+            The chunk size.
+    """
+
+    filepath = Path(filepath)
+    try:
+        profile = json.loads(filepath.read_text(encoding="utf-8"))
+        if profile.get("version") != _PROFILE_VERSION:
+            raise ValueError(profile.get("version"))
+        chunksizes = profile["chunksizes"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        chunksizes = {}
+
+    chunksize = chunksizes.get(name)
+    if isinstance(chunksize, int) and chunksize > 0:
+        return chunksize
+
+    chunksize = chunksizes[name] = calibrate(ctx)
+    profile = {"version": _PROFILE_VERSION, "chunksizes": chunksizes}
+    # Replace the profile atomically since other processes may read it. An
+    # unwritable profile only costs another calibration next time.
+    tmppath = filepath.with_name(f"{filepath.name}.{os.getpid()}.tmp")
+    try:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmppath.write_text(json.dumps(profile, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmppath, filepath)
+    except OSError:
+        pass
+    return chunksize
@@ -72,7 +72,7 @@ def main(files: tuple[str, ...], **kwargs: Any) -> None:
 
     from {package} import {hasher} as H
 
-    script_main(H(), files, **kwargs)
+    script_main(H(), files, factory=H, **kwargs)
 
 
 if __name__ == "__main__":
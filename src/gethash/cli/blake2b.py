@@ -12,7 +12,7 @@ def main(files: tuple[str, ...], **kwargs: Any) -> None:
 
     from hashlib import blake2b as H
 
-    script_main(H(), files, **kwargs)
+    script_main(H(), files, factory=H, **kwargs)
 
 
 if __name__ == "__main__":
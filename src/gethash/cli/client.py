@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import click
+
+from gethash.core import format_hash_line
+from gethash.utils.click import CommandX
+
+
+@click.command(
+    "client",
+    cls=CommandX,
+    context_settings={"help_option_names": ["-h", "--help"], "max_content_width": 120},
+    no_args_is_help=True,
+)
+@click.argument("algorithm")
+@click.argument("files", nargs=-1)
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    envvar="GETHASH_SOCKET",
+    required=True,
+    help="The Unix socket of ``gethash serve``.  [env var: GETHASH_SOCKET]",
+)
+@click.option("-a", "--auto", is_flag=True, help="Search files automatically")
+@click.option("--start", type=click.IntRange(min=0), help="The start offset of files.")
+@click.option("--stop", type=click.IntRange(min=0), help="The stop offset of files.")
+def main(
+    *, algorithm: str, files: tuple[str, ...], socket_path: str, auto: bool, start: int | None, stop: int | None
+) -> None:
+    """Generate hash values of FILES through ``gethash serve``.
+
+    The hash lines are the same as those printed by ``gethash ALGORITHM
+    FILES``, while the files are hashed by the server, which saves starting a
+    process for each call. Only the hash lines are printed, so redirect them
+    to write a hash file. The output files, check mode and path formats of
+    ``gethash ALGORITHM`` are not supported.
+    """
+
+    from gethash.client import request_hashes
+    from gethash.utils.glob import auto_glob, glob_filters, sorted_path
+
+    paths: Iterable[str]
+    if auto:
+        paths = auto_glob(files)
+    else:
+        paths = sorted_path(glob_filters(files, mode=1, type="a", recursive=True, user=True, vars=True))
+
+    # Send the paths as they are found, and keep them until their responses
+    # arrive, which are in the same order.
+    pending: deque[str] = deque()
+
+    def iter_requests() -> Iterator[dict[str, Any]]:
+        for path in paths:
+            pending.append(path)
+            # The server may run in another directory.
+            yield {"algorithm": algorithm, "path": os.path.abspath(path), "start": start, "stop": stop}
+
+    count = 0
+    try:
+        for response in request_hashes(socket_path, iter_requests()):
+            path = pending.popleft()
+            if "error" in response:
+                click.secho(f"[ERROR] {path}\n\t{response['error']}", err=True, fg="red")
+            else:
+                click.echo(format_hash_line(path, response["hash"]), nl=False)
+            count += 1
+    except OSError as e:
+        raise click.ClickException(f"cannot connect to {socket_path!r}: {e}") from None
+    if pending:
+        raise click.ClickException(f"server closed the connection after {count} files")
+
+
+if __name__ == "__main__":
+    main()
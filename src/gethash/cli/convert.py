@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import cast
+
+import click
+
+from gethash.core import ParseHashLineError
+from gethash.manifest import binary_to_text, guess_algorithm, is_binary_hash_file, text_to_binary
+from gethash.utils.click import CommandX
+
+
+@click.command(
+    "convert",
+    cls=CommandX,
+    context_settings={"help_option_names": ["-h", "--help"], "max_content_width": 120},
+    no_args_is_help=True,
+)
+@click.argument("src", type=click.Path(exists=True, dir_okay=False))
+@click.argument("dst", type=click.Path(dir_okay=False))
+@click.option(
+    "-A",
+    "--algorithm",
+    help="Name of the hash algorithm of a text SRC.  [default: suffix of SRC]",
+)
+def main(src: str, dst: str, algorithm: str | None) -> None:
+    """Convert a hash file between the text and binary formats.
+
+    A binary SRC is converted to a text DST, and a text SRC to a binary DST.
+    """
+
+    if is_binary_hash_file(src):
+        count = binary_to_text(src, dst)
+    else:
+        if algorithm is None:
+            algorithm = guess_algorithm(src)
+            if algorithm is None:
+                raise click.UsageError("Missing option '-A' / '--algorithm' for SRC without suffix.")
+        try:
+            count = text_to_binary(src, dst, algorithm)
+        except ParseHashLineError as e:
+            raise click.ClickException(f"invalid hash line {cast(int, e.lineno) + 1}: {e.hash_line!r}") from None
+        except ValueError as e:
+            raise click.ClickException(str(e)) from None
+    click.echo(f"Converted {count} hash values to {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ def main(files: tuple[str, ...], **kwargs: Any) -> None:
 
     from hashlib import md5 as H
 
-    script_main(H(), files, **kwargs)
+    script_main(H(), files, factory=H, **kwargs)
 
 
 if __name__ == "__main__":
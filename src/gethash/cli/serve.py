@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import signal
+import sys
+from pathlib import Path
+from typing import Any
+
+import click
+
+from gethash.utils.click import ChunkSize, CommandX
+
+
+@click.command(
+    "serve",
+    cls=CommandX,
+    context_settings={"help_option_names": ["-h", "--help"], "max_content_width": 120},
+)
+@click.option(
+    "-s",
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    envvar="GETHASH_SOCKET",
+    help="Listen on a Unix socket instead of reading stdin.  [env var: GETHASH_SOCKET]",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="The number of files hashed concurrently.",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["buffered", "mmap", "readahead"]),
+    default="buffered",
+    show_default=True,
+    help="Set the method for reading files.",
+)
+@click.option("--chunksize", type=ChunkSize(), help="Set the chunk size in bytes, e.g. ``4M``, or ``auto``.")
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    show_default=True,
+    help="Reuse hash values of unchanged files from the persistent cache.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="The cache directory. Defaults to ``$GETHASH_CACHE_DIR`` or the user cache directory.",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=1000000,
+    show_default=True,
+    help="The maximum number of cached hash values. The least recently used ones are evicted.",
+)
+def main(
+    *,
+    socket_path: str | None,
+    jobs: int,
+    engine: str,
+    chunksize: int | str | None,
+    cache: bool,
+    cache_dir: str | None,
+    cache_size: int,
+) -> None:
+    """Serve hash requests of newline-delimited JSON.
+
+    Each request names an algorithm and a path, with optional start and stop
+    offsets, e.g. {"id": 1, "algorithm": "sha256", "path": "foo.txt"}. Each
+    response carries the hex hash value or the error, in the order of the
+    requests. Use ``gethash client`` to send requests to a Unix socket.
+    """
+
+    from gethash.cache import default_cache_dir
+    from gethash.server import HashServer
+
+    cache_path = None
+    if cache:
+        cache_path = (default_cache_dir() if cache_dir is None else Path(cache_dir)) / "hashes.sqlite3"
+    with HashServer(
+        jobs=jobs, cache_path=cache_path, cache_size=cache_size, engine=engine, chunksize=chunksize
+    ) as server:
+        if socket_path is None:
+            server.serve(sys.stdin.buffer, sys.stdout.buffer)
+            return
+        # Stop on termination the same as on interruption, so that the socket
+        # file is removed.
+        signal.signal(signal.SIGTERM, _interrupt)
+        try:
+            server.serve_unix(socket_path)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            raise click.ClickException(str(e)) from None
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Send hash requests to ``gethash serve``.
+
+This module imports only the standard library, so that a client starts
+quickly.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+__all__ = ["request_hashes"]
+
+
+def request_hashes(path: str | Path, requests: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    """Send requests to a server listening on a Unix socket.
+
+    The requests are sent on a separate thread while the responses are read,
+    so neither side waits for the other.
+
+    Parameters:
+        path (str | Path):
+            The path of the socket file.
+        requests (Iterable[dict[str, Any]]):
+            The requests.
+
+    Yields:
+        dict[str, Any]:
+            The responses, in the order of the requests.
+    """
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        raise
+
+    def send() -> None:
+        try:
+            with sock.makefile("wb") as f:
+                for request in requests:
+                    f.write(json.dumps(request).encode() + b"\n")
+        except OSError:
+            pass
+        finally:
+            with suppress(OSError):
+                sock.shutdown(socket.SHUT_WR)
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+    try:
+        with sock.makefile("rb") as f:
+            for line in f:
+                yield json.loads(line)
+    finally:
+        # The file of the sender keeps the socket open, so shut it down to
+        # stop the sender if the responses are not read to the end.
+        with suppress(OSError):
+            sock.shutdown(socket.SHUT_RDWR)
+        sock.close()
+        sender.join()
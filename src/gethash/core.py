@@ -2,22 +2,41 @@ from __future__ import annotations
 
 import os
 import re
-from collections.abc import Iterator
+import stat
+from collections.abc import Iterable, Iterator
+from contextlib import suppress
 from hmac import compare_digest
 from pathlib import Path
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
 
-from typing_extensions import Self
+if TYPE_CHECKING:
+    from typing_extensions import Self
 
 _HASH_LINE_RE = re.compile(r"([0-9a-fA-F]+)(?: \*|  | )(.+)")
+_HEX_RE = re.compile(r"[0-9a-fA-F]+")
+
+# Patterns for parsing many hash lines at once, see `_parse_fast`.
+_HASH_LINES_RE = re.compile(r"^([0-9a-fA-F]+)(?: \*|  | )(.+)$", re.MULTILINE)
+# Hash lines whose paths may need to be normalized, or must not be joined with
+# the root directory. Typical hash files have none of them.
+_DENORMAL_RE = re.compile(r"/[./\n]")
+_DENORMAL_MARKS = (" .", "*.")
+_ABSOLUTE_MARKS = (" /", "*/")
+
+# The size hint of lines read at once by `HashFileReader.iter_blocks`.
+_BLOCKSIZE = 0x100000  # 1 MiB
 
 
 class ParseHashLineError(ValueError):
-    """Raised by :func:`parse_hash_line`."""
+    """Raised by :func:`parse_hash_line` and :func:`parse_hash_lines`.
+
+    The ``lineno`` is the index of the hash line, if known.
+    """
 
-    def __init__(self, hash_line: str) -> None:
+    def __init__(self, hash_line: str, lineno: int | None = None) -> None:
         super().__init__(hash_line)
         self.hash_line = hash_line
+        self.lineno = lineno
 
 
 class CheckHashLineError(ValueError):
@@ -93,6 +112,175 @@ def parse_hash_line(hash_line: str, *, root: str | Path | None = None) -> tuple[
     return path, hex_hash_value
 
 
+class HashBlock(NamedTuple):
+    """Hash lines parsed in bulk, whose hash values have the same size."""
+
+    paths: list[str]
+    """The paths of each hash line."""
+    hash_values: bytes
+    """The concatenated hash values of each hash line."""
+    digest_size: int
+    """The size of each hash value in bytes."""
+
+    def hash_value(self, index: int) -> bytes:
+        """Return the hash value of the hash line at ``index``."""
+
+        offset = index * self.digest_size
+        return self.hash_values[offset : offset + self.digest_size]
+
+
+def _path_joiner(root: str | Path | None) -> Callable[[str], str]:
+    if root is None:
+        prefix = ""
+    else:
+        root = os.path.normpath(root)
+        prefix = "" if root == os.curdir else root if root.endswith(os.sep) else root + os.sep
+    if os.altsep is not None:
+        # Leave the separators to `os.path.normpath` on Windows.
+        return lambda path: os.path.normpath(os.path.join(root, path) if root is not None else path)
+
+    def join(path: str) -> str:
+        if not path.startswith(os.sep):
+            path = prefix + path
+        # Only dots, double separators and trailing separators need to be
+        # normalized, and most paths have none of them.
+        if path.startswith(".") or "/." in path or "//" in path or path.endswith("/"):
+            path = os.path.normpath(path)
+        return path
+
+    return join
+
+
+def parse_hash_lines(
+    hash_lines: Iterable[str], *, root: str | Path | None = None, lineno: int = 0
+) -> Iterator[HashBlock]:
+    r"""Parse hash lines in bulk.
+
+    It is equivalent to :func:`parse_hash_line` for each hash line, but the
+    hash values of many hash lines are validated and decoded at once.
+    Consecutive hash lines with hash values of the same size are grouped into
+    a :class:`HashBlock`.
+
+    Parameters:
+        hash_lines (Iterable[str]):
+            The lines of *hash* and *name* with GNU Coreutils style.
+        root (str | Path | None, default=None):
+            The root directory.
+        lineno (int, default=0):
+            The index of the first hash line, for error reporting.
+
+    Raises:
+        ParseHashLineError:
+            If fails to parse a hash line, or the hash value is not a whole
+            number of bytes. The blocks of the previous hash lines are yielded
+            before.
+
+    Yields:
+        HashBlock:
+            The parsed block.
+
+    Examples:
+        >>> block = next(parse_hash_lines(['d41d8cd98f00b204e9800998ecf8427e *foo.txt\n']))
+        >>> block.paths, block.hash_value(0).hex()
+        (['foo.txt'], 'd41d8cd98f00b204e9800998ecf8427e')
+    """
+
+    hash_lines = list(hash_lines)
+    # Each line must end with its only newline to be parsed as a whole.
+    if all(map(_endswith_newline, hash_lines[:-1])):
+        text = "".join(hash_lines)
+        if text.count("\n") == len(hash_lines) - (not text.endswith("\n")):
+            blocks = _parse_fast(text, len(hash_lines), root)
+            if blocks is not None:
+                yield from blocks
+                return
+
+    join = _path_joiner(root)
+    lines: list[str] = []
+    paths: list[str] = []
+    hex_hash_values: list[str] = []
+    start = lineno
+    for i, hash_line in enumerate(hash_lines, lineno):
+        line = hash_line.partition("\n")[0]
+        sep = line.find(" ")
+        hex_hash_value = line[:sep]
+        path = line[sep + 1 :]
+        if path.startswith(("*", " ")) and len(path) > 1:
+            path = path[1:]
+        if sep <= 0 or not path or len(hex_hash_value) % 2:
+            # Report the previous hash lines before the invalid one.
+            if paths:
+                yield from _make_blocks(lines, paths, hex_hash_values, start)
+            raise ParseHashLineError(hash_line, i)
+
+        if hex_hash_values and len(hex_hash_value) != len(hex_hash_values[0]):
+            yield from _make_blocks(lines, paths, hex_hash_values, start)
+            lines, paths, hex_hash_values = [], [], []
+            start = i
+        lines.append(hash_line)
+        paths.append(join(path))
+        hex_hash_values.append(hex_hash_value)
+    if paths:
+        yield from _make_blocks(lines, paths, hex_hash_values, start)
+
+
+def _parse_fast(text: str, count: int, root: str | Path | None) -> list[HashBlock] | None:
+    # Parse `count` newline terminated hash lines joined into `text` with a
+    # single regular expression scan. Return `None` to fall back to the line
+    # by line parser, which reports errors, skips comments and groups hash
+    # values of different sizes.
+    if not count:
+        return []
+    matches = _HASH_LINES_RE.findall(text)
+    if len(matches) != count:
+        return None
+
+    hex_hash_values, names = zip(*matches)
+    paths: Iterable[str] = names
+    sizes = set(map(len, hex_hash_values))
+    if len(sizes) != 1 or (size := sizes.pop()) % 2:
+        return None
+    hash_values = bytes.fromhex("".join(hex_hash_values))
+
+    if (
+        os.altsep is not None
+        or text.endswith("/")
+        or _DENORMAL_RE.search(text) is not None
+        or any(mark in text for mark in _DENORMAL_MARKS)
+        or (root is not None and any(mark in text for mark in _ABSOLUTE_MARKS))
+    ):
+        paths = map(_path_joiner(root), paths)
+    elif root is not None:
+        root = os.path.normpath(root)
+        if root != os.curdir:
+            paths = map((root if root.endswith(os.sep) else root + os.sep).__add__, paths)
+    return [HashBlock(list(paths), hash_values, size // 2)]
+
+
+def _endswith_newline(line: str) -> bool:
+    return line.endswith("\n")
+
+
+def _make_blocks(lines: list[str], paths: list[str], hex_hash_values: list[str], start: int) -> Iterator[HashBlock]:
+    digest_size = len(hex_hash_values[0]) // 2
+    joined = "".join(hex_hash_values)
+    try:
+        hash_values = bytes.fromhex(joined)
+    except ValueError:
+        hash_values = b""
+    # Whitespace is skipped by `bytes.fromhex`, so check the length too.
+    if len(hash_values) * 2 == len(joined):
+        yield HashBlock(paths, hash_values, digest_size)
+        return
+
+    # Find the invalid hash value only if the fast path fails.
+    for i, hex_hash_value in enumerate(hex_hash_values):
+        if _HEX_RE.fullmatch(hex_hash_value) is None:
+            if i > 0:
+                yield HashBlock(paths[:i], bytes.fromhex(joined[: i * 2 * digest_size]), digest_size)
+            raise ParseHashLineError(lines[i], start + i)
+
+
 def generate_hash_line(path: str, hash_function: Callable[[str], bytes], *, root: str | Path | None = None) -> str:
     """Generate hash line.
 
@@ -208,6 +396,69 @@ class HashFileReader:
 
     __iter__ = iter
 
+    def iter_blocks(self, *, root: str | Path | None = None) -> Iterator[HashBlock]:
+        """Yield hash lines parsed in bulk.
+
+        The hash file is read in large blocks and parsed by
+        :func:`parse_hash_lines`, which is much faster than
+        :meth:`HashFileReader.iter2` for large hash files.
+
+        Parameters:
+            root (str | Path | None, default=None):
+                The root directory.
+
+        Raises:
+            ParseHashLineError:
+                If fails to parse a hash line. The ``lineno`` counts hash
+                lines only, the same as :meth:`HashFileReader.iter`.
+
+        Yields:
+            HashBlock:
+                The parsed block.
+        """
+
+        lineno = 0
+        with self:
+            while lines := self.file.readlines(_BLOCKSIZE):
+                # Lines read by `readlines` end with their only newline.
+                blocks = _parse_fast("".join(lines), len(lines), root)
+                if blocks is not None:
+                    yield from blocks
+                    lineno += sum(len(block.paths) for block in blocks)
+                    continue
+
+                # Skip comments and blank lines.
+                hash_lines = [line for line in lines if not (line.startswith("#") or line.isspace())]
+                yield from parse_hash_lines(hash_lines, root=root, lineno=lineno)
+                lineno += len(hash_lines)
+
+    def lookup(self, path: str, *, root: str | Path | None = None) -> str | None:
+        """Look up hash by name.
+
+        A sidecar index of the hash file is built on demand, so that later
+        lookups take a binary search instead of a scan, see
+        :func:`gethash.manifest.lookup_hash_value`. The underlying file is
+        closed, the same as after :meth:`HashFileReader.iter`, but more
+        lookups are allowed.
+
+        Parameters:
+            path (str):
+                The path of a file.
+            root (str | Path | None, default=None):
+                The root directory. If ``None``, ``path`` is looked up as
+                written in the hash file.
+
+        Returns:
+            str | None:
+                ``hash``, or ``None`` if ``path`` is not found.
+        """
+
+        from .manifest import lookup_hash_value
+
+        with self:
+            hash_value = lookup_hash_value(self.name, path, root=root)
+        return None if hash_value is None else hash_value.hex()
+
     def iter2(self, *, root: str | Path | None = None) -> Iterator[tuple[str, str]]:
         """Yield name and hash.
 
@@ -258,27 +509,77 @@ class HashFileWriter:
     """General hash file writer.
 
     The :class:`HashFileWriter` supports the context manager protocol for
-    calling :meth:`HashFileWriter.close` automatically.
+    calling :meth:`HashFileWriter.close` automatically, or
+    :meth:`HashFileWriter.abort` if an exception is raised.
 
     Parameters:
         filepath (str | Path):
             The path of a hash file.
+        buffer_size (int, default=-1):
+            The size of the write buffer in bytes. If negative, use the
+            default buffer size.
+        atomic (bool, default=False):
+            If ``True``, write to a temporary file which replaces the hash
+            file on :meth:`HashFileWriter.close`, so that readers never see a
+            partial hash file. The temporary file takes the mode and owner of
+            the previous hash file. Symbolic links, pipes and devices, e.g.
+            ``/dev/stdout``, are always written directly.
     """
 
-    def __init__(self, filepath: str | Path) -> None:
+    def __init__(self, filepath: str | Path, *, buffer_size: int = -1, atomic: bool = False) -> None:
+        if buffer_size == 0:
+            raise ValueError("buffer_size must be positive or negative, not 0")
+
         self.name = str(filepath)
-        self.file = open(filepath, "w", encoding="utf-8")  # noqa: SIM115
+        st = None
+        if atomic:
+            try:
+                st = os.lstat(self.name)
+            except FileNotFoundError:
+                pass
+            else:
+                # Replacing anything but a regular file would detach it.
+                atomic = stat.S_ISREG(st.st_mode)
+        self.atomic = atomic
+        self.tmpname = f"{self.name}.{os.getpid()}.tmp" if atomic else self.name
+        self.file = open(self.tmpname, "w", encoding="utf-8", buffering=buffer_size)  # noqa: SIM115
+        if atomic and st is not None:
+            _copy_mode(self.tmpname, st)
 
     def __enter__(self) -> Self:
         return self
 
     def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
-        self.close()
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
 
     def close(self) -> None:
-        """Close the underlying file."""
-
+        """Close the underlying file, and replace the hash file if atomic."""
+
+        if self.file.closed:
+            return
+        if not self.atomic:
+            self.file.close()
+            return
+        try:
+            self.file.close()
+            os.replace(self.tmpname, self.name)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(self.tmpname)
+            raise
+
+    def abort(self) -> None:
+        """Close the underlying file, and keep the previous hash file if atomic."""
+
+        if self.file.closed:
+            return
         self.file.close()
+        if self.atomic:
+            with suppress(OSError):
+                os.remove(self.tmpname)
 
     def write_hash_line(self, hash_line: str) -> None:
         """Write hash line.
@@ -289,3 +590,21 @@ class HashFileWriter:
         """
 
         self.file.write(hash_line)
+
+    def write_hash_lines(self, hash_lines: Iterable[str]) -> None:
+        """Write hash lines.
+
+        Parameters:
+            hash_lines (Iterable[str]):
+                The lines of *hash* and *name* with GNU Coreutils style.
+        """
+
+        self.file.writelines(hash_lines)
+
+
+def _copy_mode(path: str, st: os.stat_result) -> None:
+    # Only the superuser may give a file away, so keep the new owner then.
+    if hasattr(os, "chown") and (st.st_uid, st.st_gid) != (os.getuid(), os.getgid()):
+        with suppress(OSError):
+            os.chown(path, st.st_uid, st.st_gid)
+    os.chmod(path, stat.S_IMODE(st.st_mode))
@@ -1,16 +1,58 @@
 from __future__ import annotations
 
+import copy
+import functools
+import itertools
+import mmap
 import os
+import stat
+import threading
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Protocol
+from queue import SimpleQueue
+from typing import IO, TYPE_CHECKING, Any, Callable, Protocol, TypeVar, Union, cast
 
-from tqdm import tqdm
-from typing_extensions import Self
+from .chunksize import select_chunksize
+from .utils.concurrent import SerialExecutor, imap_ordered
+from .utils.entry import stat_path
+from .utils.strxor import XorAccumulator
 
-from .utils.strxor import strxor
+if TYPE_CHECKING:
+    import asyncio
+    from io import BufferedReader
+
+    from tqdm import tqdm
+    from typing_extensions import Self
+
+    from .cache import MerkleCache
+
+_T = TypeVar("_T")
 
 _CHUNKSIZE = 0x100000  # 1 MiB
 
+_ENGINES = ("buffered", "mmap", "readahead")
+
+_DIR_MODES = ("xor", "merkle")
+
+_QUEUE_DEPTH = 3  # triple buffering
+
+# The number of files hashed by a worker thread of `_hash_dir` at once.
+_DIR_BATCHSIZE = 64
+
+# The item passed from the reader thread of the `readahead` engine.
+_Filled = Union[tuple[memoryview, int], BaseException, None]
+
+# The hash contexts and hashers built by `ProcessHasher` in the current
+# process, least recently used first.
+_PROCESS_HASHERS: OrderedDict[str, tuple[HashContext, Hasher]] = OrderedDict()
+_PROCESS_HASHERS_LOCK = threading.Lock()
+
+# The number of hashers kept by `ProcessHasher` in each process.
+_PROCESS_HASHERS_SIZE = 8
+
 
 class IsADirectory(OSError):
     """Raised by :meth:`Hasher.__call__`."""
@@ -29,10 +71,121 @@ class HashContext(Protocol):
     def digest(self) -> bytes:
         """Return the digest of the data passed so far."""
 
-    def update(self, data: bytes) -> None:
+    def update(self, data: bytes | bytearray | memoryview) -> None:
         """Pass data to update the current hash context."""
 
 
+class _NullBar:
+    # A stand-in for a disabled progress bar, which saves importing `tqdm`.
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def update(self, n: float = 1) -> None:
+        pass
+
+
+class HashContextGroup:
+    """Hash context which passes the same data to several hash contexts.
+
+    The digest is the concatenation of the digests of all hash contexts, which
+    can be split by :meth:`HashContextGroup.split`. It allows a :class:`Hasher`
+    to read data once for several algorithms.
+
+    Parameters:
+        ctxs (Sequence[HashContext]):
+            The hash contexts.
+        threads (bool, default=False):
+            If ``True``, update the hash contexts on separate threads. This
+            helps if the hash contexts release the GIL, e.g. ``hashlib``. The
+            threads are shared by all copies and shut down by
+            :meth:`HashContextGroup.close`.
+    """
+
+    def __init__(self, ctxs: Sequence[HashContext], *, threads: bool = False) -> None:
+        if not ctxs:
+            raise ValueError("ctxs must not be empty")
+
+        self.ctxs = list(ctxs)
+        self.threads = threads
+        self._executor = ThreadPoolExecutor(len(self.ctxs)) if threads and len(self.ctxs) > 1 else None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the threads updating the hash contexts, if any."""
+
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    @classmethod
+    def from_factories(cls, factories: Sequence[Callable[[], HashContext]], *, threads: bool = False) -> Self:
+        """Create a hash context group from hash context factories.
+
+        It is picklable via :func:`functools.partial` if ``factories`` are
+        picklable, so it can be used as the factory of :class:`ProcessHasher`.
+        """
+
+        return cls([factory() for factory in factories], threads=threads)
+
+    @property
+    def digest_size(self) -> int:
+        """The size of the resulting hash in bytes."""
+
+        return sum(self.digest_sizes)
+
+    @property
+    def digest_sizes(self) -> list[int]:
+        """The sizes of the resulting hashes of each hash context in bytes."""
+
+        return [ctx.digest_size for ctx in self.ctxs]
+
+    def copy(self) -> Self:
+        """Return a copy the current hash context."""
+
+        # Share the threads between copies.
+        other = copy.copy(self)
+        other.ctxs = [ctx.copy() for ctx in self.ctxs]
+        return other
+
+    def digest(self) -> bytes:
+        """Return the concatenated digests of the data passed so far."""
+
+        return b"".join(ctx.digest() for ctx in self.ctxs)
+
+    def update(self, data: bytes | bytearray | memoryview) -> None:
+        """Pass data to update all hash contexts."""
+
+        if self._executor is None:
+            for ctx in self.ctxs:
+                ctx.update(data)
+            return
+
+        # Wait for all updates, since the caller may reuse the buffer.
+        for future in [self._executor.submit(ctx.update, data) for ctx in self.ctxs]:
+            future.result()
+
+    def split(self, digest: bytes) -> list[bytes]:
+        """Split the digest of this group into the digests of each hash context."""
+
+        result = []
+        offset = 0
+        for size in self.digest_sizes:
+            result.append(digest[offset : offset + size])
+            offset += size
+        return result
+
+
 class Hasher:
     """General hash values generator.
 
@@ -42,21 +195,64 @@ class Hasher:
     Parameters:
         ctx (HashContext):
             The hash context prototype used to generate hash values.
-        chunksize (int | None, default=None):
-            The chunk size for reading data from files.
+        chunksize (int | str | None, default=None):
+            The chunk size for reading data from files. If ``'auto'``, select
+            the chunk size for each file from its size, the block size of the
+            file system and ``preferred_chunksize``. If ``None`` or ``0``, use
+            1 MiB. If negative, read all bytes at once.
         tqdm_args (dict[str, Any] | None, default=None):
             The arguments passed to the ``tqdm_type``.
         tqdm_type (Type[tqdm] | None, default=None):
             The ``tqdm`` type.
+        engine (str | None, default=None):
+            The method for reading data from files. If ``'buffered'``, read
+            chunks into a reusable buffer; if ``'mmap'``, pass slices of the memory-mapped
+            file to the hash context without copying. The ``'mmap'`` engine falls
+            back to ``'buffered'`` for empty files and files that cannot be
+            memory-mapped, e.g. pipes; if ``'readahead'``, read chunks on a
+            separate thread while hashing the previous ones, which keeps both
+            slow disks and the CPU busy. If ``None``, use ``'buffered'``.
+        queue_depth (int | None, default=None):
+            The number of chunk buffers of the ``'readahead'`` engine. If
+            ``None``, use triple buffering.
+        preferred_chunksize (int | None, default=None):
+            The chunk size of the ``'auto'`` mode for large files, e.g. from
+            :func:`gethash.chunksize.calibrate`. If ``None``, use 1 MiB.
+        jobs (int | None, default=None):
+            The number of threads hashing the files of a directory. If
+            ``None``, hash them serially.
+        dir_mode (str | None, default=None):
+            The method for combining the hash values in a directory. If
+            ``'xor'``, XOR the hash values of all files in the tree; if
+            ``'merkle'``, hash the names, types and hash values of the sorted
+            children of each directory, so that renamed and duplicate files
+            change the result. If ``None``, use ``'xor'``.
+        merkle_cache (MerkleCache | None, default=None):
+            The persistent directory nodes of the ``'merkle'`` mode. Only the
+            changed files are rehashed if it is given.
+        executor (Executor | None, default=None):
+            The executor hashing the files of directories, which is shared by
+            all calls, e.g. with the executor hashing other files, so that
+            they are limited together. A directory must not be hashed by a
+            worker of this executor, which would wait for the other workers.
+            If ``None``, create a thread pool of ``jobs`` workers for each
+            directory.
     """
 
     def __init__(
         self,
         ctx: HashContext,
         *,
-        chunksize: int | None = None,
+        chunksize: int | str | None = None,
         tqdm_args: dict[str, Any] | None = None,
         tqdm_type: type[tqdm] | None = None,
+        engine: str | None = None,
+        queue_depth: int | None = None,
+        preferred_chunksize: int | None = None,
+        jobs: int | None = None,
+        dir_mode: str | None = None,
+        merkle_cache: MerkleCache | None = None,
+        executor: Executor | None = None,
     ) -> None:
         if chunksize is None:
             chunksize = _CHUNKSIZE
@@ -65,9 +261,21 @@ class Hasher:
                 chunksize = _CHUNKSIZE
             elif chunksize < 0:
                 chunksize = -1  # -1 for read all bytes
+        elif isinstance(chunksize, str):
+            if chunksize != "auto":
+                raise ValueError(f"chunksize must be 'auto' if it is str, got {chunksize!r}")
         else:
             tn = type(chunksize).__name__
-            raise TypeError(f"chunksize must be int or None, not {tn}")
+            raise TypeError(f"chunksize must be int, str or None, not {tn}")
+
+        if preferred_chunksize is None:
+            preferred_chunksize = _CHUNKSIZE
+        elif isinstance(preferred_chunksize, int):
+            if preferred_chunksize <= 0:
+                raise ValueError(f"preferred_chunksize must be positive, got {preferred_chunksize!r}")
+        else:
+            tn = type(preferred_chunksize).__name__
+            raise TypeError(f"preferred_chunksize must be int or None, not {tn}")
 
         if tqdm_args is None:
             tqdm_args = {}
@@ -83,12 +291,61 @@ class Hasher:
         tqdm_args.setdefault("unit_divisor", 1024)
 
         if tqdm_type is None:
-            tqdm_type = tqdm
+            if tqdm_args.get("disable") is True:
+                tqdm_type = cast("type[tqdm]", _NullBar)
+            else:
+                from tqdm import tqdm as default_tqdm_type
+
+                tqdm_type = default_tqdm_type
+
+        if engine is None:
+            engine = "buffered"
+        elif isinstance(engine, str):
+            if engine not in _ENGINES:
+                raise ValueError(f"engine must be in {_ENGINES!r}, got {engine!r}")
+        else:
+            tn = type(engine).__name__
+            raise TypeError(f"engine must be str or None, not {tn}")
+
+        if queue_depth is None:
+            queue_depth = _QUEUE_DEPTH
+        elif isinstance(queue_depth, int):
+            # The reader thread needs a free buffer while one is being hashed.
+            if queue_depth < 2:
+                raise ValueError(f"queue_depth must be at least 2, got {queue_depth!r}")
+        else:
+            tn = type(queue_depth).__name__
+            raise TypeError(f"queue_depth must be int or None, not {tn}")
+
+        if jobs is None:
+            jobs = 1
+        elif isinstance(jobs, int):
+            if jobs < 1:
+                raise ValueError(f"jobs must be positive, got {jobs!r}")
+        else:
+            tn = type(jobs).__name__
+            raise TypeError(f"jobs must be int or None, not {tn}")
+
+        if dir_mode is None:
+            dir_mode = "xor"
+        elif isinstance(dir_mode, str):
+            if dir_mode not in _DIR_MODES:
+                raise ValueError(f"dir_mode must be in {_DIR_MODES!r}, got {dir_mode!r}")
+        else:
+            tn = type(dir_mode).__name__
+            raise TypeError(f"dir_mode must be str or None, not {tn}")
 
         self._ctx = ctx.copy()
         self.chunksize = chunksize
         self.tqdm_args = tqdm_args
         self.tqdm_type = tqdm_type
+        self.engine = engine
+        self.queue_depth = queue_depth
+        self.preferred_chunksize = preferred_chunksize
+        self.jobs = jobs
+        self.dir_mode = dir_mode
+        self.merkle_cache = merkle_cache
+        self.executor = executor
 
     def __call__(
         self, path: str | Path, start: int | None = None, stop: int | None = None, *, dir_ok: bool = False
@@ -97,7 +354,9 @@ class Hasher:
 
         Parameters:
             path (str | Path):
-                The path of a file or a directory.
+                The path of a file or a directory. The status of a
+                :class:`~gethash.utils.entry.PathEntry` is reused to tell
+                files from directories.
             start (int | None, default=None):
                 The start offset of the file or files in the directory.
             stop (int | None, default=None):
@@ -114,53 +373,525 @@ class Hasher:
                 The hash value of the file or the directory.
         """
 
+        st = stat_path(path)
         path = Path(path)
-        if path.is_dir():
+        if stat.S_ISDIR(st.st_mode):
             if dir_ok:
                 return self._hash_dir(path, start, stop)
             raise IsADirectory(f"{str(path)!r} is a directory")
         return self._hash_file(path, start, stop)
 
-    def _hash_dir(self, dirpath: Path, start: int | None = None, stop: int | None = None) -> bytes:
-        # The initial hash value is all zeros.
-        value = bytearray(self._ctx.digest_size)
-        for entry in dirpath.iterdir():
-            if entry.is_dir():
-                other = self._hash_dir(entry, start, stop)
-            else:
-                other = self._hash_file(entry, start, stop)
-            # Just XOR each byte string as the result of hashing.
-            strxor(value, other, value)
-        return bytes(value)
+    def hash_stream(
+        self,
+        stream: IO[bytes] | Iterable[bytes],
+        start: int | None = None,
+        stop: int | None = None,
+        *,
+        tee: Callable[[memoryview], Any] | None = None,
+    ) -> bytes:
+        """Return the hash value of a byte stream.
+
+        The stream is read in chunks of a constant size, so data from a pipe,
+        an HTTP body or a decompressor is hashed without a temporary file.
+
+        Parameters:
+            stream (IO[bytes] | Iterable[bytes]):
+                A binary file object, e.g. ``sys.stdin.buffer``, or an iterable
+                of bytes-like objects.
+            start (int | None, default=None):
+                The number of leading bytes which are not hashed.
+            stop (int | None, default=None):
+                The offset where reading stops. If ``None``, read until the
+                end of the stream.
+            tee (Callable[[memoryview], Any] | None, default=None):
+                The function called with each chunk read from the stream,
+                including the bytes before ``start``, e.g. the ``write``
+                method of a file, so that data is copied while it is hashed.
+                The chunk may be reused after the call returns.
+
+        Returns:
+            bytes:
+                The hash value of the stream.
+        """
 
-    def _hash_file(self, filepath: Path, start: int | None = None, stop: int | None = None) -> bytes:
-        # Clamp `(start, stop)` to `(0, filesize)`.
-        filesize = filepath.stat().st_size
         if start is None or start < 0:
             start = 0
-        if stop is None or stop > filesize:
-            stop = filesize
-        if start > stop:
+        if stop is not None and start > stop:
             raise ValueError(f"require start <= stop, but {start!r} > {stop!r}")
 
-        # Precompute some arguments for chunking.
-        total = stop - start
-        chunksize = self.chunksize
-        if chunksize > 0:
-            count, remainsize = divmod(total, chunksize)
-        else:
-            count = 1
-            remainsize = 0
+        # The size of a stream is unknown, so `'auto'` and negative chunk
+        # sizes fall back to the preferred chunk size.
+        chunksize = self.chunksize if isinstance(self.chunksize, int) and self.chunksize > 0 else None
+        chunksize = chunksize or self.preferred_chunksize
 
         ctx = self._ctx.copy()
+        offset = 0
+        total = None if stop is None else stop - start
+        with self.tqdm_type(total=total, **self.tqdm_args) as bar:
+            for chunk in _iter_chunks(stream, chunksize, stop):
+                n = len(chunk)
+                if tee is not None:
+                    tee(chunk)
+                if offset + n > start:
+                    with chunk[max(start - offset, 0) :] as data:
+                        ctx.update(data)
+                    bar.update(min(n, offset + n - start))
+                offset += n
+        return ctx.digest()
+
+    def _hash_dir(self, dirpath: Path, start: int | None = None, stop: int | None = None) -> bytes:
+        # Use the shared executor, or a thread pool for this directory.
+        executor = self.executor
+        if executor is None:
+            executor = SerialExecutor() if self.jobs == 1 else ThreadPoolExecutor(self.jobs)
+        try:
+            return self._hash_tree(dirpath, start, stop, executor)
+        finally:
+            if executor is not self.executor:
+                executor.shutdown()
+
+    def _hash_tree(self, dirpath: Path, start: int | None, stop: int | None, executor: Executor) -> bytes:
+        if self.dir_mode == "merkle":
+            try:
+                return self._hash_node(dirpath, start, stop, executor)
+            finally:
+                if self.merkle_cache is not None:
+                    self.merkle_cache.commit()
+
+        # The hash value of a directory is the XOR of the hash values of its
+        # children, so it is also the XOR of the hash values of all files in
+        # the tree, in any order.
+        files = _walk_files(dirpath)
+        if isinstance(executor, SerialExecutor):
+            return self._hash_files(files, start, stop)
+
+        # Each batch of files is reduced to one partial value in a worker.
+        acc = XorAccumulator(self._ctx.digest_size)
+
+        def submit(batch: list[Path]) -> Future[bytes]:
+            return executor.submit(self._hash_files, batch, start, stop)
+
+        batches = _batched(files, _DIR_BATCHSIZE)
+        acc.update_many(future.result() for _, future in imap_ordered(submit, batches, window=2 * self.jobs))
+        return acc.digest()
+
+    def _hash_node(self, dirpath: Path, start: int | None, stop: int | None, executor: Executor) -> bytes:
+        cached = None if self.merkle_cache is None else self.merkle_cache.get(dirpath, start, stop)
+        cached_children = {} if cached is None else cached[1]
+
+        # Hash the changed files concurrently while visiting the subdirectories.
+        children: dict[str, tuple[str, int, int, int, bytes | Future[bytes]]] = {}
+        with os.scandir(dirpath) as it:
+            entries = list(it)
+        for entry in entries:
+            if entry.is_dir():
+                continue
+            st = entry.stat()
+            meta = ("f", st.st_size, st.st_mtime_ns, st.st_ino)
+            child = cached_children.get(entry.name)
+            if child is not None and child[:4] == meta:
+                children[entry.name] = child
+            else:
+                children[entry.name] = (*meta, executor.submit(self._hash_file, Path(entry.path), start, stop))
+        for entry in entries:
+            if entry.is_dir():
+                children[entry.name] = ("d", 0, 0, 0, self._hash_node(Path(entry.path), start, stop, executor))
+        resolved = {
+            name: (kind, size, mtime_ns, ino, value if isinstance(value, bytes) else value.result())
+            for name, (kind, size, mtime_ns, ino, value) in children.items()
+        }
+
+        if cached is not None and resolved == cached_children:
+            return cached[0]
+        hash_value = self._merkle_node(resolved)
+        if self.merkle_cache is not None:
+            self.merkle_cache.put(dirpath, hash_value, resolved, start, stop)
+        return hash_value
+
+    def _merkle_node(self, children: dict[str, tuple[str, int, int, int, bytes]]) -> bytes:
+        # Hash each child as its kind, its name and its hash value, and do it
+        # for each algorithm of a group separately.
+        ctx = self._ctx.copy()
+        group = ctx if isinstance(ctx, HashContextGroup) else None
+        ctxs = [ctx] if group is None else group.ctxs
+        for name in sorted(children, key=os.fsencode):
+            kind, *_, hash_value = children[name]
+            bname = os.fsencode(name)
+            header = kind.encode() + len(bname).to_bytes(8, "big") + bname
+            values = [hash_value] if group is None else group.split(hash_value)
+            for c, value in zip(ctxs, values):
+                c.update(header + value)
+        return ctx.digest()
+
+    def _hash_files(self, files: Iterable[Path], start: int | None = None, stop: int | None = None) -> bytes:
+        # The initial hash value is all zeros. Just XOR each byte string as
+        # the result of hashing.
+        acc = XorAccumulator(self._ctx.digest_size)
+        acc.update_many(self._hash_file(filepath, start, stop) for filepath in files)
+        return acc.digest()
+
+    def _hash_file(self, filepath: Path, start: int | None = None, stop: int | None = None) -> bytes:
         with open(filepath, "rb") as f:
-            f.seek(start, os.SEEK_SET)
+            # Take the size of the opened file, which may have changed since
+            # the file was found.
+            st = os.fstat(f.fileno())
+
+            # Clamp `(start, stop)` to `(0, filesize)`.
+            filesize = st.st_size
+            if start is None or start < 0:
+                start = 0
+            if stop is None or stop > filesize:
+                stop = filesize
+            if start > stop:
+                raise ValueError(f"require start <= stop, but {start!r} > {stop!r}")
+
+            total = stop - start
+            if self.chunksize == "auto":
+                # The block size is not available on Windows.
+                chunksize = select_chunksize(total, getattr(st, "st_blksize", 0), self.preferred_chunksize)
+            else:
+                # Read all bytes in the range at once if `chunksize` is negative.
+                chunksize = cast(int, self.chunksize)
+                if chunksize < 0:
+                    chunksize = total
+
+            ctx = self._ctx.copy()
             with self.tqdm_type(total=total, **self.tqdm_args) as bar:
-                for _ in range(count):
-                    chunk = f.read(chunksize)
-                    ctx.update(chunk)
-                    bar.update(chunksize)
-                remain = f.read(remainsize)
-                ctx.update(remain)
-                bar.update(remainsize)
+                if self.engine == "mmap":
+                    done = self._update_mmap(ctx, f, start, stop, chunksize, bar)
+                elif self.engine == "readahead":
+                    done = self._update_readahead(ctx, f, start, stop, chunksize, bar)
+                else:
+                    done = False
+                if not done:
+                    self._update_buffered(ctx, f, start, stop, chunksize, bar)
         return ctx.digest()
+
+    def _update_buffered(
+        self, ctx: HashContext, f: BufferedReader, start: int, stop: int, chunksize: int, bar: tqdm
+    ) -> None:
+        total = stop - start
+
+        # Reuse one buffer for all chunks instead of allocating one per chunk.
+        buffer = bytearray(min(chunksize, total))
+        with memoryview(buffer) as view:
+            f.seek(start, os.SEEK_SET)
+            remain = total
+            while remain > 0:
+                n = f.readinto(view[: min(chunksize, remain)])
+                if not n:
+                    break  # the file has been truncated
+                with view[:n] as chunk:
+                    ctx.update(chunk)
+                bar.update(n)
+                remain -= n
+
+    def _update_mmap(
+        self, ctx: HashContext, f: BufferedReader, start: int, stop: int, chunksize: int, bar: tqdm
+    ) -> bool:
+        # Only regular files with data can be memory-mapped.
+        if start == stop or not stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            return False
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, OverflowError, ValueError):
+            return False
+
+        with mm, memoryview(mm) as view:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            # The file may have been truncated since its size was read.
+            stop = min(stop, len(mm))
+            for offset in range(start, stop, chunksize):
+                # Release each slice, otherwise the map cannot be closed.
+                with view[offset : min(offset + chunksize, stop)] as chunk:
+                    ctx.update(chunk)
+                    bar.update(len(chunk))
+        return True
+
+    def _update_readahead(
+        self, ctx: HashContext, f: BufferedReader, start: int, stop: int, chunksize: int, bar: tqdm
+    ) -> bool:
+        # There is nothing to overlap for a single chunk.
+        total = stop - start
+        if total <= chunksize:
+            return False
+
+        # The buffers are preallocated and passed back and forth between the
+        # reader thread and this thread, so at most `queue_depth` chunks are
+        # held in memory. `None` tells the other side to stop.
+        free: SimpleQueue[memoryview | None] = SimpleQueue()
+        filled: SimpleQueue[_Filled] = SimpleQueue()
+        for _ in range(self.queue_depth):
+            free.put(memoryview(bytearray(chunksize)))
+
+        def read() -> None:
+            try:
+                f.seek(start, os.SEEK_SET)
+                remain = total
+                while remain > 0 and (buffer := free.get()) is not None:
+                    n = f.readinto(buffer[: min(chunksize, remain)])
+                    if not n:
+                        break  # the file has been truncated
+                    filled.put((buffer, n))
+                    remain -= n
+            except BaseException as e:  # noqa: BLE001
+                filled.put(e)
+            else:
+                filled.put(None)
+
+        reader = threading.Thread(target=read, name="gethash-readahead", daemon=True)
+        reader.start()
+        try:
+            while (item := filled.get()) is not None:
+                if isinstance(item, BaseException):
+                    raise item
+                buffer, n = item
+                with buffer[:n] as chunk:
+                    ctx.update(chunk)
+                bar.update(n)
+                free.put(buffer)
+        finally:
+            # Stop the reader thread if hashing fails.
+            free.put(None)
+            reader.join()
+        return True
+
+
+def _walk_files(dirpath: Path) -> Iterator[Path]:
+    # Visit directories with a stack instead of recursion, which is limited
+    # for deep trees. Symbolic links to directories are followed.
+    stack = [dirpath]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir():
+                    stack.append(Path(entry.path))
+                else:
+                    yield Path(entry.path)
+
+
+def _iter_chunks(stream: IO[bytes] | Iterable[bytes], chunksize: int, stop: int | None) -> Iterator[memoryview]:
+    # Yield the chunks of a stream up to `stop` as byte views, which are
+    # released when the next chunk is read.
+    remain = -1 if stop is None else stop
+    if hasattr(stream, "readinto"):
+        # Reuse one buffer for all chunks instead of allocating one per chunk.
+        with memoryview(bytearray(chunksize)) as view:
+            while remain:
+                n = stream.readinto(view[: chunksize if remain < 0 else min(chunksize, remain)])
+                if not n:
+                    break
+                with view[:n] as chunk:
+                    yield chunk
+                remain -= n if remain > 0 else 0
+        return
+
+    if hasattr(stream, "read"):
+        chunks: Iterable[bytes] = iter(lambda: stream.read(chunksize if remain < 0 else min(chunksize, remain)), b"")
+    else:
+        chunks = stream
+    for data in chunks:
+        if not remain:
+            break
+        with memoryview(data) as view, view.cast("B") as chunk:
+            if 0 < remain < len(chunk):
+                with chunk[:remain] as head:
+                    yield head
+                return
+            yield chunk
+            if remain > 0:
+                remain -= len(chunk)
+
+
+def _batched(iterable: Iterable[_T], n: int) -> Iterator[list[_T]]:
+    it = iter(iterable)
+    while batch := list(itertools.islice(it, n)):
+        yield batch
+
+
+class ProcessHasher:
+    """Picklable hash function for worker processes.
+
+    Most hash contexts cannot be pickled, so they cannot be shipped to worker
+    processes. Instead, the :class:`ProcessHasher` ships the picklable
+    ``factory`` and each worker process rebuilds the hash context and the
+    :class:`Hasher` once, on the first call.
+
+    The progress bar is always disabled since worker processes share the
+    terminal. Each process keeps the hashers of the last few
+    :class:`ProcessHasher` objects called in it.
+
+    Parameters:
+        factory (Callable[[], HashContext]):
+            The picklable function used to create the hash context, e.g.
+            ``functools.partial(backend.load_ctx, name)``.
+        start (int | None, default=None):
+            The start offset of the file or files in the directory.
+        stop (int | None, default=None):
+            The stop offset of the file or files in the directory.
+        dir_ok (bool, default=False):
+            If ``True``, enable directory hashing.
+        **kwargs (Any):
+            The keyword arguments passed to :class:`Hasher` in workers.
+
+    Examples:
+        >>> from concurrent.futures import ProcessPoolExecutor
+        >>> from gethash.utils.concurrent import BatchExecutor
+        >>> with BatchExecutor(ProcessPoolExecutor(), 16) as executor:  # doctest: +SKIP
+        ...     hash_values = list(executor.map(ProcessHasher(hashlib.md5), paths))
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], HashContext],
+        *,
+        start: int | None = None,
+        stop: int | None = None,
+        dir_ok: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        kwargs["tqdm_args"] = {"disable": True}
+        self.factory = factory
+        self.kwargs = kwargs
+        self.start = start
+        self.stop = stop
+        self.dir_ok = dir_ok
+        # Identify the hasher across pickling.
+        self._token = uuid.uuid4().hex
+
+    def __call__(self, path: str | Path) -> bytes:
+        """Return the hash value of a file or a directory.
+
+        See :meth:`Hasher.__call__` for details.
+        """
+
+        with _PROCESS_HASHERS_LOCK:
+            entry = _PROCESS_HASHERS.get(self._token)
+            if entry is None:
+                ctx = self.factory()
+                entry = _PROCESS_HASHERS[self._token] = (ctx, Hasher(ctx, **self.kwargs))
+                # Evict the least recently used hashers, and stop their threads.
+                while len(_PROCESS_HASHERS) > _PROCESS_HASHERS_SIZE:
+                    _, (old_ctx, _) = _PROCESS_HASHERS.popitem(last=False)
+                    if isinstance(old_ctx, HashContextGroup):
+                        old_ctx.close()
+            else:
+                _PROCESS_HASHERS.move_to_end(self._token)
+        return entry[1](path, self.start, self.stop, dir_ok=self.dir_ok)
+
+
+class AsyncHasher:
+    """Hash function for asyncio applications.
+
+    Files are read and hashed on a bounded thread pool, so the event loop is
+    never blocked by reading files or updating hash contexts. At most
+    ``limit`` files are hashed at the same time, and other calls wait without
+    occupying the thread pool.
+
+    The progress bar is disabled by default since concurrent calls share the
+    terminal.
+
+    Parameters:
+        ctx (HashContext):
+            The hash context.
+        limit (int, default=4):
+            The maximum number of files hashed concurrently.
+        executor (Executor | None, default=None):
+            The executor used to hash files. If ``None``, a thread pool of
+            ``limit`` workers is created and shut down by :meth:`close`.
+        **kwargs (Any):
+            The keyword arguments passed to :class:`Hasher`.
+
+    Examples:
+        >>> async def main():  # doctest: +SKIP
+        ...     async with AsyncHasher(hashlib.md5()) as hasher:
+        ...         async for path, hash_value in hasher.map(paths):
+        ...             print(hash_value.hex(), path)
+    """
+
+    def __init__(self, ctx: HashContext, *, limit: int = 4, executor: Executor | None = None, **kwargs: Any) -> None:
+        if limit <= 0:
+            raise ValueError(f"limit must be positive, got {limit!r}")
+
+        kwargs.setdefault("tqdm_args", {"disable": True})
+        self.hasher = Hasher(ctx, **kwargs)
+        self.limit = limit
+        self._own_executor = executor is None
+        self.executor = ThreadPoolExecutor(limit) if executor is None else executor
+        # Create the semaphore in the event loop on the first call.
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the thread pool if it is created by the hasher."""
+
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __call__(
+        self, path: str | Path, start: int | None = None, stop: int | None = None, *, dir_ok: bool = False
+    ) -> bytes:
+        """Return the hash value of a file or a directory.
+
+        See :meth:`Hasher.__call__` for details.
+        """
+
+        import asyncio
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            task = functools.partial(self.hasher, path, start, stop, dir_ok=dir_ok)
+            return await loop.run_in_executor(self.executor, task)
+
+    async def map(
+        self, paths: Iterable[str | Path], start: int | None = None, stop: int | None = None, *, dir_ok: bool = False
+    ) -> AsyncIterator[tuple[str | Path, bytes]]:
+        """Hash files concurrently and yield the hash values in input order.
+
+        The paths are consumed lazily, so that only a few more files than
+        ``limit`` are pending at any time.
+
+        Parameters:
+            paths (Iterable[str | Path]):
+                The paths of files or directories.
+            start (int | None, default=None):
+                The start offset of the files.
+            stop (int | None, default=None):
+                The stop offset of the files.
+            dir_ok (bool, default=False):
+                If ``True``, enable directory hashing.
+
+        Raises:
+            Exception:
+                The first error raised by hashing, after which the pending
+                calls are cancelled.
+
+        Yields:
+            tuple[str | Path, bytes]:
+                ``(path, hash_value)``.
+        """
+
+        import asyncio
+
+        window = 2 * self.limit
+        pending: deque[tuple[str | Path, asyncio.Task[bytes]]] = deque()
+        try:
+            for path in paths:
+                pending.append((path, asyncio.ensure_future(self(path, start, stop, dir_ok=dir_ok))))
+                if len(pending) >= window:
+                    done_path, task = pending.popleft()
+                    yield done_path, await task
+            while pending:
+                done_path, task = pending.popleft()
+                yield done_path, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
@@ -0,0 +1,536 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterator
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .core import HashBlock, HashFileReader, HashFileWriter, _path_joiner, format_hash_line
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+# The layout of a binary hash file, where integers are little-endian and each
+# section starts at a multiple of 8 bytes:
+#
+#   header    magic, version, digest size, count, stamp of the text hash
+#             file converted from, size of algorithm name
+#   algorithm the ASCII name of the hash algorithm
+#   digests   `count` hash values of `digest size` bytes, in file order
+#   offsets   `count + 1` 64-bit offsets of the paths into the path table
+#   order     `count` 64-bit indexes of the paths in byte order, for lookups
+#   paths     the UTF-8 paths, concatenated
+MAGIC = b"GHBM"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQqqqH6x")
+
+# The suffix of sidecar indexes of text hash files.
+INDEX_SUFFIX = ".idx"
+
+# The number of hash values per block yielded by `BinaryHashFileReader.iter_blocks`.
+_BLOCK_ENTRIES = 0x10000
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _encode_path(path: str) -> bytes:
+    return path.encode("utf-8", "surrogateescape")
+
+
+def _decode_path(data: bytes) -> str:
+    return data.decode("utf-8", "surrogateescape")
+
+
+def _to_uint64s(data: Any) -> Any:
+    # Cast in place on little-endian platforms, otherwise copy and swap.
+    if sys.byteorder == "little":
+        return data.cast("Q")
+    values = array("Q")
+    values.frombytes(data)
+    values.byteswap()
+    return values
+
+
+def _from_uint64s(values: list[int]) -> bytes:
+    a = array("Q", values)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+def _stamp(st: os.stat_result) -> tuple[int, int, int]:
+    # Any rewrite of a file changes its ctime, even if the size and the mtime
+    # are kept, e.g. by `--sync`.
+    return st.st_size, st.st_mtime_ns, st.st_ctime_ns
+
+
+def is_binary_hash_file(filepath: str | Path) -> bool:
+    """Return whether a file is a binary hash file.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a hash file.
+
+    Returns:
+        bool:
+            ``True`` if the file starts with the binary magic number.
+    """
+
+    with open(filepath, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class BinaryHashFileReader:
+    """Binary hash file reader.
+
+    The binary hash file is memory-mapped, so that opening it is cheap and
+    :meth:`BinaryHashFileReader.lookup` finds the hash value of a path with a
+    binary search instead of parsing the whole file.
+
+    The :class:`BinaryHashFileReader` supports the context manager protocol
+    for calling :meth:`BinaryHashFileReader.close` automatically.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a binary hash file.
+
+    Raises:
+        ValueError:
+            If the file is not a binary hash file of a supported version.
+
+    Note:
+        - ``stamp``: The ``(size, mtime_ns, ctime_ns)`` of the text hash file
+          converted from, or ``None``.
+    """
+
+    def __init__(self, filepath: str | Path) -> None:
+        self.name = str(filepath)
+        with open(filepath, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size or header[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.name!r} is not a binary hash file")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        _, version, self.digest_size, self.count, *stamp, name_size = _HEADER.unpack(header)
+        self.stamp: tuple[int, ...] | None = None if stamp[0] < 0 else tuple(stamp)
+        if version != _VERSION:
+            self.mm.close()
+            raise ValueError(f"unsupported binary hash file version {version} of {self.name!r}")
+
+        offset = _HEADER.size
+        self.algorithm = self.mm[offset : offset + name_size].decode("ascii")
+        offset += _align(name_size)
+        self._digests = offset
+        offset += _align(self.count * self.digest_size)
+        self._paths = offset + 8 * (2 * self.count + 1)
+        if len(self.mm) < self._paths:
+            self.mm.close()
+            raise ValueError(f"{self.name!r} is truncated")
+
+        # Map the offsets and the order without copying.
+        self._view = memoryview(self.mm)
+        self._offsets = _to_uint64s(self._view[offset : offset + 8 * (self.count + 1)])
+        offset += 8 * (self.count + 1)
+        self._order = _to_uint64s(self._view[offset : self._paths])
+        if len(self.mm) < self._paths + self._offsets[self.count]:
+            self.close()
+            raise ValueError(f"{self.name!r} is truncated")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        """Close the memory-mapped file."""
+
+        # Release the exported views before closing the map.
+        for view in (self._offsets, self._order, self._view):
+            if isinstance(view, memoryview):
+                view.release()
+        self.mm.close()
+
+    def path(self, index: int) -> str:
+        """Return the path at ``index``."""
+
+        return _decode_path(self._path_bytes(index))
+
+    def hash_value(self, index: int) -> bytes:
+        """Return the hash value at ``index``."""
+
+        if not 0 <= index < self.count:
+            raise IndexError(f"index {index} out of range")
+        offset = self._digests + index * self.digest_size
+        return self.mm[offset : offset + self.digest_size]
+
+    def lookup(self, path: str) -> bytes | None:
+        """Return the hash value of a path.
+
+        Parameters:
+            path (str):
+                The path as written in the hash file, i.e. relative to the
+                directory of the hash file unless absolute.
+
+        Returns:
+            bytes | None:
+                The hash value, or ``None`` if the path is not found.
+        """
+
+        key = _encode_path(os.path.normpath(path))
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._path_bytes(self._order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._path_bytes(index := self._order[lo]) == key:
+            return self.hash_value(index)
+        return None
+
+    def iter_blocks(self, *, root: str | Path | None = None) -> Iterator[HashBlock]:
+        """Yield the hash values in blocks, in file order.
+
+        Parameters:
+            root (str | Path | None, default=None):
+                The root directory.
+
+        Yields:
+            HashBlock:
+                The block, the same as :meth:`HashFileReader.iter_blocks
+                <gethash.core.HashFileReader.iter_blocks>`.
+        """
+
+        join = _path_joiner(root)
+        for start in range(0, self.count, _BLOCK_ENTRIES):
+            stop = min(start + _BLOCK_ENTRIES, self.count)
+            paths = [join(self.path(i)) for i in range(start, stop)]
+            offset = self._digests + start * self.digest_size
+            yield HashBlock(paths, self.mm[offset : self._digests + stop * self.digest_size], self.digest_size)
+
+    def iter2(self) -> Iterator[tuple[str, bytes]]:
+        """Yield path and hash value, in file order.
+
+        Yields:
+            tuple[str, bytes]:
+                ``(path, hash_value)``.
+        """
+
+        for i in range(self.count):
+            yield self.path(i), self.hash_value(i)
+
+    def _path_bytes(self, index: int) -> bytes:
+        return self.mm[self._paths + self._offsets[index] : self._paths + self._offsets[index + 1]]
+
+
+class BinaryHashFileWriter:
+    """Binary hash file writer.
+
+    The entries are kept in memory and written on
+    :meth:`BinaryHashFileWriter.close` to a temporary file, which then
+    replaces ``filepath`` atomically.
+
+    The :class:`BinaryHashFileWriter` supports the context manager protocol
+    for calling :meth:`BinaryHashFileWriter.close` automatically. The file is
+    not written if the block exits with an exception.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a binary hash file.
+        algorithm (str):
+            The name of the hash algorithm.
+        digest_size (int):
+            The size of hash values in bytes.
+        stamp (tuple[int, int, int] | None, default=None):
+            The ``(size, mtime_ns, ctime_ns)`` of the text hash file converted
+            from.
+    """
+
+    def __init__(
+        self, filepath: str | Path, algorithm: str, digest_size: int, *, stamp: tuple[int, int, int] | None = None
+    ) -> None:
+        if not 0 < digest_size < 0x10000:
+            raise ValueError(f"digest_size must be in [1, 65535], got {digest_size!r}")
+
+        self.name = str(filepath)
+        self.algorithm = algorithm
+        self.digest_size = digest_size
+        self.stamp = stamp
+        self._paths: list[bytes] = []
+        self._digests = bytearray()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+
+    def write(self, path: str, hash_value: bytes) -> None:
+        """Append a path and its hash value.
+
+        Parameters:
+            path (str):
+                The path of a file, as written in a hash file.
+            hash_value (bytes):
+                The hash value of the file.
+        """
+
+        if len(hash_value) != self.digest_size:
+            raise ValueError(f"hash_value must be {self.digest_size} bytes, got {len(hash_value)} bytes")
+        self._paths.append(_encode_path(path))
+        self._digests += hash_value
+
+    def write_block(self, block: HashBlock) -> None:
+        """Append the paths and the hash values of a :class:`~gethash.core.HashBlock`."""
+
+        if block.digest_size != self.digest_size:
+            raise ValueError(f"block.digest_size must be {self.digest_size}, got {block.digest_size}")
+        self._paths.extend(map(_encode_path, block.paths))
+        self._digests += block.hash_values
+
+    def close(self) -> None:
+        """Write the binary hash file."""
+
+        count = len(self._paths)
+        name = self.algorithm.encode("ascii")
+        offsets = [0]
+        for path in self._paths:
+            offsets.append(offsets[-1] + len(path))
+        order = sorted(range(count), key=self._paths.__getitem__)
+
+        tmppath = f"{self.name}.{os.getpid()}.tmp"
+        try:
+            with open(tmppath, "wb") as f:
+                stamp = (-1, -1, -1) if self.stamp is None else self.stamp
+                f.write(_HEADER.pack(MAGIC, _VERSION, self.digest_size, count, *stamp, len(name)))
+                f.write(name.ljust(_align(len(name)), b"\0"))
+                f.write(self._digests.ljust(_align(len(self._digests)), b"\0"))
+                f.write(_from_uint64s(offsets))
+                f.write(_from_uint64s(order))
+                f.write(b"".join(self._paths))
+            os.replace(tmppath, self.name)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(tmppath)
+            raise
+
+
+def iter_hash_blocks(filepath: str | Path, *, root: str | Path | None = None) -> Iterator[HashBlock]:
+    """Yield the blocks of a text or binary hash file.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a text or binary hash file.
+        root (str | Path | None, default=None):
+            The root directory.
+
+    Raises:
+        ParseHashLineError:
+            If fails to parse a hash line of a text hash file.
+
+    Yields:
+        HashBlock:
+            The block.
+    """
+
+    if is_binary_hash_file(filepath):
+        with BinaryHashFileReader(filepath) as reader:
+            yield from reader.iter_blocks(root=root)
+    else:
+        yield from HashFileReader(filepath).iter_blocks(root=root)
+
+
+def text_to_binary(src: str | Path, dst: str | Path, algorithm: str) -> int:
+    """Convert a text hash file to a binary hash file.
+
+    The paths are kept as written in the text hash file, so a hash file
+    written by ``gethash`` is restored exactly by :func:`binary_to_text`.
+    Comments and blank lines are dropped.
+
+    Parameters:
+        src (str | Path):
+            The path of a text hash file.
+        dst (str | Path):
+            The path of the binary hash file.
+        algorithm (str):
+            The name of the hash algorithm.
+
+    Raises:
+        ParseHashLineError:
+            If fails to parse a hash line.
+        ValueError:
+            If the hash values differ in size.
+
+    Returns:
+        int:
+            The number of hash values.
+    """
+
+    # Stamp before reading, so that any later change is detected.
+    stamp = _stamp(os.stat(src))
+    writer: BinaryHashFileWriter | None = None
+    count = 0
+    for block in HashFileReader(src).iter_blocks():
+        if writer is None:
+            writer = BinaryHashFileWriter(dst, algorithm, block.digest_size, stamp=stamp)
+        writer.write_block(block)
+        count += len(block.paths)
+    if writer is None:
+        raise ValueError(f"{str(src)!r} has no hash lines")
+    writer.close()
+    return count
+
+
+def binary_to_text(src: str | Path, dst: str | Path) -> int:
+    """Convert a binary hash file to a text hash file.
+
+    Parameters:
+        src (str | Path):
+            The path of a binary hash file.
+        dst (str | Path):
+            The path of the text hash file.
+
+    Returns:
+        int:
+            The number of hash values.
+    """
+
+    with BinaryHashFileReader(src) as reader, HashFileWriter(dst) as writer:
+        for path, hash_value in reader.iter2():
+            writer.write_hash_line(format_hash_line(path, hash_value.hex()))
+        return len(reader)
+
+
+def guess_algorithm(filepath: str | Path) -> str | None:
+    """Guess the name of the hash algorithm from the suffix of a hash file.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a hash file, e.g. ``foo.sha3_256``.
+
+    Returns:
+        str | None:
+            The name of the hash algorithm, e.g. ``sha3-256``, or ``None`` if
+            the hash file has no suffix.
+    """
+
+    return Path(filepath).suffix[1:].replace("_", "-") or None
+
+
+def index_path(filepath: str | Path) -> Path:
+    """Return the path of the sidecar index of a text hash file."""
+
+    return Path(f"{filepath}{INDEX_SUFFIX}")
+
+
+def build_index(filepath: str | Path, algorithm: str | None = None) -> int:
+    """Build the sidecar index of a text hash file.
+
+    The index is a binary hash file next to the text hash file, stamped with
+    the size, the mtime and the ctime of the text hash file, so that it is
+    ignored once the text hash file changes.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a text hash file.
+        algorithm (str | None, default=None):
+            The name of the hash algorithm. If ``None``, guess from the suffix
+            of ``filepath``.
+
+    Raises:
+        ParseHashLineError:
+            If fails to parse a hash line.
+        ValueError:
+            If the hash values differ in size, or there are no hash lines.
+
+    Returns:
+        int:
+            The number of hash values.
+    """
+
+    return text_to_binary(filepath, index_path(filepath), algorithm or guess_algorithm(filepath) or "unknown")
+
+
+def open_index(filepath: str | Path) -> BinaryHashFileReader | None:
+    """Open the sidecar index of a text hash file.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a text hash file.
+
+    Returns:
+        BinaryHashFileReader | None:
+            The index, or ``None`` if it is missing, invalid or out of date.
+    """
+
+    try:
+        stamp = _stamp(os.stat(filepath))
+        reader = BinaryHashFileReader(index_path(filepath))
+    except (OSError, ValueError):
+        return None
+    if reader.stamp != stamp:
+        reader.close()
+        return None
+    return reader
+
+
+def lookup_hash_value(
+    filepath: str | Path, path: str, *, root: str | Path | None = None, build: bool = True
+) -> bytes | None:
+    """Look up the hash value of a path in a text or binary hash file.
+
+    The sidecar index of a text hash file is used for a binary search, and is
+    built first if it is missing or out of date and ``build`` is true. If
+    there is no usable index, the text hash file is scanned.
+
+    Parameters:
+        filepath (str | Path):
+            The path of a text or binary hash file.
+        path (str):
+            The path of a file.
+        root (str | Path | None, default=None):
+            The root directory of the paths in the hash file. If ``None``,
+            ``path`` is looked up as written in the hash file.
+        build (bool, default=True):
+            Whether to build the sidecar index of a text hash file.
+
+    Returns:
+        bytes | None:
+            The hash value, or ``None`` if the path is not found.
+    """
+
+    if root is not None:
+        path = os.path.relpath(path, root)
+    path = os.path.normpath(path)
+
+    if is_binary_hash_file(filepath):
+        with BinaryHashFileReader(filepath) as reader:
+            return reader.lookup(path)
+
+    index = open_index(filepath)
+    if index is None and build:
+        # An unwritable directory or a hash file which cannot be indexed only
+        # costs a scan.
+        with suppress(OSError, ValueError):
+            build_index(filepath)
+            index = open_index(filepath)
+    if index is not None:
+        with index:
+            return index.lookup(path)
+
+    for block in HashFileReader(filepath).iter_blocks():
+        with suppress(ValueError):
+            return block.hash_value(block.paths.index(path))
+    return None
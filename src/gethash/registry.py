@@ -0,0 +1,214 @@
+"""The registry of commands provided by ``gethash`` and its plugins.
+
+Scanning the ``gethash.commands`` and ``gethash.backends`` entry points
+requires reading the metadata of every installed distribution and importing
+every backend, which takes far longer than hashing a small file. The registry
+maps each command name to its entry point once and caches the map on disk, so
+that invoking a command only imports what the command needs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import os
+import sys
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from . import __version__
+
+if TYPE_CHECKING:
+    from click import Command
+
+    from .backends import Backend
+
+__all__ = ["Registry", "load_backend", "load_command", "load_object", "load_registry"]
+
+COMMANDS_GROUP = "gethash.commands"
+BACKENDS_GROUP = "gethash.backends"
+
+
+def load_object(target: str) -> Any:
+    """Import the object referenced by an entry point value.
+
+    Parameters:
+        target (str):
+            The reference in the form of ``module:attr``.
+
+    Returns:
+        Any:
+            The referenced object.
+    """
+
+    module_name, _, attrs = target.partition(":")
+    obj: Any = importlib.import_module(module_name)
+    for attr in filter(None, attrs.split(".")):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class Registry:
+    """The map of command names to entry points.
+
+    Parameters:
+        commands (dict[str, str]):
+            The map of command names to the values of the ``gethash.commands``
+            entry points.
+        backends (dict[str, str]):
+            The map of algorithm names to the values of the
+            ``gethash.backends`` entry points providing them.
+    """
+
+    def __init__(self, commands: dict[str, str], backends: dict[str, str]) -> None:
+        self.commands = commands
+        self.backends = backends
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.commands or name in self.backends
+
+    def names(self) -> set[str]:
+        """Return the names of all available commands."""
+
+        return self.commands.keys() | self.backends.keys()
+
+    @classmethod
+    def scan(cls) -> Registry:
+        """Build the registry from the installed entry points.
+
+        Backends that fail to import are skipped. If several backends provide
+        the same algorithm, the first one wins.
+        """
+
+        from importlib_metadata import entry_points
+
+        from .backends import Backend
+
+        commands = {ep.name: ep.value for ep in entry_points(group=COMMANDS_GROUP)}
+        backends: dict[str, str] = {}
+        for ep in entry_points(group=BACKENDS_GROUP):
+            try:
+                backend = ep.load()()
+            except ImportError:
+                continue
+            assert isinstance(backend, Backend)
+            for name in backend.algorithms_available:
+                backends.setdefault(name, ep.value)
+        return cls(commands, backends)
+
+
+def _fingerprint() -> str:
+    # Installing or removing a distribution touches its `site-packages`, so
+    # the modification times of `sys.path` tell whether a plugin may have
+    # been added without reading any metadata. The first entry is skipped,
+    # since it is the directory of the script or the current directory, which
+    # may change at any time.
+    h = hashlib.sha1(f"{__version__}\0{sys.version}\0{sys.prefix}".encode(), usedforsecurity=False)
+    for entry in sys.path[1:]:
+        try:
+            mtime_ns = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        h.update(f"\0{entry}\0{mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def _registry_path() -> Path:
+    from .cache import default_cache_dir
+
+    return default_cache_dir() / f"registry-{__version__}.json"
+
+
+def load_registry(*, refresh: bool = False) -> Registry:
+    """Load the registry, scanning the entry points only if necessary.
+
+    The registry is cached per installed version of ``gethash`` and rebuilt
+    whenever the Python environment changes. Failing to write the cache is
+    ignored.
+
+    Parameters:
+        refresh (bool, default=False):
+            If ``True``, rebuild the registry even if the cached one is fresh.
+
+    Returns:
+        Registry:
+            The registry.
+    """
+
+    path = _registry_path()
+    fingerprint = _fingerprint()
+    if not refresh:
+        with suppress(OSError, ValueError, KeyError, TypeError):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["fingerprint"] == fingerprint:
+                return Registry(dict(data["commands"]), dict(data["backends"]))
+
+    registry = Registry.scan()
+    data = {"fingerprint": fingerprint, "commands": registry.commands, "backends": registry.backends}
+    with suppress(OSError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        finally:
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+    return registry
+
+
+def load_command(name: str) -> Command | None:
+    """Load a command by name.
+
+    The commands of the ``gethash.commands`` entry points take precedence over
+    those generated by backends. If the command is missing or fails to load,
+    the registry is rebuilt once in case it is out of date.
+
+    Parameters:
+        name (str):
+            The name of the command.
+
+    Returns:
+        Command | None:
+            The command, or ``None`` if no such command is available.
+    """
+
+    from click import Command
+
+    for refresh in (False, True):
+        registry = load_registry(refresh=refresh)
+        with suppress(KeyError, ImportError):
+            cmd = load_object(registry.commands[name])
+            assert isinstance(cmd, Command)
+            return cmd
+        with suppress(Exception):
+            return load_backend(registry, name).load_cmd(name)
+    return None
+
+
+def load_backend(registry: Registry, name: str) -> Backend:
+    """Load the backend providing an algorithm.
+
+    Parameters:
+        registry (Registry):
+            The registry to look up.
+        name (str):
+            The name of the hash algorithm.
+
+    Raises:
+        KeyError:
+            If no backend in the registry provides the algorithm.
+
+    Returns:
+        Backend:
+            The backend.
+    """
+
+    backend = load_object(registry.backends[name])()
+    if name not in backend.algorithms_available:
+        raise KeyError(name)
+    return backend
@@ -4,25 +4,26 @@ import abc
 import functools
 import os
 import sys
-from collections.abc import Iterable
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import suppress
+from hmac import compare_digest
 from pathlib import Path
-from typing import Any, Callable, TextIO
+from typing import Any, Callable, TextIO, cast
 
 import click
 from click import Command
-from click_option_group import MutuallyExclusiveOptionGroup
 
 from . import __version__
-from .core import (
-    CheckHashLineError,
-    HashFileReader,
-    HashFileWriter,
-    ParseHashLineError,
-    check_hash_line,
-    generate_hash_line,
-)
-from .hasher import HashContext, Hasher
-from .utils.click import CommandX
+from .cache import CacheKey, CacheMismatchError, HashCache, MerkleCache, default_cache_dir
+from .chunksize import calibrate, profiled_chunksize
+from .core import HashFileReader, HashFileWriter, ParseHashLineError, format_hash_line, parse_hash_line
+from .hasher import HashContext, HashContextGroup, Hasher, IsADirectory, ProcessHasher
+from .transfer import copy_file
+from .utils.click import ChunkSize, CommandX
+from .utils.concurrent import BatchExecutor, SerialExecutor, imap_ordered
+from .utils.entry import PathEntry
 from .utils.glob import auto_glob, glob_filters, sorted_path
 
 
@@ -44,37 +45,160 @@ class Output(abc.ABC):
     def dump(self, hash_line: str, hash_path: str, path: str) -> None:
         """Dump hash line to output."""
 
+    def abort(self) -> None:
+        """Close output after an error."""
+
+        self.close()
+
+    def temp_stat(self) -> os.stat_result | None:
+        """Return the status of the temporary file being written, if any."""
+
+        return None
+
+
+# The path which stands for stdin.
+STDIN_PATH = "-"
+
+# The write buffer of aggregate output files.
+_AGG_BUFFER_SIZE = 0x100000  # 1 MiB
+
+# The number of hash files written at once by deferred separate output.
+_SEP_BATCHSIZE = 1024
+
 
 class AggOutput(Output):
-    def __init__(self, filepath: str | Path, *, sync: bool = False) -> None:
-        self.hash_file = HashFileWriter(filepath)
+    def __init__(
+        self,
+        filepath: str | Path,
+        *,
+        sync: bool = False,
+        index: str | None = None,
+        update: bool = False,
+        on_warning: Callable[[str], None] | None = None,
+    ) -> None:
+        self.name = str(filepath)
         self.sync = sync
+        self.index = index
+        self.on_warning = echo_warning if on_warning is None else on_warning
         self.maxt = 0
 
+        # Reuse the lines of the previous hash file.
+        self.previous: dict[str, str] = {}
+        if update:
+            with suppress(FileNotFoundError):
+                self.previous = _read_previous(self.name)
+        # Replace the previous hash file only after all lines are written.
+        self.hash_file = HashFileWriter(filepath, buffer_size=_AGG_BUFFER_SIZE, atomic=True)
+
     def close(self) -> None:
         self.hash_file.close()
         if self.sync:
-            os.utime(self.hash_file.name, ns=(self.maxt, self.maxt))
+            os.utime(self.name, ns=(self.maxt, self.maxt))
+        # Index the final hash file, since the index is stamped with its mtime.
+        if self.index is not None:
+            from .manifest import build_index
+
+            # The hash file is complete anyway, and lookups build the index
+            # on demand.
+            try:
+                build_index(self.name, self.index)
+            except ValueError:
+                pass
+            except OSError as e:
+                self.on_warning(f"[WARNING] cannot index '{self.name}'\n\t{type(e).__name__}: {e}")
+
+    def abort(self) -> None:
+        self.hash_file.abort()
+
+    def temp_stat(self) -> os.stat_result | None:
+        if not self.hash_file.atomic:
+            return None
+        return os.fstat(self.hash_file.file.fileno())
 
     def dump(self, hash_line: str, hash_path: str, path: str) -> None:
+        if self.previous:
+            name, hex_hash_value = parse_hash_line(hash_line)
+            previous = self.previous.get(name)
+            if previous is not None and parse_hash_line(previous)[1].lower() == hex_hash_value:
+                hash_line = previous
         self.hash_file.write_hash_line(hash_line)
         if self.sync:
             self.maxt = max(os.stat(path).st_mtime_ns, self.maxt)
 
 
+def _read_previous(hash_path: str) -> dict[str, str]:
+    previous = {}
+    lineno = 0
+    try:
+        for lineno, hash_line in enumerate(HashFileReader(hash_path), 1):  # noqa: B007
+            name, _ = parse_hash_line(hash_line)
+            previous[name] = hash_line if hash_line.endswith("\n") else hash_line + "\n"
+    except ParseHashLineError as e:
+        hash_line = e.hash_line.rstrip("\n")
+        raise click.UsageError(f"Cannot update '{hash_path}': invalid hash '{hash_line}' at line {lineno}.") from None
+    except UnicodeDecodeError:
+        raise click.UsageError(f"Cannot update '{hash_path}', which is not a text hash file.") from None
+    return previous
+
+
 class SepOutput(Output):
-    def __init__(self, *, sync: bool = False) -> None:
+    def __init__(
+        self,
+        *,
+        sync: bool = False,
+        defer: bool = False,
+        threads: int = 1,
+        on_error: Callable[[str, Exception], None] | None = None,
+    ) -> None:
         self.sync = sync
+        self.defer = defer
+        # Deferred errors are reported with the path of the data file.
+        self.on_error = echo_exception if on_error is None else on_error
+        self.pending: list[tuple[str, str, str, int | None]] = []
+        self.executor: Executor = ThreadPoolExecutor(threads) if defer and threads > 1 else SerialExecutor()
 
     def close(self) -> None:
-        pass
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown()
 
     def dump(self, hash_line: str, hash_path: str, path: str) -> None:
-        with HashFileWriter(hash_path) as hash_file:
-            hash_file.write_hash_line(hash_line)
-        if self.sync:
-            t = os.stat(path).st_mtime_ns
-            os.utime(hash_path, ns=(t, t))
+        mtime = os.stat(path).st_mtime_ns if self.sync else None
+        if not self.defer:
+            _write_sep_hash_file(hash_path, hash_line, mtime)
+            return
+        self.pending.append((path, hash_path, hash_line, mtime))
+        if len(self.pending) >= _SEP_BATCHSIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the deferred hash files, and report each one which fails."""
+
+        pending, self.pending = self.pending, []
+        futures = [
+            (path, self.executor.submit(_write_sep_hash_file, hash_path, hash_line, mtime))
+            for path, hash_path, hash_line, mtime in pending
+        ]
+        for path, future in futures:
+            e = future.exception()
+            if isinstance(e, Exception):
+                self.on_error(path, e)
+            elif e is not None:
+                raise e
+
+
+def _write_sep_hash_file(hash_path: str, hash_line: str, mtime: int | None) -> None:
+    # Write the small hash file with as few system calls as possible, but the
+    # same as `HashFileWriter` in text mode.
+    data = hash_line.replace("\n", os.linesep).encode("utf-8")
+    fd = os.open(hash_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    if mtime is not None:
+        os.utime(hash_path, ns=(mtime, mtime))
 
 
 class NullOutput(Output):
@@ -89,7 +213,17 @@ class NullOutput(Output):
 
 
 def create_output(
-    agg: str | None = None, sep: bool | None = None, null: bool | None = None, *, sync: bool = False
+    agg: str | None = None,
+    sep: bool | None = None,
+    null: bool | None = None,
+    *,
+    sync: bool = False,
+    index: str | None = None,
+    update: bool = False,
+    defer: bool = False,
+    threads: int = 1,
+    on_error: Callable[[str, Exception], None] | None = None,
+    on_warning: Callable[[str], None] | None = None,
 ) -> Output:
     if (agg and sep) or (agg and null) or (sep and null):
         raise ValueError("require exactly one argument")
@@ -100,9 +234,9 @@ def create_output(
 
     # Determine the output mode and dump method.
     if agg:
-        return AggOutput(agg, sync=sync)
+        return AggOutput(agg, sync=sync, index=index, update=update, on_warning=on_warning)
     elif sep:
-        return SepOutput(sync=sync)
+        return SepOutput(sync=sync, defer=defer, threads=threads, on_error=on_error)
     else:
         return NullOutput()
 
@@ -123,12 +257,39 @@ class Gethash:
     stop: int | None
     dir_ok: bool
 
+    algorithm: str | None
+    cache: HashCache | None
+    merkle_cache: MerkleCache | None
+    cache_verify: bool
+
+    jobs: int
+    window: int
+    executor: Executor
+    hash_task: Callable[[str], bytes]
+
     def __init__(self, ctx: HashContext, **kwargs: Any) -> None:
-        self.ctx = ctx
         self.auto = kwargs.pop("auto", False)
         self.sync = kwargs.pop("sync", False)
         self.suffix = kwargs.pop("suffix", ".sha")
+        self.algorithm = kwargs.pop("algorithm", None)
+        factory = kwargs.pop("factory", None)
+
+        # Hash additional algorithms in the same pass, see `split_hash`.
+        multi = list(kwargs.pop("multi", ()))
+        threads = kwargs.pop("multi_threads", False)
+        self.suffixes = [self.suffix]
+        self.group = None
+        if multi:
+            factories = [factory, *(f for _, f in multi)]
+            self.suffixes += ["." + name.replace("-", "_") for name, _ in multi]
+            ctx = self.group = HashContextGroup([ctx, *(f() for _, f in multi)], threads=threads)
+            if factory is not None:
+                factory = functools.partial(HashContextGroup.from_factories, factories, threads=threads)
+            if self.algorithm is not None:
+                self.algorithm = "+".join([self.algorithm, *(name for name, _ in multi)])
+        self.ctx = ctx
 
+        self.stdin = kwargs.pop("stdin", None)
         self.stdout = kwargs.pop("stdout", sys.stdout)
         self.stderr = kwargs.pop("stderr", sys.stderr)
 
@@ -139,11 +300,15 @@ class Gethash:
         self.inplace = kwargs.pop("inplace", False)
         self.root = kwargs.pop("root", None)
 
-        # Determine the output mode.
+        # Determine the output mode. Each algorithm has its own output, and
+        # the aggregate output files are told apart by the suffixes.
         agg = kwargs.pop("agg", None)
         sep = kwargs.pop("sep", None)
         null = kwargs.pop("null", None)
-        self.output = create_output(agg, sep, null, sync=self.sync)
+        index = kwargs.pop("index", False)
+        update = kwargs.pop("update", False)
+        defer = kwargs.pop("defer", False)
+        self.update = update
 
         # Prepare arguments and construct the hash function.
         self.start = kwargs.pop("start", None)
@@ -155,10 +320,111 @@ class Gethash:
             "disable": kwargs.pop("tqdm_disable", False),
             "leave": kwargs.pop("tqdm_leave", False),
         }
-        self.hasher = Hasher(ctx, tqdm_args=tqdm_args)
+        cache_dir = kwargs.pop("cache_dir", None)
+        cache_dir = default_cache_dir() if cache_dir is None else Path(cache_dir)
+        self.cache_verify = kwargs.pop("cache_verify", False)
+        self.changed_only = kwargs.pop("changed_only", False)
+        use_cache = kwargs.pop("cache", False) or self.cache_verify or self.changed_only or update
+        if use_cache and self.algorithm is None:
+            raise ValueError("cache requires the algorithm name")
+        hasher_args = {
+            "chunksize": kwargs.pop("chunksize", None),
+            "engine": kwargs.pop("engine", None),
+            "queue_depth": kwargs.pop("queue_depth", None),
+            "dir_mode": kwargs.pop("dir_mode", None),
+        }
+        # Keep the nodes of Merkle directory digests along with the cache.
+        self.merkle_cache = None
+        if use_cache and self.dir_ok and hasher_args["dir_mode"] == "merkle":
+            self.merkle_cache = MerkleCache(cache_dir / "merkle.sqlite3", cast(str, self.algorithm))
+            hasher_args["merkle_cache"] = self.merkle_cache
+        if hasher_args["chunksize"] == "auto":
+            # Calibrate the preferred chunk size once per algorithm.
+            if self.algorithm is None:
+                hasher_args["preferred_chunksize"] = calibrate(ctx)
+            else:
+                filepath = cache_dir / "chunksize.json"
+                hasher_args["preferred_chunksize"] = profiled_chunksize(self.algorithm, ctx, filepath)
+        # Hash the files of a directory concurrently as well.
+        self.jobs = kwargs.pop("jobs", 1)
+        processes = kwargs.pop("processes", False)
+        dir_jobs = self.jobs if self.dir_ok and not processes else None
+        # Hash the files of directories on the same thread pool as the other
+        # files, so that `-j` limits the threads of both.
+        dir_executor = ThreadPoolExecutor(self.jobs) if dir_jobs is not None and dir_jobs > 1 else None
+        self.hasher = Hasher(ctx, tqdm_args=tqdm_args, jobs=dir_jobs, executor=dir_executor, **hasher_args)
+
+        # Determine the persistent cache.
+        cache_size = kwargs.pop("cache_size", None)
+        self.cache = None
+        self.cache_keys = 0
+        if use_cache:
+            self.cache = HashCache(cache_dir / "hashes.sqlite3", max_entries=cache_size)
+
+        # Copy files to this directory while hashing them.
+        self.copy_to = kwargs.pop("copy_to", None)
+        self.copy_verify = kwargs.pop("copy_verify", False)
+        self.copy_names: set[str] = set()
+
+        # Hash files concurrently if more than one job is requested.
+        batchsize = kwargs.pop("batchsize", 16)
+        # Keep a few pending paths per job so that workers never wait for input.
+        self.window = 4 * self.jobs
+        self.hash_task = functools.partial(self.hasher, start=self.start, stop=self.stop, dir_ok=self.dir_ok)
+        if processes:
+            if factory is None:
+                raise ValueError("processes require a hash context factory")
+            # Worker processes rebuild the hash context from the factory, and
+            # each batch of paths costs only one round trip.
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.window = 2 * self.jobs * batchsize
+            self.executor = BatchExecutor(ProcessPoolExecutor(self.jobs), batchsize)
+            self.hash_task = ProcessHasher(factory, start=self.start, stop=self.stop, dir_ok=self.dir_ok, **hasher_args)
+        elif dir_executor is not None:
+            self.executor = dir_executor
+        elif self.jobs > 1:
+            self.executor = ThreadPoolExecutor(self.jobs)
+        else:
+            self.window = 1
+            self.executor = SerialExecutor()
+
+        # Open the outputs last, so that nothing else can fail and leave their
+        # temporary files behind.
+        self.outputs: list[Output] = []
+        try:
+            for suffix in self.suffixes:
+                agg_path = _agg_path(agg, self.suffix, suffix) if agg and multi else agg
+                algorithm = suffix[1:].replace("_", "-") if index else None
+                self.outputs.append(
+                    create_output(
+                        agg_path,
+                        sep,
+                        null,
+                        sync=self.sync,
+                        index=algorithm,
+                        update=update,
+                        defer=defer,
+                        threads=self.jobs,
+                        on_error=self.echo_exception,
+                        on_warning=self.echo_warning,
+                    )
+                )
+        except BaseException:
+            self.close(abort=True)
+            raise
+
+        # The temporary files of the outputs may be in the searched directories.
+        self.excluded: set[tuple[int, int]] = set()
+        for output in self.outputs:
+            st = output.temp_stat()
+            if st is not None:
+                self.excluded.add((st.st_dev, st.st_ino))
 
     def __call__(self, files: Iterable[str], *, check: bool) -> None:
         if check:
+            if self.group is not None:
+                raise ValueError("multiple algorithms are not supported in check mode")
             self.check_hash(files)
         else:
             self.generate_hash(files)
@@ -167,23 +433,81 @@ class Gethash:
         return self
 
     def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
-        self.close()
-
-    def close(self) -> None:
-        self.output.close()
+        self.close(abort=exc_type is not None)
+
+    def close(self, *, abort: bool = False) -> None:
+        try:
+            self.executor.shutdown()
+            if self.group is not None:
+                self.group.close()
+            self.close_outputs(abort=abort)
+        finally:
+            if self.cache is not None:
+                # Keep the entries of all files in the updated output file, so
+                # that they are not hashed again however many they are.
+                if self.update and self.cache.max_entries is not None:
+                    self.cache.max_entries = max(self.cache.max_entries, self.cache_keys)
+                self.cache.close()
+            if self.merkle_cache is not None:
+                self.merkle_cache.close()
+
+    def close_outputs(self, *, abort: bool = False) -> None:
+        # Abort the remaining outputs once one fails to close, so that none of
+        # them leaves its temporary file behind.
+        outputs = iter(self.outputs)
+        try:
+            for output in outputs:
+                if abort:
+                    output.abort()
+                else:
+                    output.close()
+        finally:
+            for output in outputs:
+                output.abort()
 
     def generate_hash(self, patterns: Iterable[str]) -> None:
-        for path in self.glob_function(patterns):
+        # Hash stdin in its position, so the patterns before and after it are
+        # searched and sorted separately.
+        group: list[str] = []
+        for pattern in patterns:
+            if pattern == STDIN_PATH:
+                if group:
+                    self.generate_file_hash(group)
+                    group = []
+                self.generate_stdin_hash()
+            else:
+                group.append(pattern)
+        if group:
+            self.generate_file_hash(group)
+
+    def generate_file_hash(self, patterns: Iterable[str]) -> None:
+        paths = self.glob_function(patterns)
+        if self.excluded:
+            paths = (path for path in paths if not self.is_excluded(path))
+        for path, get_hash, _ in self.map_hash(paths):
             try:
                 root = self.check_root(path)
-                hash_line = generate_hash_line(path, self.hash_function, root=root)
-                hash_path = path + self.suffix
-                self.output.dump(hash_line, hash_path, path)
+                hash_lines = [format_hash_line(path, value.hex(), root=root) for value in self.split_hash(get_hash())]
+                for hash_line, suffix, output in zip(hash_lines, self.suffixes, self.outputs):
+                    output.dump(hash_line, path + suffix, path)
             except Exception as e:  # noqa: BLE001
                 self.echo_exception(path, e)
             else:
-                # The hash line already has a newline.
-                self.echo(hash_line, nl=False)
+                # The hash lines already have a newline.
+                self.echo("".join(hash_lines), nl=False)
+
+    def generate_stdin_hash(self) -> None:
+        path = STDIN_PATH
+        stdin = sys.stdin.buffer if self.stdin is None else self.stdin
+        try:
+            hash_value = self.hasher.hash_stream(stdin, self.start, self.stop)
+            hash_lines = [format_hash_line(path, value.hex()) for value in self.split_hash(hash_value)]
+            for hash_line, suffix, output in zip(hash_lines, self.suffixes, self.outputs):
+                output.dump(hash_line, path + suffix, path)
+        except Exception as e:  # noqa: BLE001
+            self.echo_exception(path, e)
+        else:
+            self.echo("".join(hash_lines), nl=False)
 
     def check_hash(self, patterns: Iterable[str]) -> None:
         for hash_path in self.glob_function(patterns):
@@ -198,21 +522,62 @@ class Gethash:
                 self.echo_exception(hash_path, e)
 
     def _check_hash(self, hash_path: str) -> None:
+        from .manifest import iter_hash_blocks
+
+        root = self.check_root(hash_path)
+        hash_values: deque[bytes] = deque()
+        errors: list[ParseHashFileError] = []
+
+        def parse() -> Iterator[str]:
+            # Stop at the first invalid line, which is reported after the
+            # results of the previous lines.
+            try:
+                for block in iter_hash_blocks(hash_path, root=root):
+                    for i, path in enumerate(block.paths):
+                        hash_values.append(block.hash_value(i))
+                        yield path
+            except ParseHashLineError as e:
+                # Report line numbers from 1, the same as update mode.
+                errors.append(ParseHashFileError(e.hash_line, cast(int, e.lineno) + 1))
+
+        # Hash the files concurrently, but report them in manifest order.
         maxt = 0
-        for i, hash_line in enumerate(HashFileReader(hash_path)):
+        for path, get_hash, cached in self.map_hash(parse()):
+            hash_value = hash_values.popleft()
+            # The cache proves that the file is unchanged since it was last
+            # hashed with the expected hash value.
+            if (
+                self.changed_only
+                and cached is not None
+                and not self.cache_verify
+                and compare_digest(cached, hash_value)
+            ):
+                maxt = max(os.stat(path).st_mtime_ns, maxt)
+                self.echo(f"[SKIPPED] {path}", fg="yellow")
+                continue
             try:
-                root = self.check_root(hash_path)
-                path = check_hash_line(hash_line, self.hash_function, root=root)
+                curr_hash_value = get_hash()
+            except CacheMismatchError as e:
+                # The data changed behind the metadata, so report it and check
+                # the current hash value as usual.
+                self.echo_warning(f"[WARNING] {path}\n\t{type(e).__name__}: {e}")
+                curr_hash_value = bytes.fromhex(e.curr_hex_hash_value)
+            if compare_digest(curr_hash_value, hash_value):
                 maxt = max(os.stat(path).st_mtime_ns, maxt)
-            except ParseHashLineError as e:
-                raise ParseHashFileError(e.hash_line, i) from None
-            except CheckHashLineError as e:
-                self.echo(f"[FAILURE] {e.path}", fg="red")
-            else:
                 self.echo(f"[SUCCESS] {path}", fg="green")
+            else:
+                self.echo(f"[FAILURE] {path}", fg="red")
+        if errors:
+            raise errors[0]
         if self.sync:
             os.utime(hash_path, ns=(maxt, maxt))
 
+    def is_excluded(self, path: str) -> bool:
+        # The searching functions stat each path, except broken ones.
+        if not isinstance(path, PathEntry):
+            return False
+        return (path.st.st_dev, path.st.st_ino) in self.excluded
+
     def check_root(self, path: str) -> str | None:
         if self.inplace:
             return os.path.dirname(path)
@@ -220,13 +585,84 @@ class Gethash:
 
     def glob_function(self, paths: Iterable[str]) -> Iterable[str]:
         if self.auto:
-            return sorted_path(auto_glob(paths))
+            # Stream files so that hashing starts before searching finishes.
+            return auto_glob(paths)
         return sorted_path(
             glob_filters(paths, mode=self.glob_mode, type=self.glob_type, recursive=True, user=True, vars=True)
         )
 
-    def hash_function(self, path: str) -> bytes:
-        return self.hasher(path, self.start, self.stop, dir_ok=self.dir_ok)
+    def map_hash(self, paths: Iterable[str]) -> Iterator[tuple[str, Callable[[], bytes], bytes | None]]:
+        # Look up the cache lazily in this thread, and submit only the misses.
+        items = ((path, *self.lookup_cache(path)) for path in paths)
+        for (path, key, cached), future in imap_ordered(self.submit_hash, items, window=self.window):
+            yield path, functools.partial(self.resolve_hash, path, future, key, cached), cached
+
+    def split_hash(self, hash_value: bytes) -> list[bytes]:
+        if self.group is None:
+            return [hash_value]
+        return self.group.split(hash_value)
+
+    def lookup_cache(self, path: str) -> tuple[CacheKey | None, bytes | None]:
+        if self.cache is None or self.algorithm is None:
+            return None, None
+        key = self.cache.key(self.algorithm, path, self.start, self.stop)
+        if key is None:
+            return None, None
+        self.cache_keys += 1
+        return key, self.cache.get(key)
+
+    def submit_hash(self, item: tuple[str, CacheKey | None, bytes | None]) -> Future[bytes]:
+        path, _, cached = item
+        future: Future[bytes] = Future()
+        if self.copy_to is not None:
+            try:
+                copy_path = self.copy_path(path)
+            except ValueError as e:
+                future.set_exception(e)
+                return future
+            # Copy every file, but trust the cached hash value unless asked
+            # to verify it, so that the data is copied without hashing it.
+            return self.executor.submit(self.copy_hash, path, copy_path, None if self.cache_verify else cached)
+        if cached is None or self.cache_verify:
+            if self.hasher.executor is not None and _is_dir(path):
+                # Hash directories in this thread, since a worker would wait
+                # for the other workers hashing their files.
+                try:
+                    future.set_result(self.hash_task(path))
+                except Exception as e:  # noqa: BLE001
+                    future.set_exception(e)
+                return future
+            return self.executor.submit(self.hash_task, path)
+        future.set_result(cached)
+        return future
+
+    def copy_path(self, path: str) -> str:
+        root = self.check_root(path)
+        name = os.path.normpath(path if root is None else os.path.relpath(path, root))
+        if os.path.isabs(name) or name == os.pardir or name.startswith(os.pardir + os.sep):
+            raise ValueError(f"cannot copy {path!r} out of the copy directory, use '-z' / '--root'")
+        # Different files may have the same path relative to their roots,
+        # e.g. with `--inplace`, and only the first one is copied.
+        key = os.path.normcase(name)
+        if key in self.copy_names:
+            raise ValueError(f"cannot copy {path!r} to {name!r}, which is the copy of another file")
+        self.copy_names.add(key)
+        return os.path.join(cast(str, self.copy_to), name)
+
+    def copy_hash(self, path: str, copy_path: str, cached: bytes | None = None) -> bytes:
+        if os.path.isdir(path):
+            raise IsADirectory(f"{path!r} is a directory")
+        os.makedirs(os.path.dirname(copy_path), exist_ok=True)
+        hash_value = copy_file(path, copy_path, self.hasher, hash_value=cached, verify=self.copy_verify)
+        return cast(bytes, hash_value)
+
+    def resolve_hash(self, path: str, future: Future[bytes], key: CacheKey | None, cached: bytes | None) -> bytes:
+        hash_value = future.result()
+        if self.cache is not None and key is not None and hash_value is not cached:
+            self.cache.put(key, hash_value)
+            if cached is not None and hash_value != cached:
+                raise CacheMismatchError(path, cached.hex(), hash_value.hex())
+        return hash_value
 
     def echo(self, msg: str, **kwargs: Any) -> None:
         click.secho(msg, file=self.stdout, **kwargs)
@@ -234,9 +670,48 @@ class Gethash:
     def echo_error(self, msg: str, **kwargs: Any) -> None:
         click.secho(msg, file=self.stderr, **kwargs)
 
+    def echo_warning(self, msg: str) -> None:
+        echo_warning(msg, file=self.stderr)
+
     def echo_exception(self, path: str, exc: Exception) -> None:
-        msg = f"[ERROR] {path}\n\t{type(exc).__name__}: {exc}"
-        click.secho(msg, file=self.stderr, fg="red")
+        echo_exception(path, exc, file=self.stderr)
+
+
+def _agg_path(agg: str, primary_suffix: str, suffix: str) -> str:
+    # Name the aggregate output file of each algorithm after that of the
+    # primary one, e.g. `all.md5` and `all.sha1` for both `all.md5` and `all`.
+    if agg.lower().endswith(primary_suffix.lower()):
+        if suffix == primary_suffix:
+            return agg
+        return agg[: -len(primary_suffix)] + suffix
+    return agg + suffix
+
+
+def _is_dir(path: str) -> bool:
+    return path.is_dir if isinstance(path, PathEntry) else os.path.isdir(path)
+
+
+def _is_subpath(path: str, directory: str) -> bool:
+    path = os.path.normcase(path)
+    directory = os.path.normcase(directory)
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:
+        # The paths are on different drives.
+        return False
+
+
+def echo_warning(msg: str, *, file: TextIO | None = None) -> None:
+    """Report a problem which does not fail the command."""
+
+    click.secho(msg, file=sys.stderr if file is None else file, fg="yellow")
+
+
+def echo_exception(path: str, exc: Exception, *, file: TextIO | None = None) -> None:
+    """Report the error of a path."""
+
+    msg = f"[ERROR] {path}\n\t{type(exc).__name__}: {exc}"
+    click.secho(msg, file=sys.stderr if file is None else file, fg="red")
 
 
 def script_main(ctx: HashContext, files: tuple[str, ...], **options: Any) -> None:
@@ -248,6 +723,49 @@ def script_main(ctx: HashContext, files: tuple[str, ...], **options: Any) -> Non
     stderr = open(os.devnull, "w") if no_stderr else sys.stderr  # noqa: SIM115
 
     check = options.pop("check", False)
+    if options.get("changed_only") and not check:
+        raise click.UsageError("Option '--changed-only' requires '-c' / '--check'.")
+    if options.get("update") and (check or not options.get("agg")):
+        raise click.UsageError("Option '-u' / '--update' requires '-o' / '--agg' without '-c' / '--check'.")
+    if options.get("copy_verify") and not options.get("copy_to"):
+        raise click.UsageError("Option '--copy-verify' requires '--copy-to'.")
+    if options.get("copy_to") and (
+        check
+        or options.get("processes")
+        or options.get("dir")
+        or options.get("start") is not None
+        or options.get("stop") is not None
+        or STDIN_PATH in files
+    ):
+        raise click.UsageError(
+            "Option '--copy-to' cannot be used with '-c' / '--check', '-P' / '--processes', '-d' / '--dir', "
+            f"'--start', '--stop' or '{STDIN_PATH}'."
+        )
+    # The copies would be searched and copied again, e.g. by the next run.
+    copy_to = options.get("copy_to")
+    if copy_to and options.get("auto"):
+        copy_dir = os.path.realpath(copy_to)
+        for root in files:
+            if _is_subpath(copy_dir, os.path.realpath(root)):
+                raise click.UsageError(f"Cannot copy to '{copy_to}', which is in the searched directory '{root}'.")
+    # The hash line of stdin cannot be checked later, so it is only echoed.
+    if STDIN_PATH in files and (check or options.get("agg") or options.get("sep") or options.get("sync")):
+        raise click.UsageError(
+            f"Reading stdin from '{STDIN_PATH}' cannot be used with '-c' / '--check', '-o' / '--agg', "
+            "'-s' / '--sep' or '-y' / '--sync'."
+        )
+    if check and options.get("multi"):
+        raise click.UsageError("Option '-m' / '--multi' cannot be used with '-c' / '--check'.")
+
+    # Resolve the names of additional algorithms.
+    if options.get("multi"):
+        from .backends import load_factory
+
+        try:
+            options["multi"] = [(name, load_factory(name)) for name in options["multi"]]
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'-m' / '--multi'") from None
+
     with Gethash(ctx, stdout=stdout, stderr=stderr, **options) as gethash:
         gethash(files, check=check)
 
@@ -255,6 +773,8 @@ def script_main(ctx: HashContext, files: tuple[str, ...], **options: Any) -> Non
 def gethashcli(command_name: str, display_name: str, **extras: Any) -> Callable[[Callable], Command]:
     """Apply click decorators to the main function."""
 
+    from click_option_group import MutuallyExclusiveOptionGroup
+
     suffix = extras.pop("suffix", "." + command_name.replace("-", "_"))
     doc = extras.pop("doc", None)
 
@@ -321,14 +841,141 @@ def gethashcli(command_name: str, display_name: str, **extras: Any) -> Callable[
             is_flag=True,
             help="Do not output to files. This is the default output mode.",
         )
+        @click.option(
+            "-u",
+            "--update",
+            is_flag=True,
+            help="Update the aggregate output file. Reuse the lines of unchanged files, hash only new or "
+            "changed files and drop the others. Implies ``--cache``, which keeps the entries of all files in the "
+            "output file beyond ``--cache-size``.",
+        )
+        @click.option(
+            "--defer",
+            is_flag=True,
+            help="Write separate output files in batches after hashing, with as many threads as ``--jobs``.",
+        )
+        @click.option(
+            "--index",
+            is_flag=True,
+            help="Build a sidecar index of the aggregate output file for fast lookups by path.",
+        )
+        @click.option(
+            "--copy-to",
+            type=click.Path(file_okay=False),
+            help="Copy files to the directory while hashing them, at their paths relative to ``--root``, their "
+            "directories with ``--inplace``, or the current directory. With ``--cache``, unchanged files are "
+            "copied without hashing them.",
+        )
+        @click.option(
+            "--copy-verify",
+            is_flag=True,
+            help="With ``--copy-to``, read the copies again and report the ones which differ from their sources.",
+        )
         @click.option("--start", type=click.IntRange(min=0), help="The start offset of files.")
         @click.option("--stop", type=click.IntRange(min=0), help="The stop offset of files.")
+        @click.option(
+            "-j",
+            "--jobs",
+            type=click.IntRange(min=1),
+            default=1,
+            show_default=True,
+            help="The number of files hashed or checked concurrently, including the files in a directory with "
+            "``--dir``. The output order is not affected.",
+        )
+        @click.option(
+            "-P",
+            "--processes",
+            is_flag=True,
+            help="Hash files in worker processes instead of threads. Useful for pure Python algorithms.",
+        )
+        @click.option(
+            "--batchsize",
+            type=click.IntRange(min=1),
+            default=16,
+            show_default=True,
+            help="The number of files sent to a worker process at once.",
+        )
+        @click.option(
+            "-m",
+            "--multi",
+            multiple=True,
+            metavar="NAME",
+            help="Also hash files with the algorithm NAME in the same pass, writing hash files with its suffix. "
+            "Can be repeated. The aggregate output file of each algorithm replaces or takes the suffix, e.g. "
+            "``-o all.md5 -m sha1`` writes ``all.md5`` and ``all.sha1``.",
+        )
+        @click.option(
+            "--multi-threads",
+            is_flag=True,
+            help="Update the hash contexts of multiple algorithms on separate threads.",
+        )
         @click.option(
             "-d",
             "--dir",
             is_flag=True,
             help="Allow checksum for directories. Just xor each checksum of files in a given directory.",
         )
+        @click.option(
+            "--dir-mode",
+            type=click.Choice(["xor", "merkle"]),
+            default="xor",
+            show_default=True,
+            help="Set the checksum of directories. If ``merkle``, hash the names and checksums of the sorted "
+            "entries of each directory. With ``--cache``, only changed files are hashed again.",
+        )
+        @click.option(
+            "--engine",
+            type=click.Choice(["buffered", "mmap", "readahead"]),
+            default="buffered",
+            show_default=True,
+            help="Set the method for reading files. If ``mmap``, hash memory-mapped files without copying; "
+            "if ``readahead``, read chunks on a separate thread while hashing, which helps slow disks and "
+            "network file systems.",
+        )
+        @click.option(
+            "--chunksize",
+            type=ChunkSize(),
+            help="The chunk size for reading files, e.g. ``64K`` or ``4M``. If ``auto``, select it for each "
+            "file from its size, the block size of the file system and a calibration of the algorithm, "
+            "which is saved in the cache directory.  [default: 1M]",
+        )
+        @click.option(
+            "--queue-depth",
+            type=click.IntRange(min=2),
+            default=3,
+            show_default=True,
+            help="The number of chunk buffers of the ``readahead`` engine.",
+        )
+        @click.option(
+            "--cache/--no-cache",
+            default=False,
+            show_default=True,
+            help="Reuse hash values of unchanged files from the persistent cache.",
+        )
+        @click.option(
+            "--cache-verify",
+            is_flag=True,
+            help="Hash files anyway and report cached hash values which differ. Implies ``--cache``.",
+        )
+        @click.option(
+            "--changed-only",
+            is_flag=True,
+            help="With ``--check``, skip files unchanged since they were last hashed with the expected hash "
+            "values, and report them as skipped. Implies ``--cache``. The hash values are recorded in the cache "
+            "by runs with ``--cache``, ``--changed-only`` or ``--update``, so the first run checks all files.",
+        )
+        @click.option(
+            "--cache-dir",
+            type=click.Path(file_okay=False),
+            help="The cache directory. Defaults to ``$GETHASH_CACHE_DIR`` or the user cache directory.",
+        )
+        @click.option(
+            "--cache-size",
+            type=click.IntRange(min=0),
+            default=1000000,
+            show_default=True,
+            help="The maximum number of cached hash values. The least recently used ones are evicted.",
+        )
         @click.option("--no-stdout", is_flag=True, help="Do not output to stdout.")
         @click.option("--no-stderr", is_flag=True, help="Do not output to stderr.")
         @click.option("--tqdm-ascii", type=click.BOOL, default=False, show_default=True)
@@ -338,6 +985,7 @@ def gethashcli(command_name: str, display_name: str, **extras: Any) -> Callable[
         @functools.wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             kwargs.setdefault("suffix", suffix)
+            kwargs.setdefault("algorithm", command_name)
             if kwargs.get("auto", False):
                 kwargs.setdefault("files", (".",))
             return func(*args, **kwargs)
@@ -0,0 +1,260 @@
+"""Serve hash requests so that many files share one process.
+
+Each request is a JSON object on its own line::
+
+    {"id": 1, "algorithm": "sha256", "path": "/data/foo.txt", "start": null, "stop": null}
+
+Only ``algorithm`` and ``path`` are required. Each response is a JSON object
+on its own line, in the order of the requests, with either the hex hash value
+or the error::
+
+    {"id": 1, "path": "/data/foo.txt", "hash": "b5bb9d8014a0f9b1d61e21e796d78dcc..."}
+    {"id": 2, "path": "/data/bar.txt", "error": "FileNotFoundError: ..."}
+
+Relative paths are resolved against the working directory of the server.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import suppress
+from pathlib import Path
+from queue import Queue
+from typing import IO, TYPE_CHECKING, Any, cast
+
+from .backends import load_factory
+from .cache import CacheKey, HashCache
+from .hasher import Hasher
+from .utils.concurrent import SerialExecutor
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+__all__ = ["HashServer"]
+
+
+class HashServer:
+    """Hash files on requests of newline-delimited JSON.
+
+    The hash context of each algorithm is loaded on the first request and
+    shared by all later requests and connections.
+
+    Parameters:
+        jobs (int, default=1):
+            The number of files hashed concurrently.
+        cache_path (str | Path | None, default=None):
+            The path of the persistent cache. If ``None``, do not use the cache.
+        cache_size (int | None, default=None):
+            The maximum number of cached hash values, which is enforced when
+            the server is closed. If ``None``, never evict entries.
+        **hasher_args (Any):
+            The arguments passed to :class:`~gethash.hasher.Hasher`.
+    """
+
+    def __init__(
+        self,
+        *,
+        jobs: int = 1,
+        cache_path: str | Path | None = None,
+        cache_size: int | None = None,
+        **hasher_args: Any,
+    ) -> None:
+        if jobs < 1:
+            raise ValueError(f"jobs must be positive, got {jobs!r}")
+
+        self.jobs = jobs
+        self.window = 4 * jobs
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        hasher_args["tqdm_args"] = {"disable": True}
+        self.hasher_args = hasher_args
+        self.hashers: dict[str, Hasher] = {}
+        self.lock = threading.Lock()
+        self.executor: Executor = SerialExecutor() if jobs == 1 else ThreadPoolExecutor(jobs)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the workers and evict the least recently used cache entries."""
+
+        self.executor.shutdown()
+        if self.cache_path is not None and self.cache_size is not None:
+            HashCache(self.cache_path, max_entries=self.cache_size).close()
+
+    def hasher(self, algorithm: str) -> Hasher:
+        """Return the hasher of an algorithm, loading it on first use.
+
+        Raises:
+            ValueError:
+                If no installed backend provides the algorithm.
+        """
+
+        with self.lock:
+            hasher = self.hashers.get(algorithm)
+            if hasher is None:
+                hasher = Hasher(load_factory(algorithm)(), **self.hasher_args)
+                self.hashers[algorithm] = hasher
+        return hasher
+
+    def serve(self, infile: IO[bytes], outfile: IO[bytes]) -> None:
+        """Answer the requests read from ``infile`` until the end of file.
+
+        The requests are read on a separate thread, so a client may either
+        wait for each response or send all requests at once.
+
+        Parameters:
+            infile (IO[bytes]):
+                The stream of requests.
+            outfile (IO[bytes]):
+                The stream of responses.
+        """
+
+        requests: Queue[bytes | None] = Queue(self.window)
+        reader = threading.Thread(target=_read_requests, args=(infile, requests), daemon=True)
+        reader.start()
+
+        # The cache is only used on this thread, since SQLite connections
+        # cannot be shared between threads.
+        cache = None if self.cache_path is None else HashCache(self.cache_path)
+        pending: deque[tuple[dict[str, Any], CacheKey | None, bytes | None, Future[bytes]]] = deque()
+        try:
+            eof = False
+            while not eof or pending:
+                # Answer the first request once the window is full or no more
+                # requests are ready, and submit the next request otherwise.
+                if pending and (eof or len(pending) >= self.window or requests.empty() or pending[0][3].done()):
+                    outfile.write(self._resolve(*pending.popleft(), cache))
+                    if requests.empty():
+                        outfile.flush()
+                    continue
+                line = requests.get()
+                if line is None:
+                    eof = True
+                else:
+                    pending.append(self._submit(line, cache))
+            outfile.flush()
+        finally:
+            for *_, future in pending:
+                future.cancel()
+            if cache is not None:
+                cache.close()
+
+    def serve_unix(self, path: str | Path) -> None:
+        """Serve the connections to a Unix socket until interrupted.
+
+        A stale socket file at ``path`` is replaced, and the socket file is
+        removed on exit.
+
+        Parameters:
+            path (str | Path):
+                The path of the socket file.
+        """
+
+        import socketserver
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            wbufsize = -1
+
+            def handle(self) -> None:
+                # A client may disconnect without reading all responses.
+                with suppress(ConnectionError):
+                    server.serve(cast("IO[bytes]", self.rfile), cast("IO[bytes]", self.wfile))
+
+        class UnixServer(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        path = str(path)
+        with suppress(FileNotFoundError):
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.remove(path)
+
+        with UnixServer(path, Handler) as unix_server:
+            try:
+                unix_server.serve_forever()
+            finally:
+                os.remove(path)
+
+    def _submit(
+        self, line: bytes, cache: HashCache | None
+    ) -> tuple[dict[str, Any], CacheKey | None, bytes | None, Future[bytes]]:
+        response: dict[str, Any] = {}
+        key = cached = None
+        future: Future[bytes]
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            response["id"] = request.get("id")
+            algorithm, path, start, stop = _parse_request(request)
+            response["path"] = path
+            hasher = self.hasher(algorithm)
+        except ValueError as e:
+            future = Future()
+            future.set_exception(e)
+            return response, key, cached, future
+
+        if cache is not None:
+            key = cache.key(algorithm, path, start, stop)
+            if key is not None:
+                cached = cache.get(key)
+        if cached is None:
+            future = self.executor.submit(hasher, path, start, stop)
+        else:
+            future = Future()
+            future.set_result(cached)
+        return response, key, cached, future
+
+    def _resolve(
+        self,
+        response: dict[str, Any],
+        key: CacheKey | None,
+        cached: bytes | None,
+        future: Future[bytes],
+        cache: HashCache | None,
+    ) -> bytes:
+        try:
+            hash_value = future.result()
+        except Exception as e:  # noqa: BLE001
+            response["error"] = f"{type(e).__name__}: {e}"
+        else:
+            if cache is not None and key is not None and hash_value is not cached:
+                cache.put(key, hash_value)
+            response["hash"] = hash_value.hex()
+        return json.dumps(response).encode() + b"\n"
+
+
+def _parse_request(request: dict[str, Any]) -> tuple[str, str, int | None, int | None]:
+    algorithm = request.get("algorithm")
+    if not isinstance(algorithm, str):
+        raise ValueError("algorithm must be a string")
+    path = request.get("path")
+    if not isinstance(path, str):
+        raise ValueError("path must be a string")
+    start = request.get("start")
+    stop = request.get("stop")
+    for name, offset in (("start", start), ("stop", stop)):
+        if offset is not None and (not isinstance(offset, int) or isinstance(offset, bool) or offset < 0):
+            raise ValueError(f"{name} must be a non-negative integer or null")
+    return algorithm, path, start, stop
+
+
+def _read_requests(infile: IO[bytes], requests: Queue[bytes | None]) -> None:
+    try:
+        for line in infile:
+            if line.strip():
+                requests.put(line)
+    except (OSError, ValueError):
+        pass
+    finally:
+        requests.put(None)
@@ -0,0 +1,127 @@
+"""Copy files and hash them in the same pass."""
+
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .hasher import Hasher
+
+__all__ = ["CopyMismatchError", "copy_file"]
+
+# The number of bytes copied by each `copy_file_range` or `sendfile` call.
+_COPY_CHUNKSIZE = 0x40000000  # 1 GiB
+
+# The errors of `copy_file_range` and `sendfile` which mean that the system
+# call does not support the files, so that another method should be tried.
+_FALLBACK_ERRNOS = frozenset({errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSOCK, errno.EBADF})
+
+
+class CopyMismatchError(ValueError):
+    """Raised if the hash value of a copy differs from that of its source."""
+
+    def __init__(self, path: str, hex_hash_value: str, copy_hex_hash_value: str) -> None:
+        super().__init__(f"hash {copy_hex_hash_value} of copy {path!r} differs from {hex_hash_value} of source")
+        self.path = path
+        self.hex_hash_value = hex_hash_value
+        self.copy_hex_hash_value = copy_hex_hash_value
+
+
+def copy_file(
+    src: str | Path,
+    dst: str | Path,
+    hasher: Hasher | None = None,
+    *,
+    hash_value: bytes | None = None,
+    verify: bool = False,
+) -> bytes | None:
+    """Copy a file with its metadata, hashing the data on the way.
+
+    If the data is hashed, each chunk read from ``src`` is passed to the hash
+    context and then written to ``dst`` from the same buffer. Otherwise, the
+    data is copied inside the kernel with ``copy_file_range`` or ``sendfile``
+    where available.
+
+    Parameters:
+        src (str | Path):
+            The path of the source file.
+        dst (str | Path):
+            The path of the destination file, which is overwritten.
+        hasher (Hasher | None, default=None):
+            The hasher. If ``None``, only copy the file.
+        hash_value (bytes | None, default=None):
+            The known hash value of ``src``, e.g. from a cache. If given, the
+            data is copied without hashing it.
+        verify (bool, default=False):
+            If ``True``, read ``dst`` again and compare its hash value with
+            that of ``src``. Require ``hasher``.
+
+    Raises:
+        shutil.SameFileError:
+            If ``src`` and ``dst`` are the same file.
+        CopyMismatchError:
+            If ``verify`` is ``True`` and the hash values differ.
+
+    Returns:
+        bytes | None:
+            The hash value of ``src``, or ``None`` if ``hasher`` is ``None``.
+    """
+
+    if verify and hasher is None:
+        raise ValueError("verify requires a hasher")
+
+    with open(src, "rb") as fsrc:
+        # Opening `dst` for writing would truncate `src` if they are the same.
+        try:
+            dst_st = os.stat(dst)
+        except FileNotFoundError:
+            pass
+        else:
+            if os.path.samestat(os.fstat(fsrc.fileno()), dst_st):
+                raise shutil.SameFileError(f"{str(src)!r} and {str(dst)!r} are the same file")
+        with open(dst, "wb") as fdst:
+            if hasher is None or hash_value is not None:
+                _copy_data(fsrc, fdst)
+            else:
+                hash_value = hasher.hash_stream(fsrc, tee=fdst.write)
+    shutil.copystat(src, dst)
+
+    if verify and hasher is not None and hash_value is not None:
+        copy_hash_value = hasher(dst)
+        if copy_hash_value != hash_value:
+            raise CopyMismatchError(str(dst), hash_value.hex(), copy_hash_value.hex())
+    return hash_value
+
+
+def _copy_data(fsrc: IO[bytes], fdst: IO[bytes]) -> None:
+    # Each system call continues from the file offsets left by the previous
+    # one, so a partial copy is completed by the next method.
+    infd = fsrc.fileno()
+    outfd = fdst.fileno()
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            while copy_file_range(infd, outfd, _COPY_CHUNKSIZE):
+                pass
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+        else:
+            return
+
+    sendfile = getattr(os, "sendfile", None)
+    if sendfile is not None:
+        try:
+            while sendfile(outfd, infd, None, _COPY_CHUNKSIZE):
+                pass
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+        else:
+            return
+
+    shutil.copyfileobj(fsrc, fdst)
@@ -7,6 +7,34 @@ from typing import Any
 import click
 from click_didyoumean import DYMMixin
 
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+class ChunkSize(click.ParamType):
+    """Chunk size parameter type.
+
+    Accept ``auto`` or a number of bytes with an optional binary suffix, e.g.
+    ``64K``, ``4M`` or ``1G``.
+    """
+
+    name = "chunksize"
+
+    def convert(self, value: Any, param: click.Parameter | None, ctx: click.Context | None) -> int | str:
+        if isinstance(value, int):
+            return value
+        if str(value).strip().lower() == "auto":
+            return "auto"
+
+        text = str(value).strip().upper().removesuffix("IB").removesuffix("B")
+        unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+        try:
+            number = int(text[: len(text) - len(unit)])
+        except ValueError:
+            self.fail(f"{value!r} is not 'auto' or a size like 64K, 4M or 1G.", param, ctx)
+        if number <= 0:
+            self.fail(f"{value!r} is not positive.", param, ctx)
+        return number * _SIZE_UNITS[unit]
+
 
 class CommandX(click.Command):
     def main(self, args: Sequence[str] | None = None, *pargs: Any, **kwargs: Any) -> Any:
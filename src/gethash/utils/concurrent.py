@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, TypeVar
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+class SerialExecutor(Executor):
+    """Executor that runs each submitted call immediately in the calling thread.
+
+    The :class:`SerialExecutor` lets callers share one code path between
+    serial and concurrent execution.
+    """
+
+    def submit(self, fn: Callable[..., _R], /, *args: Any, **kwargs: Any) -> Future[_R]:
+        future: Future[_R] = Future()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:  # noqa: BLE001
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        return future
+
+
+class BatchExecutor(Executor):
+    """Executor that groups submitted calls into batches.
+
+    Each batch is sent to the underlying executor as a single call, which
+    amortizes the inter-process communication overhead of a process pool over
+    many small calls. A batch is dispatched when it is full, when :meth:`flush`
+    is called, or when the result of any call in it is requested.
+
+    Parameters:
+        executor (Executor):
+            The underlying executor.
+        batchsize (int):
+            The maximum number of calls in a batch.
+    """
+
+    def __init__(self, executor: Executor, batchsize: int) -> None:
+        if batchsize < 1:
+            raise ValueError(f"batchsize must be positive, got {batchsize!r}")
+
+        self._executor = executor
+        self._batchsize = batchsize
+        self._lock = threading.Lock()
+        self._calls: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]] = []
+        self._futures: list[_BatchFuture] = []
+
+    def submit(self, fn: Callable[..., _R], /, *args: Any, **kwargs: Any) -> Future[_R]:
+        future = _BatchFuture(self)
+        with self._lock:
+            self._calls.append((fn, args, kwargs))
+            self._futures.append(future)
+            full = len(self._calls) >= self._batchsize
+        if full:
+            self.flush()
+        return future
+
+    def flush(self) -> None:
+        """Dispatch the pending calls as a batch."""
+
+        with self._lock:
+            calls, futures = self._calls, self._futures
+            self._calls, self._futures = [], []
+            for future in futures:
+                future._dispatched = True
+
+        # Drop the calls cancelled before dispatching.
+        batch = [(call, future) for call, future in zip(calls, futures) if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        calls = [call for call, _ in batch]
+        futures = [future for _, future in batch]
+
+        def done(batch_future: Future[list[tuple[bool, Any]]]) -> None:
+            try:
+                results = batch_future.result()
+            except BaseException as e:  # noqa: BLE001
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, (ok, value) in zip(futures, results):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+        self._executor.submit(_run_batch, calls).add_done_callback(done)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:  # noqa: FBT001, FBT002
+        if cancel_futures:
+            with self._lock:
+                for future in self._futures:
+                    future.cancel()
+        self.flush()
+        self._executor.shutdown(wait)
+
+
+class _BatchFuture(Future):
+    def __init__(self, executor: BatchExecutor) -> None:
+        super().__init__()
+        self._executor = executor
+        self._dispatched = False
+
+    def _dispatch(self) -> None:
+        # Waiting for a call which has not been dispatched would block forever.
+        if not self._dispatched:
+            self._executor.flush()
+
+    def result(self, timeout: float | None = None) -> Any:
+        self._dispatch()
+        return super().result(timeout)
+
+    def exception(self, timeout: float | None = None) -> BaseException | None:
+        self._dispatch()
+        return super().exception(timeout)
+
+
+def _run_batch(calls: list[tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]]) -> list[tuple[bool, Any]]:
+    results: list[tuple[bool, Any]] = []
+    for fn, args, kwargs in calls:
+        try:
+            results.append((True, fn(*args, **kwargs)))
+        except Exception as e:  # noqa: BLE001
+            results.append((False, e))
+    return results
+
+
+def imap_ordered(
+    submit: Callable[[_T], Future[_R]], iterable: Iterable[_T], *, window: int = 1
+) -> Iterator[tuple[_T, Future[_R]]]:
+    """Submit a call for each item and yield in input order.
+
+    Unlike :meth:`concurrent.futures.Executor.map`, the input is consumed
+    lazily, so at most ``window`` calls are in flight at any time.
+
+    Parameters:
+        submit (Callable[[T], Future[R]]):
+            The function used to submit a call for each item, e.g.
+            ``functools.partial(executor.submit, fn)``.
+        iterable (Iterable[T]):
+            The items.
+        window (int, default=1):
+            The maximum number of pending calls.
+
+    Yields:
+        tuple[T, Future[R]]:
+            ``(item, future)``. The future is not guaranteed to be done.
+    """
+
+    if window < 1:
+        raise ValueError(f"window must be positive, got {window!r}")
+
+    pending: deque[tuple[_T, Future[_R]]] = deque()
+    try:
+        for item in iterable:
+            pending.append((item, submit(item)))
+            if len(pending) >= window:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    finally:
+        # Do not start calls which will never be consumed.
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import stat
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+
+class PathEntry(str):
+    """Path string which carries the status of the file.
+
+    The path searching functions yield :class:`PathEntry` objects, so that
+    filtering, sorting, caching and hashing reuse one ``stat`` call per file.
+    It can be used anywhere a path string can.
+
+    Parameters:
+        path (str):
+            The path string.
+        st (os.stat_result):
+            The status of the file, following symbolic links.
+    """
+
+    st: os.stat_result
+
+    def __new__(cls, path: str, st: os.stat_result) -> Self:
+        self = super().__new__(cls, path)
+        self.st = st
+        return self
+
+    def __getnewargs__(self) -> tuple[str, os.stat_result]:  # type: ignore [override]
+        # Keep the status when sent to worker processes.
+        return str(self), self.st
+
+    @property
+    def is_dir(self) -> bool:
+        """Whether the path is a directory."""
+
+        return stat.S_ISDIR(self.st.st_mode)
+
+    @property
+    def is_file(self) -> bool:
+        """Whether the path is a regular file."""
+
+        return stat.S_ISREG(self.st.st_mode)
+
+
+def stat_path(path: str | os.PathLike[str]) -> os.stat_result:
+    """Return the status of a file, reusing the one of a :class:`PathEntry`.
+
+    Parameters:
+        path (str | os.PathLike[str]):
+            The path of a file.
+
+    Returns:
+        os.stat_result:
+            The status of the file, following symbolic links.
+    """
+
+    if isinstance(path, PathEntry):
+        return path.st
+    return os.stat(path)
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import glob
 import os
+import stat
 from collections.abc import Iterable, Iterator
 from typing import Any, AnyStr, Callable
 
-from natsort import os_sort_keygen
+from .entry import PathEntry
 
 _ESCAPE_SQUARE = glob.escape("[")
 _ESCAPE_SQUARE_BYTES = glob.escape(b"[")
@@ -26,6 +27,11 @@ _HASH_SUFFIXES = (
     ".sm3",
 )
 
+# The sidecar indexes of text hash files, see `gethash.manifest.INDEX_SUFFIX`.
+_INDEX_SUFFIXES = tuple(suffix + ".idx" for suffix in _HASH_SUFFIXES)
+
+_EXCLUDED_SUFFIXES = _HASH_SUFFIXES + _INDEX_SUFFIXES
+
 
 def expand_path(path: AnyStr, *, user: bool = False, vars: bool = False) -> AnyStr:
     """Expand user home directory and environment variables.
@@ -79,17 +85,29 @@ def _get_glob(mode: int) -> Callable[..., Iterator]:
         raise ValueError(f"mode must be in {{0, 1, 2}}, got {mode!r}")
 
 
+def _any_type(mode: int) -> bool:
+    return True
+
+
 def _path_filter(paths: Iterable[AnyStr], *, type: str) -> Iterator[AnyStr]:
-    pred: Callable[[str | bytes], bool]
+    pred: Callable[[int], bool]
     if type == "a":
-        pred = os.path.exists
+        pred = _any_type
     elif type == "d":
-        pred = os.path.isdir
+        pred = stat.S_ISDIR
     elif type == "f":
-        pred = os.path.isfile
+        pred = stat.S_ISREG
     else:
         raise ValueError(f"type must be in {{'a', 'd', 'f'}}, got {type!r}")
-    yield from filter(pred, paths)
+
+    for path in paths:
+        # Stat each path once, and keep the status for later use.
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            continue
+        if pred(st.st_mode):
+            yield PathEntry(path, st) if isinstance(path, str) else path
 
 
 def glob_scanners(
@@ -151,19 +169,74 @@ def glob_filters(
 
     Yields:
         AnyStr:
-            The matched path with the given file type.
+            The matched path with the given file type. The path strings are
+            :class:`~gethash.utils.entry.PathEntry` objects.
     """
 
     matched = glob_scanners(paths, mode=mode, recursive=recursive, user=user, vars=vars)
     yield from _path_filter(matched, type=type)
 
 
+def _scandir_sorted(dirpath: str, key: Callable[[str], Any]) -> Iterator[os.DirEntry[str]]:
+    def entry_key(entry: os.DirEntry[str]) -> Any:
+        # Sort a directory as a parent component of its files, whose suffix is
+        # not split, to match sorting the full paths of the files.
+        if entry.is_dir():
+            return key(os.path.join(entry.name, "_"))[:1]
+        return key(entry.name)
+
+    try:
+        with os.scandir(dirpath) as it:
+            entries = sorted(it, key=entry_key)
+    except OSError:
+        # Skip unreadable directories the same as `os.walk`.
+        return iter(())
+    return iter(entries)
+
+
 def auto_glob(roots: Iterable[str]) -> Iterator[str]:
-    for root in roots:
-        for dirpath, _dirnames, filenames in os.walk(root):
-            for filename in filenames:
-                if not filename.lower().endswith(_HASH_SUFFIXES):
-                    yield os.path.join(dirpath, filename)
+    """Search files in directories recursively, except hash files and their indexes.
+
+    The files are yielded as soon as they are found, in the natural order of
+    each directory, depth first, so only the entries of the directories being
+    visited are held in memory. This differs from sorting all files by
+    :func:`sorted_path` if a directory and a file have the same stem, e.g.
+    the files in ``a/`` come before ``a.txt`` here, but after it there.
+    Symbolic links to directories are not followed. Each file is stat'ed
+    once, and the status is kept in the yielded
+    :class:`~gethash.utils.entry.PathEntry`.
+
+    Parameters:
+        roots (Iterable[str]):
+            The directories to search.
+
+    Yields:
+        str:
+            The path of a file, which is a plain string if it cannot be
+            stat'ed, e.g. a broken symbolic link.
+    """
+
+    from natsort import os_sort_keygen
+
+    key = os_sort_keygen()
+    for root in sorted(roots, key=key):
+        # Visit directories with a stack of iterators instead of recursion,
+        # which is limited for deep trees.
+        stack = [_scandir_sorted(root, key)]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+            elif entry.is_dir():
+                if not entry.is_symlink():
+                    stack.append(_scandir_sorted(entry.path, key))
+            elif not entry.name.lower().endswith(_EXCLUDED_SUFFIXES):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    yield entry.path
+                else:
+                    yield PathEntry(entry.path, st)
 
 
 def sorted_path(
@@ -187,14 +260,19 @@ def sorted_path(
     dirs = []
     files = []
     for path in iterable:
-        if os.path.isdir(path):
+        if path.is_dir if isinstance(path, PathEntry) else os.path.isdir(path):
             dirs.append(path)
         else:
             files.append(path)
 
-    key = os_sort_keygen(key)
-    dirs.sort(key=key, reverse=reverse)
-    files.sort(key=key, reverse=reverse)
+    # Import `natsort` only if there is something to sort, since importing it
+    # takes longer than hashing a small file.
+    if len(dirs) > 1 or len(files) > 1:
+        from natsort import os_sort_keygen
+
+        key = os_sort_keygen(key)
+        dirs.sort(key=key, reverse=reverse)
+        files.sort(key=key, reverse=reverse)
 
     if reverse:
         return files + dirs
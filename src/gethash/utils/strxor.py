@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import overload
+import functools
+from collections.abc import Iterable
+from typing import Callable, overload
 
 
 def _py_strxor(term1: bytes, term2: bytes, output: bytearray | None = None) -> bytes | None:
@@ -12,12 +14,14 @@ def _py_strxor(term1: bytes, term2: bytes, output: bytearray | None = None) -> b
     return None
 
 
-try:
-    from Crypto.Util.strxor import strxor as _c_strxor
-except ImportError:
-    _strxor = _py_strxor
-else:
-    _strxor = _c_strxor
+@functools.cache
+def _load_strxor() -> Callable[..., bytes | None]:
+    # Import `Crypto` on first use, since it is slow to import.
+    try:
+        from Crypto.Util.strxor import strxor as _c_strxor
+    except ImportError:
+        return _py_strxor
+    return _c_strxor
 
 
 @overload
@@ -52,4 +56,46 @@ def strxor(term1: bytes, term2: bytes, output: bytearray | None = None) -> bytes
         raise ValueError("term1 and term2 must have the same length")
     if output is not None and len(output) != len(term1):
         raise ValueError("output must have the same length as the input")
-    return _strxor(term1, term2, output)
+    return _load_strxor()(term1, term2, output)
+
+
+class XorAccumulator:
+    """Accumulate the XOR of many byte strings of the same length.
+
+    The byte strings are folded as big integers, so each one costs a single
+    integer operation instead of a loop over its bytes.
+
+    Parameters:
+        size (int):
+            The length of the byte strings.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size < 0:
+            raise ValueError(f"size must be non-negative, got {size!r}")
+
+        self.size = size
+        self._value = 0
+
+    def update(self, data: bytes) -> None:
+        """XOR a byte string into the accumulator."""
+
+        if len(data) != self.size:
+            raise ValueError(f"data must have length {self.size}, got {len(data)}")
+        self._value ^= int.from_bytes(data, "big")
+
+    def update_many(self, iterable: Iterable[bytes]) -> None:
+        """XOR many byte strings into the accumulator."""
+
+        value = 0
+        from_bytes = int.from_bytes
+        for data in iterable:
+            if len(data) != self.size:
+                raise ValueError(f"data must have length {self.size}, got {len(data)}")
+            value ^= from_bytes(data, "big")
+        self._value ^= value
+
+    def digest(self) -> bytes:
+        """Return the XOR of the byte strings passed so far."""
+
+        return self._value.to_bytes(self.size, "big")
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import zlib
+from typing import TYPE_CHECKING
 
-from typing_extensions import Self
+if TYPE_CHECKING:
+    from typing_extensions import Self
 
 
 class CRC32:
@@ -31,7 +33,7 @@ class CRC32:
     def hexdigest(self) -> str:
         return self._value.to_bytes(4, "big").hex()
 
-    def update(self, data: bytes) -> None:
+    def update(self, data: bytes | bytearray | memoryview) -> None:
         self._value = zlib.crc32(data, self._value)
 
 
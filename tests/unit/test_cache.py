@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from pathlib import Path
+
+import pytest
+
+from gethash.cache import HashCache, MerkleCache, default_cache_dir
+
+# Far enough in the past to not be considered racy.
+_MTIME_NS = 1_000_000_000_000_000_000
+
+
+def _write(path: Path, data: bytes, mtime_ns: int = _MTIME_NS) -> Path:
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+class TestHashCache:
+    def test_get_put(self, tmp_path: Path) -> None:
+        path = _write(tmp_path / "data", b"foo")
+        with HashCache(tmp_path / "cache.sqlite3") as cache:
+            key = cache.key("md5", path)
+            assert key is not None
+            assert (key.start, key.stop, key.size) == (0, 3, 3)
+            assert cache.get(key) is None
+            cache.put(key, b"\x01")
+            assert cache.get(key) == b"\x01"
+
+            # The range is clamped the same as `Hasher`.
+            assert cache.key("md5", path, -1, 100) == key
+            assert cache.key("md5", path, 1) != key
+            assert cache.key("sha1", path) != key
+
+        # The cache is persistent.
+        with HashCache(tmp_path / "cache.sqlite3") as cache:
+            assert cache.get(key) == b"\x01"
+
+    def test_invalidate(self, tmp_path: Path) -> None:
+        path = _write(tmp_path / "data", b"foo")
+        with HashCache(tmp_path / "cache.sqlite3") as cache:
+            key = cache.key("md5", path)
+            assert key is not None
+            cache.put(key, b"\x01")
+
+            _write(path, b"bar", _MTIME_NS + 1)
+            new_key = cache.key("md5", path)
+            assert new_key is not None
+            assert cache.get(new_key) is None
+
+            # The recently modified file is not cached.
+            _write(path, b"bar", _MTIME_NS * 2)
+            new_key = cache.key("md5", path)
+            assert new_key is not None
+            cache.put(new_key, b"\x02")
+            assert cache.get(new_key) is None
+
+    def test_key__not_file(self, tmp_path: Path) -> None:
+        with HashCache(tmp_path / "cache.sqlite3") as cache:
+            assert cache.key("md5", tmp_path) is None
+            assert cache.key("md5", tmp_path / "missing") is None
+
+    def test_evict(self, tmp_path: Path) -> None:
+        paths = [_write(tmp_path / str(i), bytes(i)) for i in range(5)]
+        with HashCache(tmp_path / "cache.sqlite3", max_entries=3) as cache:
+            keys = [cache.key("md5", path) for path in paths]
+            for i, key in enumerate(keys):
+                assert key is not None
+                cache.put(key, bytes([i]))
+            # Use the first entry so that it is the most recently used one.
+            assert keys[0] is not None
+            assert cache.get(keys[0]) == b"\x00"
+
+        with HashCache(tmp_path / "cache.sqlite3") as cache:
+            result = [key is not None and cache.get(key) is not None for key in keys]
+            assert result == [True, False, False, True, True]
+
+    def test_max_entries__error(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="max_entries must be non-negative"):
+            HashCache(tmp_path / "cache.sqlite3", max_entries=-1)
+
+
+def test_default_cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("GETHASH_CACHE_DIR", str(tmp_path))
+    assert default_cache_dir() == tmp_path
+
+
+class TestMerkleCache:
+    def test_get_put(self, tmp_path: Path) -> None:
+        children = {"a": ("f", 3, _MTIME_NS, 1, b"\x01"), "b": ("d", 0, 0, 0, b"\x02")}
+        with MerkleCache(tmp_path / "merkle.sqlite3", "md5") as cache:
+            assert cache.get(tmp_path) is None
+            cache.put(tmp_path, b"\x03", children)
+            assert cache.get(tmp_path) == (b"\x03", children)
+            assert cache.get(tmp_path, 0, 1) is None
+
+            # Racy files are stored as unknown.
+            now = time.time_ns()
+            cache.put(tmp_path, b"\x03", {"a": ("f", 3, now, 1, b"\x01")})
+            assert cache.get(tmp_path) == (b"\x03", {"a": ("f", 3, -1, 1, b"\x01")})
+
+    def test_pickle(self, tmp_path: Path) -> None:
+        with MerkleCache(tmp_path / "merkle.sqlite3", "md5") as cache:
+            cache.put(tmp_path, b"\x03", {})
+            cache.commit()
+            with pickle.loads(pickle.dumps(cache)) as other:
+                assert other.algorithm == "md5"
+                assert other.get(tmp_path) == (b"\x03", {})
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+import click
+import pytest
+
+from gethash.chunksize import calibrate, profiled_chunksize, select_chunksize
+from gethash.utils.click import ChunkSize
+
+
+class TestSelectChunksize:
+    def test_small_file(self) -> None:
+        assert select_chunksize(0, 4096, 0x100000) == 4096
+        assert select_chunksize(1, 4096, 0x100000) == 4096
+        assert select_chunksize(5000, 4096, 0x100000) == 8192
+
+    def test_large_file(self) -> None:
+        assert select_chunksize(1 << 30, 4096, 0x100000) == 0x100000
+        # Unknown block sizes are assumed to be 4 KiB.
+        assert select_chunksize(1 << 30, 0, 1000) == 0x4000
+        # A RAID stripe of 2 MiB gets 8 MiB chunks.
+        assert select_chunksize(1 << 30, 0x200000, 0x100000) == 0x800000
+        assert select_chunksize(1 << 30, 0x200000, 1 << 30) == 0x1000000
+
+
+class TestCalibrate:
+    def test_calibrate(self) -> None:
+        chunksize = calibrate(hashlib.md5(), budget=0.001)
+        assert 0x10000 <= chunksize <= 0x1000000
+        assert chunksize & (chunksize - 1) == 0
+
+    def test_profile(self, tmp_path: Path) -> None:
+        filepath = tmp_path / "sub" / "chunksize.json"
+        chunksize = profiled_chunksize("md5", hashlib.md5(), filepath)
+        assert json.loads(filepath.read_text())["chunksizes"] == {"md5": chunksize}
+
+        # The profile is reused.
+        filepath.write_text(json.dumps({"version": 1, "chunksizes": {"md5": 12345}}))
+        assert profiled_chunksize("md5", hashlib.md5(), filepath) == 12345
+
+        # An invalid profile is replaced.
+        filepath.write_text("[]")
+        profiled_chunksize("sha1", hashlib.sha1(), filepath)
+        assert list(json.loads(filepath.read_text())["chunksizes"]) == ["sha1"]
+
+
+class TestChunkSize:
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [("auto", "auto"), ("AUTO", "auto"), ("4096", 4096), ("64K", 0x10000), ("4MiB", 0x400000), ("1g", 1 << 30)],
+    )
+    def test_convert(self, value: str, expected: int | str) -> None:
+        assert ChunkSize().convert(value, None, None) == expected
+
+    @pytest.mark.parametrize("value", ["", "foo", "1T", "0", "-1K"])
+    def test_convert__error(self, value: str) -> None:
+        with pytest.raises(click.BadParameter):
+            ChunkSize().convert(value, None, None)
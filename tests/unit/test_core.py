@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import os
+import stat
+import sys
+import threading
 from hashlib import sha256
 from pathlib import Path
 
@@ -15,6 +19,7 @@ from gethash.core import (
     format_hash_line,
     generate_hash_line,
     parse_hash_line,
+    parse_hash_lines,
 )
 
 from ..data import FOO_TXT_A_SHA256, FOO_TXT_SHA256, FOO_ZIP_A_SHA256, FOO_ZIP_SHA256
@@ -53,6 +58,33 @@ class TestFormatParseHashLine:
             parse_hash_line(hash + name)
 
 
+class TestParseHashLines:
+    @pytest.mark.parametrize("root", [None, "root", "/root"])
+    def test_parse_hash_lines(self, root: str | None) -> None:
+        hash_lines = ["0011 *a\n", "2233  b c\n", "4455 ./d/../e\n", "6677 /f"]
+        blocks = list(parse_hash_lines(hash_lines, root=root))
+        assert len(blocks) == 1
+        assert blocks[0].paths == [parse_hash_line(hash_line, root=root)[0] for hash_line in hash_lines]
+        assert [blocks[0].hash_value(i).hex() for i in range(4)] == ["0011", "2233", "4455", "6677"]
+
+    def test_sizes(self) -> None:
+        blocks = list(parse_hash_lines(["00 *a\n", "11 *b\n", "2233 *c\n", "44 *d\n"]))
+        assert [(block.paths, block.hash_values, block.digest_size) for block in blocks] == [
+            (["a", "b"], b"\x00\x11", 1),
+            (["c"], b"\x22\x33", 2),
+            (["d"], b"\x44", 1),
+        ]
+
+    @pytest.mark.parametrize("hash_line", ["00x1 *c\n", "001 *c\n", "0011\n", "0011 \n", " *c\n"])
+    def test_error(self, hash_line: str) -> None:
+        blocks = parse_hash_lines(["0011 *a\n", "2233 *b\n", hash_line, "4455 *d\n"], lineno=10)
+        assert next(blocks).paths == ["a", "b"]
+        with pytest.raises(ParseHashLineError) as excinfo:
+            next(blocks)
+        assert excinfo.value.hash_line == hash_line
+        assert excinfo.value.lineno == 12
+
+
 _TestGenerateCheckHashLine_ARGNAMES = ("root", "path", "hash_line")
 
 
@@ -99,6 +131,24 @@ class TestHashFileReader:
         assert result == hash_line
 
 
+class TestHashFileReaderIterBlocks:
+    def test_iter_blocks(self, tmp_path: Path) -> None:
+        hash_path = tmp_path / "foo.sha256"
+        hash_path.write_text("# comment\n0011 *a\n\n2233 *b\n44 *c\n", encoding="utf-8")
+        blocks = list(HashFileReader(hash_path).iter_blocks(root="root"))
+        assert [(block.paths, block.hash_values) for block in blocks] == [
+            ([os.path.join("root", "a"), os.path.join("root", "b")], b"\x00\x11\x22\x33"),
+            ([os.path.join("root", "c")], b"\x44"),
+        ]
+
+    def test_error(self, tmp_path: Path) -> None:
+        hash_path = tmp_path / "foo.sha256"
+        hash_path.write_text("# comment\n0011 *a\n\n0011\n", encoding="utf-8")
+        with pytest.raises(ParseHashLineError) as excinfo:
+            list(HashFileReader(hash_path).iter_blocks())
+        assert excinfo.value.lineno == 1
+
+
 _TestHashFileReaderIter2_ARGNAMES = ("hash_path", "name", "hash")
 
 
@@ -169,3 +219,60 @@ class TestHashFileWriter:
         with HashFileWriter(tmp_hash_path) as hash_file:
             hash_file.write_hash_line(hash_line)
         assert read_text(tmp_hash_path) == read_text(hash_path)
+
+
+class TestHashFileWriterAtomic:
+    def test_atomic(self, tmp_path: Path) -> None:
+        hash_path = tmp_path / "foo.sha256"
+        hash_path.write_text("old\n", encoding="utf-8")
+        with HashFileWriter(hash_path, buffer_size=0x10000, atomic=True) as hash_file:
+            hash_file.write_hash_lines(["00 *a\n", "11 *b\n"])
+            assert read_text(hash_path) == "old\n"
+        assert read_text(hash_path) == "00 *a\n11 *b\n"
+        assert os.listdir(tmp_path) == ["foo.sha256"]
+
+    def test_abort(self, tmp_path: Path) -> None:
+        hash_path = tmp_path / "foo.sha256"
+        hash_path.write_text("old\n", encoding="utf-8")
+        hash_file = HashFileWriter(hash_path, atomic=True)
+        hash_file.write_hash_line("00 *a\n")
+        hash_file.abort()
+        hash_file.close()
+        assert read_text(hash_path) == "old\n"
+        assert os.listdir(tmp_path) == ["foo.sha256"]
+
+    def test_mode(self, tmp_path: Path) -> None:
+        hash_path = tmp_path / "foo.sha256"
+        hash_path.write_text("old\n", encoding="utf-8")
+        hash_path.chmod(0o640)
+        with HashFileWriter(hash_path, atomic=True) as hash_file:
+            hash_file.write_hash_line("00 *a\n")
+        assert stat.S_IMODE(hash_path.stat().st_mode) == 0o640
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="requires symbolic links")
+    def test_symlink(self, tmp_path: Path) -> None:
+        target = tmp_path / "target.sha256"
+        target.write_text("old\n", encoding="utf-8")
+        hash_path = tmp_path / "foo.sha256"
+        hash_path.symlink_to(target)
+        with HashFileWriter(hash_path, atomic=True) as hash_file:
+            hash_file.write_hash_line("00 *a\n")
+        assert hash_path.is_symlink()
+        assert read_text(target) == "00 *a\n"
+
+    @pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="requires named pipes")
+    def test_fifo(self, tmp_path: Path) -> None:
+        hash_path = tmp_path / "foo.sha256"
+        os.mkfifo(hash_path)
+        lines: list[str] = []
+        reader = threading.Thread(target=lambda: lines.extend(HashFileReader(hash_path)))
+        reader.start()
+        with HashFileWriter(hash_path, atomic=True) as hash_file:
+            hash_file.write_hash_line("00 *a\n")
+        reader.join()
+        assert lines == ["00 *a\n"]
+        assert stat.S_ISFIFO(os.lstat(hash_path).st_mode)
+
+    def test_error(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="buffer_size"):
+            HashFileWriter(tmp_path / "foo.sha256", buffer_size=0)
@@ -1,16 +1,37 @@
+from __future__ import annotations
+
+import asyncio
 import hashlib
+import io
+import os
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+import pytest
 
-from gethash.hasher import HashContext, Hasher
+from gethash import hasher as hasher_module
+from gethash.cache import MerkleCache
+from gethash.hasher import AsyncHasher, HashContext, HashContextGroup, Hasher, ProcessHasher
+from gethash.utils.concurrent import BatchExecutor
+from gethash.utils.entry import PathEntry
 from gethash.wrappers.crc32 import CRC32
 
-from ..utils import Vectors
+if TYPE_CHECKING:
+    from ..utils import Vectors
+
+_ENGINES = ["buffered", "mmap", "readahead"]
 
 
 class TestHasher:
     def _assert(self, vectors: Vectors, ctx: HashContext, name: str) -> None:
-        hasher = Hasher(ctx)
-        for path, vector in vectors.iter_path_vector():
-            assert hasher(path).hex() == vector[name]  # type: ignore [literal-required]
+        for engine in _ENGINES:
+            hasher = Hasher(ctx, engine=engine)
+            for path, vector in vectors.iter_path_vector():
+                assert hasher(path).hex() == vector[name]  # type: ignore [literal-required]
 
     def test_crc32(self, vectors: Vectors) -> None:
         ctx = CRC32()
@@ -27,3 +48,300 @@ class TestHasher:
     def test_sha256(self, vectors: Vectors) -> None:
         ctx = hashlib.sha256()
         self._assert(vectors, ctx, "sha256")
+
+    @pytest.mark.parametrize("engine", _ENGINES)
+    @pytest.mark.parametrize("chunksize", [-1, 1, 7, None, "auto"])
+    def test_start_stop(self, tmp_path: Path, engine: str, chunksize: int | str | None) -> None:
+        data = bytes(range(256)) * 3
+        path = tmp_path / "data"
+        path.write_bytes(data)
+        hasher = Hasher(hashlib.sha256(), chunksize=chunksize, engine=engine)
+        for start, stop in [(None, None), (0, 0), (5, 100), (100, 1000), (700, None)]:
+            expected = hashlib.sha256(data[start:stop]).digest()
+            assert hasher(path, start, stop) == expected
+
+    @pytest.mark.parametrize("engine", _ENGINES)
+    def test_changed_size(self, tmp_path: Path, engine: str) -> None:
+        path = tmp_path / "data"
+        path.write_bytes(b"old")
+        # The file grows after it is found, which must not truncate the data.
+        entry = PathEntry(str(path), path.stat())
+        path.write_bytes(bytes(range(256)) * 3)
+        hasher = Hasher(hashlib.sha256(), chunksize=7, engine=engine)
+        assert hasher(entry) == hashlib.sha256(bytes(range(256)) * 3).digest()
+
+    @pytest.mark.parametrize("chunksize", [-1, 1, 7, None, "auto"])
+    def test_hash_stream(self, chunksize: int | str | None) -> None:
+        data = bytes(range(256)) * 3
+        hasher = Hasher(hashlib.sha256(), chunksize=chunksize)
+        for start, stop in [(None, None), (0, 0), (5, 100), (100, 1000), (700, None)]:
+            expected = hashlib.sha256(data[start:stop]).digest()
+            streams: list[IO[bytes] | Iterable[bytes]] = [
+                io.BytesIO(data),
+                [data[i : i + 100] for i in range(0, len(data), 100)],
+                iter([data]),
+            ]
+            for stream in streams:
+                copied = io.BytesIO()
+                assert hasher.hash_stream(stream, start, stop, tee=copied.write) == expected
+                assert copied.getvalue() == data[:stop]
+
+    def test_hash_stream__error(self) -> None:
+        with pytest.raises(ValueError, match="start <= stop"):
+            Hasher(hashlib.sha256()).hash_stream(io.BytesIO(), 2, 1)
+
+    def test_chunksize__auto(self, tmp_path: Path) -> None:
+        data = bytes(range(256)) * 100
+        path = tmp_path / "data"
+        path.write_bytes(data)
+        for preferred in [1, 0x1000, 0x100000]:
+            hasher = Hasher(hashlib.sha256(), chunksize="auto", preferred_chunksize=preferred)
+            assert hasher(path) == hashlib.sha256(data).digest()
+
+    def test_chunksize__error(self) -> None:
+        with pytest.raises(ValueError, match="chunksize must be 'auto'"):
+            Hasher(hashlib.sha256(), chunksize="foo")
+        with pytest.raises(TypeError, match="chunksize must be int, str or None"):
+            Hasher(hashlib.sha256(), chunksize=1.0)  # type: ignore [arg-type]
+        with pytest.raises(ValueError, match="preferred_chunksize must be positive"):
+            Hasher(hashlib.sha256(), preferred_chunksize=0)
+        with pytest.raises(TypeError, match="preferred_chunksize must be int or None"):
+            Hasher(hashlib.sha256(), preferred_chunksize="1")  # type: ignore [arg-type]
+
+    @pytest.mark.parametrize("jobs", [None, 1, 4])
+    @pytest.mark.parametrize("shared", [False, True])
+    def test_dir(self, tmp_path: Path, jobs: int | None, *, shared: bool) -> None:
+        expected = bytearray(32)
+        for i in range(200):
+            data = str(i).encode()
+            path = tmp_path.joinpath(*str(i))
+            path.mkdir(parents=True, exist_ok=True)
+            (path / "data").write_bytes(data)
+            expected = bytearray(x ^ y for x, y in zip(expected, hashlib.sha256(data).digest()))
+        (tmp_path / "empty").mkdir()
+        if not shared:
+            hasher = Hasher(hashlib.sha256(), jobs=jobs)
+            assert hasher(tmp_path, dir_ok=True) == expected
+            return
+        # The shared executor is not shut down by the hasher.
+        with ThreadPoolExecutor(2) as executor:
+            hasher = Hasher(hashlib.sha256(), jobs=jobs, executor=executor)
+            assert hasher(tmp_path, dir_ok=True) == expected
+            assert hasher(tmp_path, dir_ok=True) == expected
+
+    def test_jobs__error(self) -> None:
+        with pytest.raises(ValueError, match="jobs must be positive"):
+            Hasher(hashlib.sha256(), jobs=0)
+        with pytest.raises(TypeError, match="jobs must be int or None"):
+            Hasher(hashlib.sha256(), jobs=1.0)  # type: ignore [arg-type]
+
+    def test_engine__error(self) -> None:
+        with pytest.raises(ValueError, match="engine must be in"):
+            Hasher(hashlib.sha256(), engine="foo")
+        with pytest.raises(TypeError, match="engine must be str or None"):
+            Hasher(hashlib.sha256(), engine=1)  # type: ignore [arg-type]
+
+    def test_queue_depth__error(self) -> None:
+        with pytest.raises(ValueError, match="queue_depth must be at least 2"):
+            Hasher(hashlib.sha256(), queue_depth=1)
+        with pytest.raises(TypeError, match="queue_depth must be int or None"):
+            Hasher(hashlib.sha256(), queue_depth=2.0)  # type: ignore [arg-type]
+
+    def test_readahead__error(self, tmp_path: Path) -> None:
+        path = tmp_path / "data"
+        path.write_bytes(bytes(100))
+
+        class Error(Exception):
+            pass
+
+        class BadContext:
+            digest_size = 0
+
+            def copy(self) -> BadContext:
+                return self
+
+            def digest(self) -> bytes:
+                return b""
+
+            def update(self, data: bytes | bytearray | memoryview) -> None:
+                raise Error
+
+        hasher = Hasher(BadContext(), chunksize=7, engine="readahead")
+        with pytest.raises(Error):
+            hasher(path)
+
+
+class TestMerkle:
+    def _write(self, path: Path, data: bytes, mtime_ns: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        # Far enough in the past to not be considered racy.
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def _tree(self, tmp_path: Path) -> Path:
+        root = tmp_path / "root"
+        self._write(root / "a", b"foo", 10**18)
+        self._write(root / "b", b"foo", 10**18)
+        self._write(root / "sub" / "c", b"bar", 10**18)
+        (root / "empty").mkdir()
+        return root
+
+    @pytest.mark.parametrize("jobs", [None, 4])
+    def test_merkle(self, tmp_path: Path, jobs: int | None) -> None:
+        root = self._tree(tmp_path)
+        hasher = Hasher(hashlib.sha256(), dir_mode="merkle", jobs=jobs)
+        value = hasher(root, dir_ok=True)
+        assert value != Hasher(hashlib.sha256())(root, dir_ok=True)
+
+        # Duplicate files do not cancel out, and renaming changes the value.
+        (root / "b").unlink()
+        assert hasher(root, dir_ok=True) != value
+        (root / "sub" / "c").rename(root / "sub" / "d")
+        self._write(root / "b", b"foo", 10**18)
+        assert hasher(root, dir_ok=True) != value
+
+    def test_group(self, tmp_path: Path) -> None:
+        root = self._tree(tmp_path)
+        group = HashContextGroup([hashlib.md5(), hashlib.sha1()])
+        value = Hasher(group, dir_mode="merkle")(root, dir_ok=True)
+        md5 = Hasher(hashlib.md5(), dir_mode="merkle")(root, dir_ok=True)
+        sha1 = Hasher(hashlib.sha1(), dir_mode="merkle")(root, dir_ok=True)
+        assert group.split(value) == [md5, sha1]
+
+    def test_cache(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        root = self._tree(tmp_path)
+        hashed = []
+        hash_file = Hasher._hash_file
+
+        def spy(self: Hasher, filepath: Path, *args: Any) -> bytes:
+            hashed.append(filepath.name)
+            return hash_file(self, filepath, *args)
+
+        monkeypatch.setattr(Hasher, "_hash_file", spy)
+        with MerkleCache(tmp_path / "merkle.sqlite3", "sha256") as cache:
+            hasher = Hasher(hashlib.sha256(), dir_mode="merkle", merkle_cache=cache)
+            value = hasher(root, dir_ok=True)
+            assert sorted(hashed) == ["a", "b", "c"]
+
+            hashed.clear()
+            assert hasher(root, dir_ok=True) == value
+            assert hashed == []
+
+            # Only the changed file is hashed again.
+            self._write(root / "sub" / "c", b"baz", 10**18 + 1)
+            new_value = hasher(root, dir_ok=True)
+            assert hashed == ["c"]
+            assert new_value != value
+
+        # The nodes are persistent.
+        with MerkleCache(tmp_path / "merkle.sqlite3", "sha256") as cache:
+            hashed.clear()
+            hasher = Hasher(hashlib.sha256(), dir_mode="merkle", merkle_cache=cache)
+            assert hasher(root, dir_ok=True) == new_value
+            assert hashed == []
+            assert Hasher(hashlib.sha256(), dir_mode="merkle")(root, dir_ok=True) == new_value
+
+    def test_dir_mode__error(self) -> None:
+        with pytest.raises(ValueError, match="dir_mode must be in"):
+            Hasher(hashlib.sha256(), dir_mode="foo")
+        with pytest.raises(TypeError, match="dir_mode must be str or None"):
+            Hasher(hashlib.sha256(), dir_mode=1)  # type: ignore [arg-type]
+
+
+class TestProcessHasher:
+    def test_sha256(self, vectors: Vectors) -> None:
+        paths, expected = zip(*((path, vector["sha256"]) for path, vector in vectors.iter_path_vector()))
+        with BatchExecutor(ProcessPoolExecutor(2), 2) as executor:
+            result = executor.map(ProcessHasher(hashlib.sha256), paths)
+            assert [hash_value.hex() for hash_value in result] == list(expected)
+
+    def test_crc32(self, vectors: Vectors) -> None:
+        hasher = ProcessHasher(CRC32)
+        for path, vector in vectors.iter_path_vector():
+            assert hasher(path).hex() == vector["crc32"]
+
+    def test_evict(self, vectors: Vectors, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(hasher_module, "_PROCESS_HASHERS", OrderedDict())
+        monkeypatch.setattr(hasher_module, "_PROCESS_HASHERS_SIZE", 2)
+        groups: list[HashContextGroup] = []
+
+        def factory() -> HashContextGroup:
+            groups.append(HashContextGroup([hashlib.md5(), hashlib.sha1()], threads=True))
+            return groups[-1]
+
+        path, vector = next(vectors.iter_path_vector())
+        hashers = [ProcessHasher(factory) for _ in range(3)]
+        hashers[0](path)
+        hashers[1](path)
+        # The first hasher is used recently, so the second one is evicted.
+        hashers[0](path)
+        assert hashers[2](path).hex() == vector["md5"] + vector["sha1"]
+        assert len(hasher_module._PROCESS_HASHERS) == 2
+        assert len(groups) == 3
+        with pytest.raises(RuntimeError):
+            groups[1].update(b"data")
+        groups[0].update(b"data")
+
+
+class TestAsyncHasher:
+    def test_sha256(self, vectors: Vectors) -> None:
+        paths, expected = zip(*((path, vector["sha256"]) for path, vector in vectors.iter_path_vector()))
+
+        async def main() -> list[tuple[str | Path, bytes]]:
+            async with AsyncHasher(hashlib.sha256(), limit=2) as hasher:
+                return [item async for item in hasher.map(paths)]
+
+        result = asyncio.run(main())
+        assert [path for path, _ in result] == list(paths)
+        assert [hash_value.hex() for _, hash_value in result] == list(expected)
+
+    def test_start_stop(self, tmp_path: Path) -> None:
+        path = tmp_path / "foo"
+        path.write_bytes(b"0123456789")
+
+        async def main() -> list[bytes]:
+            async with AsyncHasher(hashlib.md5(), limit=2) as hasher:
+                return await asyncio.gather(*(hasher(path, i, i + 3) for i in range(8)))
+
+        result = asyncio.run(main())
+        assert result == [hashlib.md5(b"0123456789"[i : i + 3]).digest() for i in range(8)]
+
+    def test_error(self, tmp_path: Path) -> None:
+        async def main() -> None:
+            async with AsyncHasher(hashlib.md5()) as hasher:
+                async for _ in hasher.map([tmp_path / "missing"]):
+                    pass
+
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(main())
+        with pytest.raises(ValueError, match="limit"):
+            AsyncHasher(hashlib.md5(), limit=0)
+
+
+class TestHashContextGroup:
+    @pytest.mark.parametrize("threads", [False, True])
+    def test_hasher(self, vectors: Vectors, *, threads: bool) -> None:
+        ctx = HashContextGroup([CRC32(), hashlib.md5(), hashlib.sha256()], threads=threads)
+        assert ctx.digest_sizes == [4, 16, 32]
+        assert ctx.digest_size == 52
+        hasher = Hasher(ctx, chunksize=1)
+        for path, vector in vectors.iter_path_vector():
+            result = [hash_value.hex() for hash_value in ctx.split(hasher(path))]
+            assert result == [vector["crc32"], vector["md5"], vector["sha256"]]
+
+    def test_from_factories(self, vectors: Vectors) -> None:
+        factory = partial(HashContextGroup.from_factories, [hashlib.md5, hashlib.sha1])
+        hasher = ProcessHasher(factory)
+        for path, vector in vectors.iter_path_vector():
+            assert hasher(path).hex() == vector["md5"] + vector["sha1"]
+
+    def test_close(self) -> None:
+        with HashContextGroup([hashlib.md5(), hashlib.sha1()], threads=True) as ctx:
+            ctx.copy().update(b"data")
+        # The threads are shut down for all copies.
+        with pytest.raises(RuntimeError):
+            ctx.copy().update(b"data")
+
+    def test_error(self) -> None:
+        with pytest.raises(ValueError, match="ctxs must not be empty"):
+            HashContextGroup([])
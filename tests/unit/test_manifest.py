@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from gethash.core import HashFileReader
+from gethash.manifest import (
+    BinaryHashFileReader,
+    BinaryHashFileWriter,
+    binary_to_text,
+    build_index,
+    index_path,
+    is_binary_hash_file,
+    iter_hash_blocks,
+    lookup_hash_value,
+    open_index,
+    text_to_binary,
+)
+
+from ..data import FOO_TXT_SHA256
+
+ENTRIES = [("foo/b.txt", b"\x01" * 32), ("a.txt", b"\x02" * 32), ("foo/中.txt", b"\x03" * 32), ("c", b"\x04" * 32)]
+
+
+@pytest.fixture()
+def binary_path(tmp_path: Path) -> Path:
+    path = tmp_path / "foo.bin"
+    with BinaryHashFileWriter(path, "sha256", 32) as writer:
+        for name, hash_value in ENTRIES:
+            writer.write(name, hash_value)
+    return path
+
+
+class TestBinaryHashFile:
+    def test_read(self, binary_path: Path) -> None:
+        assert is_binary_hash_file(binary_path)
+        with BinaryHashFileReader(binary_path) as reader:
+            assert reader.algorithm == "sha256"
+            assert reader.digest_size == 32
+            assert len(reader) == len(ENTRIES)
+            assert list(reader.iter2()) == ENTRIES
+
+    def test_lookup(self, binary_path: Path) -> None:
+        with BinaryHashFileReader(binary_path) as reader:
+            for name, hash_value in ENTRIES:
+                assert reader.lookup(name) == hash_value
+            assert reader.lookup("./foo/../a.txt") == b"\x02" * 32
+            assert reader.lookup("b.txt") is None
+            assert reader.lookup("foo") is None
+            assert reader.lookup("z") is None
+
+    def test_empty(self, tmp_path: Path) -> None:
+        path = tmp_path / "foo.bin"
+        BinaryHashFileWriter(path, "md5", 16).close()
+        with BinaryHashFileReader(path) as reader:
+            assert len(reader) == 0
+            assert reader.lookup("a") is None
+            assert list(reader.iter_blocks()) == []
+
+    def test_iter_blocks(self, binary_path: Path) -> None:
+        blocks = list(iter_hash_blocks(binary_path, root="root"))
+        assert len(blocks) == 1
+        assert blocks[0].paths == [os.path.join("root", os.path.normpath(name)) for name, _ in ENTRIES]
+        assert blocks[0].hash_values == b"".join(hash_value for _, hash_value in ENTRIES)
+
+    def test_error(self, tmp_path: Path, binary_path: Path) -> None:
+        with pytest.raises(ValueError, match="digest_size"):
+            BinaryHashFileWriter(tmp_path / "bar.bin", "sha256", 0)
+        with pytest.raises(ValueError, match="hash_value"):
+            BinaryHashFileWriter(tmp_path / "bar.bin", "sha256", 32).write("a", b"\x00")
+
+        assert not is_binary_hash_file(FOO_TXT_SHA256.hash_path)
+        with pytest.raises(ValueError, match="not a binary hash file"):
+            BinaryHashFileReader(FOO_TXT_SHA256.hash_path)
+        truncated_path = tmp_path / "truncated.bin"
+        truncated_path.write_bytes(binary_path.read_bytes()[:-1])
+        with pytest.raises(ValueError, match="truncated"):
+            BinaryHashFileReader(truncated_path)
+
+
+class TestConvert:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        text = "".join(f"{hash_value.hex()} *{os.path.normpath(name)}\n" for name, hash_value in ENTRIES)
+        text_path = tmp_path / "foo.sha256"
+        text_path.write_text(text, encoding="utf-8")
+
+        assert text_to_binary(text_path, tmp_path / "foo.bin", "sha256") == len(ENTRIES)
+        with BinaryHashFileReader(tmp_path / "foo.bin") as reader:
+            assert reader.algorithm == "sha256"
+            assert list(reader.iter2()) == [(os.path.normpath(name), hash_value) for name, hash_value in ENTRIES]
+
+        assert binary_to_text(tmp_path / "foo.bin", tmp_path / "bar.sha256") == len(ENTRIES)
+        assert (tmp_path / "bar.sha256").read_text(encoding="utf-8") == text
+        assert list(HashFileReader(tmp_path / "bar.sha256").iter2()) == list(HashFileReader(text_path).iter2())
+
+    def test_error(self, tmp_path: Path) -> None:
+        text_path = tmp_path / "foo.sha256"
+        text_path.write_text("0011 *a\n00 *b\n", encoding="utf-8")
+        with pytest.raises(ValueError, match="digest_size"):
+            text_to_binary(text_path, tmp_path / "foo.bin", "sha256")
+        assert not (tmp_path / "foo.bin").exists()
+
+        text_path.write_text("# comment\n", encoding="utf-8")
+        with pytest.raises(ValueError, match="no hash lines"):
+            text_to_binary(text_path, tmp_path / "foo.bin", "sha256")
+
+
+class TestIndex:
+    @pytest.fixture()
+    def text_path(self, tmp_path: Path) -> Path:
+        text_path = tmp_path / "foo.sha256"
+        text_path.write_text("".join(f"{hash_value.hex()} *{name}\n" for name, hash_value in ENTRIES), encoding="utf-8")
+        return text_path
+
+    def test_lookup(self, text_path: Path) -> None:
+        assert lookup_hash_value(text_path, "foo/b.txt") == b"\x01" * 32
+        assert index_path(text_path).exists()
+        with BinaryHashFileReader(index_path(text_path)) as index:
+            assert index.algorithm == "sha256"
+        assert lookup_hash_value(text_path, os.path.join("root", "c"), root="root") == b"\x04" * 32
+        assert lookup_hash_value(text_path, "d") is None
+
+        # Stale indexes are rebuilt.
+        with open(text_path, "a", encoding="utf-8") as f:
+            f.write(f"{'05' * 32} *d\n")
+        assert lookup_hash_value(text_path, "d") == b"\x05" * 32
+
+    def test_reader_lookup(self, text_path: Path) -> None:
+        reader = HashFileReader(text_path)
+        assert reader.lookup("foo/b.txt") == "01" * 32
+        assert reader.lookup("d") is None
+        assert reader.file.closed
+
+    def test_lookup__no_build(self, text_path: Path) -> None:
+        assert lookup_hash_value(text_path, "a.txt", build=False) == b"\x02" * 32
+        assert lookup_hash_value(text_path, "b.txt", build=False) is None
+        assert not index_path(text_path).exists()
+        assert open_index(text_path) is None
+
+        assert build_index(text_path) == len(ENTRIES)
+        index = open_index(text_path)
+        assert index is not None
+        index.close()
+
+    def test_lookup__binary(self, binary_path: Path) -> None:
+        assert lookup_hash_value(binary_path, "c") == b"\x04" * 32
+        assert not index_path(binary_path).exists()
+
+    def test_hash_file_reader(self, text_path: Path) -> None:
+        with HashFileReader(text_path) as hash_file:
+            assert hash_file.lookup("a.txt") == "02" * 32
+            assert hash_file.lookup("z") is None
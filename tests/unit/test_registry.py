@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from click import Command
+
+from gethash import registry
+from gethash.registry import Registry, load_command, load_object, load_registry
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("GETHASH_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_load_object() -> None:
+    assert load_object("gethash.registry:Registry.scan") == Registry.scan
+    assert load_object("gethash.registry") is registry
+
+
+class TestLoadRegistry:
+    def test_cache(self, cache_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        scanned = load_registry()
+        assert "md5" in scanned
+        assert scanned.commands["md5"] == "gethash.cli.md5:main"
+        assert scanned.backends["sha224"] == "gethash.backends.hashlib:load"
+        (path,) = cache_dir.glob("registry-*.json")
+
+        def scan() -> Registry:
+            return Registry({"foo": "foo:main"}, {})
+
+        monkeypatch.setattr(Registry, "scan", scan)
+        cached = load_registry()
+        assert cached.names() == scanned.names()
+        assert load_registry(refresh=True).names() == {"foo"}
+
+        # A cache written for another environment is ignored.
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["fingerprint"] = "stale"
+        data["commands"] = {}
+        path.write_text(json.dumps(data), encoding="utf-8")
+        assert load_registry().names() == {"foo"}
+
+        path.write_text("invalid", encoding="utf-8")
+        assert load_registry().names() == {"foo"}
+
+    def test_load_command(self) -> None:
+        cmd = load_command("md5")
+        assert isinstance(cmd, Command)
+        assert cmd.name == "md5"
+
+        cmd = load_command("sha224")
+        assert isinstance(cmd, Command)
+        assert cmd.name == "sha224"
+
+        assert load_command("foo") is None
+
+    def test_load_command__stale(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        scan = Registry.scan
+        load_registry()
+        monkeypatch.setattr(Registry, "scan", lambda: Registry({}, {}))
+        load_registry(refresh=True)
+        monkeypatch.setattr(Registry, "scan", scan)
+
+        # A stale registry is rebuilt when a command is missing.
+        cmd = load_command("md5")
+        assert isinstance(cmd, Command)
+        assert "md5" in load_registry()
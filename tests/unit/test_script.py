@@ -0,0 +1,357 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from click.testing import CliRunner, Result
+
+from gethash import hasher as hasher_module
+from gethash import script
+from gethash.cli.sha256 import main as sha256
+from gethash.hasher import Hasher
+from gethash.manifest import index_path
+
+
+def run(*args: str, stdin: bytes | None = None) -> Result:
+    return CliRunner().invoke(sha256, [*args, "--tqdm-disable", "true"], input=stdin)
+
+
+def hash_line(path: str, data: bytes) -> str:
+    return f"{hashlib.sha256(data).hexdigest()} *{path}\n"
+
+
+def set_mtime(path: Path, age: int = 10) -> None:
+    # The cache ignores files modified in the last seconds.
+    mtime_ns = time.time_ns() - age * 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture()
+def hashed(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    paths: list[str] = []
+    call = Hasher.__call__
+
+    def hash_path(self: Hasher, path: Any, *args: Any, **kwargs: Any) -> bytes:
+        paths.append(str(path))
+        return call(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(Hasher, "__call__", hash_path)
+    return paths
+
+
+@pytest.fixture(autouse=True)
+def cwd(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("GETHASH_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_bytes(name.encode())
+        set_mtime(tmp_path / name)
+    return tmp_path
+
+
+class TestJobs:
+    @pytest.fixture()
+    def names(self, cwd: Path) -> list[str]:
+        names = [f"{i:02}.txt" for i in range(30)]
+        for i, name in enumerate(names):
+            # Files of different sizes finish out of order.
+            (cwd / name).write_bytes(name.encode() * (30 - i) * 1000)
+        return names
+
+    def test_generate(self, cwd: Path, names: list[str]) -> None:
+        result = run("-j", "4", "-o", "all.sha256", *names)
+        assert result.exit_code == 0
+        expected = "".join(hash_line(name, (cwd / name).read_bytes()) for name in names)
+        assert result.output == expected
+        assert (cwd / "all.sha256").read_text() == expected
+
+    def test_check(self, cwd: Path, names: list[str]) -> None:
+        assert run("-o", "all.sha256", *names).exit_code == 0
+        with open(cwd / "all.sha256", "a") as f:
+            f.write("invalid\n")
+        (cwd / names[10]).write_bytes(b"changed")
+
+        # The results are reported in order, followed by the invalid line.
+        result = run("-c", "-j", "4", "all.sha256")
+        assert result.exit_code == 0
+        assert result.output.splitlines() == [
+            *(f"[FAILURE] {name}" if name == names[10] else f"[SUCCESS] {name}" for name in names),
+            "[ERROR] invalid hash 'invalid' in 'all.sha256' at line 31",
+        ]
+
+
+class TestDirJobs:
+    def test_shared(self, cwd: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        for name in ("d", "e"):
+            for i in range(10):
+                path = cwd / name / f"{i}.txt"
+                path.parent.mkdir(exist_ok=True)
+                path.write_bytes(f"{name}{i}".encode())
+        expected = {mode: run("-d", "--dir-mode", mode, "d", "a.txt", "e").output for mode in ("xor", "merkle")}
+
+        # The files of directories are hashed on the thread pool of `-j`.
+        def no_pool(*args: Any) -> None:
+            raise AssertionError("unexpected thread pool")
+
+        monkeypatch.setattr(hasher_module, "ThreadPoolExecutor", no_pool)
+        for mode in ("xor", "merkle"):
+            result = run("-d", "-j", "3", "--dir-mode", mode, "d", "a.txt", "e")
+            assert result.exit_code == 0
+            assert result.output == expected[mode]
+
+
+class TestUpdate:
+    def test_update(self, cwd: Path, hashed: list[str]) -> None:
+        hash_path = cwd / "all.sha256"
+        assert run("-o", "all.sha256", "-u", "--cache-size", "1", "a.txt", "b.txt", "c.txt").exit_code == 0
+        assert hashed == ["a.txt", "b.txt", "c.txt"]
+        # Reused lines are kept as they are.
+        a_line = hashlib.sha256(b"a.txt").hexdigest().upper() + "  a.txt\n"
+        expected = a_line + hash_line("b.txt", b"b.txt") + hash_line("c.txt", b"c.txt")
+        hash_path.write_text(expected)
+
+        # Unchanged files are not hashed again, even beyond the cache size.
+        hashed.clear()
+        assert run("-o", "all.sha256", "-u", "--cache-size", "1", "a.txt", "b.txt", "c.txt").exit_code == 0
+        assert hashed == []
+        assert hash_path.read_text() == expected
+
+        # Changed files are hashed again, and removed files are dropped.
+        (cwd / "b.txt").write_bytes(b"changed")
+        set_mtime(cwd / "b.txt", 5)
+        (cwd / "c.txt").unlink()
+        assert run("-o", "all.sha256", "-u", "a.txt", "b.txt", "c.txt").exit_code == 0
+        assert hashed == ["b.txt"]
+        assert hash_path.read_text() == a_line + hash_line("b.txt", b"changed")
+
+    @pytest.mark.parametrize(
+        ("content", "message"),
+        [
+            (b"invalid\n", "invalid hash 'invalid' at line 1"),
+            (b"GHBM\x01\x00\xff\xfe", "not a text hash file"),
+        ],
+    )
+    def test_error(self, cwd: Path, content: bytes, message: str) -> None:
+        (cwd / "all.sha256").write_bytes(content)
+        result = run("-o", "all.sha256", "-u", "a.txt")
+        assert result.exit_code == 2
+        assert "Cannot update 'all.sha256'" in result.output
+        assert message in result.output
+        assert (cwd / "all.sha256").read_bytes() == content
+        assert sorted(os.listdir(cwd)) == ["a.txt", "all.sha256", "b.txt", "c.txt", "cache"]
+
+    def test_lineno(self, cwd: Path) -> None:
+        (cwd / "all.sha256").write_text(hash_line("a.txt", b"a.txt") + "invalid\n")
+        # Both modes report the same line number for the same file.
+        assert "invalid hash 'invalid' at line 2" in run("-o", "all.sha256", "-u", "a.txt").output
+        assert "invalid hash 'invalid' in 'all.sha256' at line 2" in run("-c", "all.sha256").output
+
+
+class TestCacheVerify:
+    def test_check(self, cwd: Path) -> None:
+        assert run("-o", "all.sha256", "--cache", "a.txt", "b.txt", "c.txt").exit_code == 0
+        # Change the data of a file, but neither its size nor its mtime.
+        mtime_ns = (cwd / "b.txt").stat().st_mtime_ns
+        (cwd / "b.txt").write_bytes(b"B.TXT")
+        os.utime(cwd / "b.txt", ns=(mtime_ns, mtime_ns))
+        result = run("-c", "all.sha256", "--cache-verify")
+        assert result.exit_code == 0
+        assert "[WARNING] b.txt\n\tCacheMismatchError: " in result.output
+        lines = [line for line in result.output.splitlines() if line.startswith("[")]
+        assert lines == ["[SUCCESS] a.txt", "[WARNING] b.txt", "[FAILURE] b.txt", "[SUCCESS] c.txt"]
+
+
+class TestChangedOnly:
+    def test_changed_only(self, cwd: Path, hashed: list[str]) -> None:
+        assert run("-o", "all.sha256", "--cache", "a.txt", "b.txt", "c.txt").exit_code == 0
+        hashed.clear()
+        result = run("-c", "all.sha256", "--changed-only")
+        assert result.output == "[SKIPPED] a.txt\n[SKIPPED] b.txt\n[SKIPPED] c.txt\n"
+        assert hashed == []
+
+        # A new mtime or size invalidates the cache entry.
+        mtime_ns = (cwd / "c.txt").stat().st_mtime_ns
+        set_mtime(cwd / "a.txt", 5)
+        (cwd / "b.txt").write_bytes(b"changed")
+        set_mtime(cwd / "b.txt", 5)
+        (cwd / "c.txt").write_bytes(b"c.tx")
+        os.utime(cwd / "c.txt", ns=(mtime_ns, mtime_ns))
+        result = run("-c", "all.sha256", "--changed-only")
+        assert result.output == "[SUCCESS] a.txt\n[FAILURE] b.txt\n[FAILURE] c.txt\n"
+        assert hashed == ["a.txt", "b.txt", "c.txt"]
+
+    def test_first_run(self, cwd: Path) -> None:
+        # The first run fills the cache for the next one.
+        assert run("-o", "all.sha256", "a.txt", "b.txt").exit_code == 0
+        result = run("-c", "all.sha256", "--changed-only")
+        assert result.output == "[SUCCESS] a.txt\n[SUCCESS] b.txt\n"
+        result = run("-c", "all.sha256", "--changed-only")
+        assert result.output == "[SKIPPED] a.txt\n[SKIPPED] b.txt\n"
+
+    def test_sync(self, cwd: Path) -> None:
+        assert run("-o", "all.sha256", "--cache", "a.txt", "b.txt").exit_code == 0
+        # The skipped files count for the mtime of the hash file as well.
+        set_mtime(cwd / "b.txt", 20)
+        result = run("-c", "all.sha256", "--changed-only", "-y")
+        assert result.output == "[SKIPPED] a.txt\n[SUCCESS] b.txt\n"
+        assert (cwd / "all.sha256").stat().st_mtime_ns == (cwd / "a.txt").stat().st_mtime_ns
+
+    def test_error(self) -> None:
+        result = run("--changed-only", "a.txt")
+        assert result.exit_code == 2
+
+
+class TestAgg:
+    def test_auto(self, cwd: Path) -> None:
+        name = "all.sha256"
+        expected = hash_line("a.txt", b"a.txt") + hash_line("b.txt", b"b.txt") + hash_line("c.txt", b"c.txt")
+        # The second run replaces the previous hash file.
+        for _ in range(2):
+            result = run("-a", "-o", name, ".")
+            assert result.exit_code == 0
+            assert result.output == expected
+            assert (cwd / name).read_text() == expected
+            assert sorted(os.listdir(cwd)) == sorted(["a.txt", "b.txt", "c.txt", name])
+
+        result = run("-c", name)
+        assert result.exit_code == 0
+        assert result.output == "[SUCCESS] a.txt\n[SUCCESS] b.txt\n[SUCCESS] c.txt\n"
+
+
+class TestMulti:
+    @pytest.mark.parametrize(
+        ("agg", "names"),
+        [
+            ("all.sha256", ["all.sha256", "all.md5"]),
+            ("all.SHA256", ["all.SHA256", "all.md5"]),
+            ("all", ["all.sha256", "all.md5"]),
+            ("all.txt", ["all.txt.sha256", "all.txt.md5"]),
+        ],
+    )
+    def test_agg(self, cwd: Path, agg: str, names: list[str]) -> None:
+        result = run("-o", agg, "-m", "md5", "a.txt")
+        assert result.exit_code == 0
+        assert (cwd / names[0]).read_text() == hash_line("a.txt", b"a.txt")
+        assert (cwd / names[1]).read_text() == f"{hashlib.md5(b'a.txt').hexdigest()} *a.txt\n"
+        assert sorted(name for name in os.listdir(cwd) if name.startswith("all")) == sorted(names)
+
+    def test_close_error(self, cwd: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        def replace(src: str, dst: str) -> None:
+            raise PermissionError(dst)
+
+        monkeypatch.setattr(os, "replace", replace)
+        result = run("-o", "all.sha256", "-m", "md5", "a.txt")
+        assert isinstance(result.exception, PermissionError)
+        assert [name for name in os.listdir(cwd) if name.startswith("all")] == []
+
+
+class TestIndex:
+    def test_index(self, cwd: Path) -> None:
+        assert run("-o", "all.sha256", "--index", "a.txt").exit_code == 0
+        assert index_path(cwd / "all.sha256").exists()
+
+    def test_error(self, cwd: Path) -> None:
+        index_path(cwd / "all.sha256").mkdir()
+        result = run("-o", "all.sha256", "--index", "a.txt")
+        assert result.exit_code == 0
+        assert "[WARNING] cannot index 'all.sha256'" in result.output
+        assert (cwd / "all.sha256").read_text() == hash_line("a.txt", b"a.txt")
+
+
+class TestDefer:
+    def test_defer(self, cwd: Path) -> None:
+        result = run("-s", "--defer", "-j", "2", "a.txt", "b.txt")
+        assert result.exit_code == 0
+        assert (cwd / "a.txt.sha256").read_text() == hash_line("a.txt", b"a.txt")
+        assert (cwd / "b.txt.sha256").read_text() == hash_line("b.txt", b"b.txt")
+
+    @pytest.mark.parametrize("batchsize", [1, 2, 1024])
+    def test_error(self, cwd: Path, monkeypatch: pytest.MonkeyPatch, batchsize: int) -> None:
+        monkeypatch.setattr(script, "_SEP_BATCHSIZE", batchsize)
+        (cwd / "a.txt.sha256").mkdir()
+        result = run("-s", "--defer", "a.txt", "b.txt", "c.txt")
+        assert result.exit_code == 0
+        assert "[ERROR] a.txt\n" in result.output
+        assert "[ERROR] b.txt" not in result.output
+        assert "[ERROR] c.txt" not in result.output
+        assert (cwd / "b.txt.sha256").read_text() == hash_line("b.txt", b"b.txt")
+        assert (cwd / "c.txt.sha256").read_text() == hash_line("c.txt", b"c.txt")
+
+
+class TestStdin:
+    def test_stdin(self) -> None:
+        result = run("b.txt", "-", "a.txt", "c.txt", stdin=b"stdin")
+        assert result.exit_code == 0
+        assert result.output == (
+            hash_line("b.txt", b"b.txt")
+            + hash_line("-", b"stdin")
+            + hash_line("a.txt", b"a.txt")
+            + hash_line("c.txt", b"c.txt")
+        )
+
+        result = run("-", "--start", "1", "--stop", "3", stdin=b"stdin")
+        assert result.output == hash_line("-", b"td")
+
+    @pytest.mark.parametrize("option", ["-c", "-s", "-y", "--agg=all.sha256"])
+    def test_error(self, cwd: Path, option: str) -> None:
+        result = run(option, "-", stdin=b"stdin")
+        assert result.exit_code == 2
+        assert "Reading stdin" in result.output
+        assert not (cwd / "all.sha256").exists()
+
+
+class TestCopyTo:
+    def test_copy_to(self, cwd: Path) -> None:
+        (cwd / "d").mkdir()
+        (cwd / "d" / "e.txt").write_bytes(b"e.txt")
+        result = run("--copy-to", "dest", "--copy-verify", "-o", "dest.sha256", "a.txt", "d/e.txt")
+        assert result.exit_code == 0
+        assert (cwd / "dest" / "a.txt").read_bytes() == b"a.txt"
+        assert (cwd / "dest" / "d" / "e.txt").read_bytes() == b"e.txt"
+        assert (cwd / "dest.sha256").read_text() == hash_line("a.txt", b"a.txt") + hash_line("d/e.txt", b"e.txt")
+
+        result = run("-c", "dest.sha256", "-z", "dest")
+        assert result.output == "[SUCCESS] dest/a.txt\n[SUCCESS] dest/d/e.txt\n"
+
+    def test_collision(self, cwd: Path) -> None:
+        for name in ("d", "e"):
+            (cwd / name).mkdir()
+            (cwd / name / "x.txt").write_bytes(name.encode())
+        result = run("--copy-to", "dest", "-i", "-o", "dest.sha256", "d/x.txt", "e/x.txt")
+        assert result.exit_code == 0
+        assert "[ERROR] e/x.txt\n\tValueError: cannot copy 'e/x.txt' to 'x.txt'" in result.output
+        assert (cwd / "dest" / "x.txt").read_bytes() == b"d"
+        assert (cwd / "dest.sha256").read_text() == hash_line("x.txt", b"d")
+
+    def test_same_file(self, cwd: Path) -> None:
+        result = run("--copy-to", ".", "-o", "dest.sha256", "a.txt")
+        assert result.exit_code == 0
+        assert "[ERROR] a.txt\n\tSameFileError: " in result.output
+        assert (cwd / "a.txt").read_bytes() == b"a.txt"
+        assert (cwd / "dest.sha256").read_text() == ""
+
+    @pytest.mark.parametrize("copy_to", ["backup", ".", "d/backup"])
+    def test_searched(self, cwd: Path, copy_to: str) -> None:
+        (cwd / "d").mkdir()
+        (cwd / "d" / "x.txt").write_bytes(b"x.txt")
+        result = run("-a", "--copy-to", copy_to, "d", ".")
+        assert result.exit_code == 2
+        assert "which is in the searched directory" in result.output
+
+        result = run("-a", "--copy-to", "backup", "d")
+        assert result.exit_code == 0
+        assert (cwd / "backup" / "d" / "x.txt").read_bytes() == b"x.txt"
+
+    def test_error(self, cwd: Path) -> None:
+        result = run("--copy-to", "dest", str(cwd / "a.txt"))
+        assert "out of the copy directory" in result.output
+        assert not (cwd / "dest").exists()
+
+        result = run("--copy-to", "dest", "-d", "a.txt")
+        assert result.exit_code == 2
+        result = run("--copy-verify", "a.txt")
+        assert result.exit_code == 2
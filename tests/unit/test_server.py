@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import itertools
+import json
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+import pytest
+from click.testing import CliRunner
+
+from gethash.cache import HashCache
+from gethash.cli.client import main as client
+from gethash.client import request_hashes
+from gethash.server import HashServer
+from gethash.utils.glob import sorted_path
+
+
+def _serve(server: HashServer, requests: list[Any]) -> list[dict[str, Any]]:
+    lines = [r if isinstance(r, bytes) else json.dumps(r).encode() for r in requests]
+    infile = io.BytesIO(b"".join(line + b"\n" for line in lines))
+    outfile = io.BytesIO()
+    server.serve(infile, outfile)
+    return [json.loads(line) for line in outfile.getvalue().splitlines()]
+
+
+@pytest.fixture()
+def files(tmp_path: Path) -> list[Path]:
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"{i}.txt"
+        path.write_bytes(str(i).encode() * 100)
+        paths.append(path)
+    return paths
+
+
+class TestHashServer:
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_serve(self, files: list[Path], jobs: int) -> None:
+        requests = [{"id": i, "algorithm": "sha256", "path": str(path)} for i, path in enumerate(files)]
+        requests.append({"id": "x", "algorithm": "md5", "path": str(files[0]), "start": 1, "stop": 3})
+        with HashServer(jobs=jobs) as server:
+            responses = _serve(server, requests)
+
+        assert len(responses) == len(requests)
+        for i, path in enumerate(files):
+            assert responses[i] == {"id": i, "path": str(path), "hash": hashlib.sha256(path.read_bytes()).hexdigest()}
+        assert responses[-1]["hash"] == hashlib.md5(files[0].read_bytes()[1:3]).hexdigest()
+
+    def test_serve__error(self, tmp_path: Path) -> None:
+        requests = [
+            {"id": 1, "algorithm": "sha256", "path": str(tmp_path / "missing")},
+            {"id": 2, "algorithm": "sha256", "path": str(tmp_path)},
+            {"id": 3, "algorithm": "unknown", "path": "a"},
+            {"id": 4, "algorithm": "sha256", "path": "a", "start": -1},
+            {"id": 5, "algorithm": "sha256"},
+            [],
+            b"invalid",
+        ]
+        with HashServer() as server:
+            responses = _serve(server, requests)
+
+        assert [response.get("id") for response in responses] == [1, 2, 3, 4, 5, None, None]
+        assert responses[0]["error"].startswith("FileNotFoundError: ")
+        assert responses[1]["error"].startswith("IsADirectory: ")
+        assert responses[2]["error"] == "ValueError: unknown algorithm 'unknown'"
+        assert responses[3]["error"] == "ValueError: start must be a non-negative integer or null"
+        assert responses[4]["error"] == "ValueError: path must be a string"
+        assert responses[5]["error"] == "ValueError: request must be a JSON object"
+        assert responses[6]["error"].startswith("JSONDecodeError: ")
+
+    def test_serve__cache(self, tmp_path: Path, files: list[Path]) -> None:
+        cache_path = tmp_path / "cache" / "hashes.sqlite3"
+        with HashCache(cache_path) as cache:
+            key = cache.key("sha256", files[0])
+            assert key is not None
+            cache.put(key._replace(mtime_ns=0), b"\x00" * 32)
+            # Pretend that the file was hashed long ago.
+            cache.conn.execute("UPDATE hashes SET mtime_ns = ?", (key.mtime_ns,))
+
+        with HashServer(cache_path=cache_path, cache_size=10) as server:
+            responses = _serve(server, [{"algorithm": "sha256", "path": str(path)} for path in files[:2]])
+        assert responses[0]["hash"] == "00" * 32
+        assert responses[1]["hash"] == hashlib.sha256(files[1].read_bytes()).hexdigest()
+
+    def test_hasher(self) -> None:
+        with HashServer() as server:
+            assert server.hasher("sha256") is server.hasher("sha256")
+            with pytest.raises(ValueError, match="unknown algorithm"):
+                server.hasher("unknown")
+        with pytest.raises(ValueError, match="jobs"):
+            HashServer(jobs=0)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires Unix sockets")
+class TestRequestHashes:
+    @pytest.fixture()
+    def socket_path(self, tmp_path: Path) -> Iterator[Path]:
+        socket_path = tmp_path / "gethash.sock"
+        with HashServer(jobs=2) as server:
+
+            class Handler(socketserver.StreamRequestHandler):
+                def handle(self) -> None:
+                    with suppress(ConnectionError):
+                        server.serve(self.rfile, self.wfile)  # type: ignore [arg-type]
+
+            with socketserver.ThreadingUnixStreamServer(str(socket_path), Handler) as unix_server:
+                thread = threading.Thread(target=unix_server.serve_forever)
+                thread.start()
+                yield socket_path
+                unix_server.shutdown()
+                thread.join()
+
+    def test_request_hashes(self, socket_path: Path, files: list[Path]) -> None:
+        paths = files * 50
+        requests = ({"id": i, "algorithm": "md5", "path": str(path)} for i, path in enumerate(paths))
+        responses = list(request_hashes(socket_path, requests))
+        assert [response["id"] for response in responses] == list(range(len(paths)))
+        assert [response["hash"] for response in responses] == [
+            hashlib.md5(path.read_bytes()).hexdigest() for path in paths
+        ]
+
+    def test_request_hashes__stop(self, socket_path: Path, files: list[Path]) -> None:
+        # Send requests without end, and stop after the first response.
+        requests = ({"id": i, "algorithm": "md5", "path": str(files[0])} for i in itertools.count())
+        thread = threading.Thread(target=lambda: next(request_hashes(socket_path, requests)))
+        thread.start()
+        thread.join(10)
+        assert not thread.is_alive()
+
+    def test_client(self, socket_path: Path, files: list[Path], monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(files[0].parent)
+        result = CliRunner().invoke(client, ["-s", str(socket_path), "md5", "*.txt"])
+        assert result.exit_code == 0
+        names = sorted_path(path.name for path in files)
+        assert result.output == "".join(
+            f"{hashlib.md5((files[0].parent / name).read_bytes()).hexdigest()} *{name}\n" for name in names
+        )
+
+    def test_request_hashes__error(self, tmp_path: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            list(request_hashes(tmp_path / "missing.sock", []))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires Unix sockets")
+def test_serve_unix__terminate(tmp_path: Path) -> None:
+    socket_path = tmp_path / "gethash.sock"
+    process = subprocess.Popen([sys.executable, "-m", "gethash.cli.serve", "-s", str(socket_path)])
+    try:
+        deadline = time.monotonic() + 10
+        while not socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert socket_path.exists()
+    finally:
+        process.terminate()
+        process.wait(10)
+    assert process.returncode == 0
+    assert not socket_path.exists()
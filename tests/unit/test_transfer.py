@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from gethash.hasher import Hasher
+from gethash.transfer import CopyMismatchError, copy_file
+
+DATA = bytes(range(256)) * 1000
+
+
+@pytest.fixture()
+def src(tmp_path: Path) -> Path:
+    path = tmp_path / "src"
+    path.write_bytes(DATA)
+    os.utime(path, ns=(1_000_000_000, 2_000_000_000))
+    return path
+
+
+@pytest.mark.parametrize("chunksize", [None, 1000])
+def test_copy_file(tmp_path: Path, src: Path, chunksize: int | None) -> None:
+    dst = tmp_path / "dst"
+    hasher = Hasher(hashlib.sha256(), chunksize=chunksize)
+    assert copy_file(src, dst, hasher, verify=True) == hashlib.sha256(DATA).digest()
+    assert dst.read_bytes() == DATA
+    assert dst.stat().st_mtime_ns == 2_000_000_000
+
+
+def test_copy_file__no_hash(tmp_path: Path, src: Path) -> None:
+    dst = tmp_path / "dst"
+    dst.write_bytes(b"old" * 100000)
+    assert copy_file(src, dst) is None
+    assert dst.read_bytes() == DATA
+    assert dst.stat().st_mtime_ns == 2_000_000_000
+
+
+def test_copy_file__hash_value(tmp_path: Path, src: Path) -> None:
+    dst = tmp_path / "dst"
+    hasher = Hasher(hashlib.sha256())
+    hash_value = hashlib.sha256(DATA).digest()
+    assert copy_file(src, dst, hasher, hash_value=hash_value, verify=True) == hash_value
+    assert dst.read_bytes() == DATA
+
+    with pytest.raises(CopyMismatchError, match="differs"):
+        copy_file(src, dst, hasher, hash_value=b"\x00" * 32, verify=True)
+
+
+def test_copy_file__error(tmp_path: Path, src: Path) -> None:
+    with pytest.raises(ValueError, match="hasher"):
+        copy_file(src, tmp_path / "dst", verify=True)
+    with pytest.raises(FileNotFoundError):
+        copy_file(tmp_path / "missing", tmp_path / "dst")
+
+
+def test_copy_file__same_file(tmp_path: Path, src: Path) -> None:
+    hasher = Hasher(hashlib.sha256())
+    with pytest.raises(shutil.SameFileError):
+        copy_file(src, tmp_path / "." / "src", hasher)
+    assert src.read_bytes() == DATA
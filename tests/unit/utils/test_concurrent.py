@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from functools import partial
+
+import pytest
+
+from gethash.utils.concurrent import BatchExecutor, SerialExecutor, imap_ordered
+
+
+def _slow_square(x: int) -> int:
+    # Finish later items first to check that the input order is kept.
+    time.sleep(0.001 * (10 - x))
+    if x == 7:
+        raise ValueError(x)
+    return x * x
+
+
+def _collect(executor: Executor, window: int) -> list[int | None]:
+    def submit(x: int) -> Future[int]:
+        return executor.submit(_slow_square, x)
+
+    results: list[int | None] = []
+    for x, future in imap_ordered(submit, range(10), window=window):
+        try:
+            assert future.result() == x * x
+            results.append(x)
+        except ValueError:
+            results.append(None)
+    return results
+
+
+@pytest.mark.parametrize("window", [1, 3, 16])
+def test_imap_ordered(window: int) -> None:
+    expected = [0, 1, 2, 3, 4, 5, 6, None, 8, 9]
+    assert _collect(SerialExecutor(), window) == expected
+    with ThreadPoolExecutor(4) as executor:
+        assert _collect(executor, window) == expected
+
+
+def test_imap_ordered__error() -> None:
+    with pytest.raises(ValueError, match="window must be positive"):
+        next(imap_ordered(partial(SerialExecutor().submit, _slow_square), range(10), window=0))
+
+
+@pytest.mark.parametrize("batchsize", [1, 4, 64])
+def test_batch_executor(batchsize: int) -> None:
+    with BatchExecutor(ThreadPoolExecutor(2), batchsize) as executor:
+        assert _collect(executor, 3) == [0, 1, 2, 3, 4, 5, 6, None, 8, 9]
+
+
+def test_batch_executor__error() -> None:
+    with pytest.raises(ValueError, match="batchsize must be positive"):
+        BatchExecutor(SerialExecutor(), 0)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from gethash.cache import HashCache
+from gethash.hasher import Hasher
+from gethash.utils.entry import PathEntry, stat_path
+from gethash.utils.glob import glob_filters
+
+
+class TestPathEntry:
+    def test_entry(self, tmp_path: Path) -> None:
+        path = str(tmp_path)
+        entry = PathEntry(path, os.stat(path))
+        assert entry == path
+        assert os.path.join(entry, "x") == os.path.join(path, "x")
+        assert entry.is_dir
+        assert not entry.is_file
+        assert stat_path(entry) is entry.st
+
+    def test_pickle(self, tmp_path: Path) -> None:
+        path = str(tmp_path)
+        entry = PathEntry(path, os.stat(path))
+        other = pickle.loads(pickle.dumps(entry))
+        assert type(other) is PathEntry
+        assert other == entry
+        assert other.st == entry.st
+
+    def test_glob_filters(self, tmp_path: Path) -> None:
+        (tmp_path / "a").write_bytes(b"foo")
+        (tmp_path / "b").mkdir()
+        pattern = os.path.join(str(tmp_path), "*")
+        entries = list(glob_filters([pattern], type="f"))
+        assert entries == [str(tmp_path / "a")]
+        assert isinstance(entries[0], PathEntry)
+        assert entries[0].st.st_size == 3
+
+    def test_reuse(self, tmp_path: Path) -> None:
+        path = tmp_path / "a"
+        path.write_bytes(b"foo")
+        entry = PathEntry(str(path), os.stat(path))
+        path.write_bytes(b"foobar")
+
+        # The status of the entry is used instead of stat'ing the file again,
+        # but the hasher reads the file as it is when opened.
+        assert Hasher(hashlib.md5())(entry) == hashlib.md5(b"foobar").digest()
+        with HashCache(tmp_path / "cache.sqlite3") as cache:
+            key = cache.key("md5", entry)
+            assert key is not None
+            assert key.size == 3
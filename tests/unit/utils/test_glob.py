@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from gethash.manifest import index_path
+from gethash.utils.glob import auto_glob, sorted_path
+
+
+def _walk(root: Path) -> list[str]:
+    return [os.path.join(dirpath, filename) for dirpath, _, filenames in os.walk(root) for filename in filenames]
+
+
+class TestAutoGlob:
+    def test_order(self, tmp_path: Path) -> None:
+        for name in ["a10/x", "a2/x.txt", "a2/x-1.txt", "b.txt", "a1.txt", "a2.txt/y", "c/d/e/f"]:
+            path = tmp_path / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        assert list(auto_glob([str(tmp_path)])) == sorted_path(_walk(tmp_path))
+
+    def test_order__same_stem(self, tmp_path: Path) -> None:
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "x").touch()
+        (tmp_path / "a.txt").touch()
+        assert list(auto_glob([str(tmp_path)])) == [str(tmp_path / "a" / "x"), str(tmp_path / "a.txt")]
+
+    def test_hash_files(self, tmp_path: Path) -> None:
+        (tmp_path / "a").touch()
+        (tmp_path / "a.sha256").touch()
+        (tmp_path / "b.MD5").touch()
+        index_path(tmp_path / "a.sha256").touch()
+        (tmp_path / "c.idx").touch()
+        assert list(auto_glob([str(tmp_path)])) == [str(tmp_path / "a"), str(tmp_path / "c.idx")]
+
+    def test_roots(self, tmp_path: Path) -> None:
+        for name in ["b/x", "a/x"]:
+            path = tmp_path / name
+            path.parent.mkdir()
+            path.touch()
+        roots = [str(tmp_path / "b"), str(tmp_path / "a"), str(tmp_path / "missing")]
+        assert list(auto_glob(roots)) == [str(tmp_path / "a" / "x"), str(tmp_path / "b" / "x")]
+
+    def test_symlink(self, tmp_path: Path) -> None:
+        (tmp_path / "d").mkdir()
+        (tmp_path / "d" / "x").touch()
+        try:
+            (tmp_path / "l").symlink_to(tmp_path / "d", target_is_directory=True)
+        except OSError:
+            pytest.skip("symbolic links are not supported")
+        assert list(auto_glob([str(tmp_path)])) == [str(tmp_path / "d" / "x")]
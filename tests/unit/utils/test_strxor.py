@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import pytest
 
-from gethash.utils.strxor import _py_strxor, strxor
+from gethash.utils.strxor import XorAccumulator, _py_strxor, strxor
 
 
 @pytest.mark.parametrize(
@@ -49,3 +49,31 @@ class TestStrxor:
         output = bytearray(len(expected) - 1)
         with pytest.raises(ValueError, match="output must have the same length as the input"):
             strxor(term1, term2, output)
+
+
+class TestXorAccumulator:
+    def test_update(self) -> None:
+        values = [bytes([i]) * 32 for i in range(10)]
+        expected = bytes(32)
+        for value in values:
+            expected = strxor(expected, value)
+
+        acc = XorAccumulator(32)
+        assert acc.digest() == bytes(32)
+        acc.update(values[0])
+        acc.update_many(values[1:])
+        assert acc.digest() == expected
+
+        # Leading zeros are kept.
+        acc = XorAccumulator(4)
+        acc.update(b"\x00\x00\x00\x01")
+        assert acc.digest() == b"\x00\x00\x00\x01"
+
+    def test_error(self) -> None:
+        acc = XorAccumulator(4)
+        with pytest.raises(ValueError, match="data must have length 4"):
+            acc.update(b"\x00")
+        with pytest.raises(ValueError, match="data must have length 4"):
+            acc.update_many([b"\x00" * 4, b"\x00"])
+        with pytest.raises(ValueError, match="size must be non-negative"):
+            XorAccumulator(-1)